@@ -2,11 +2,16 @@ import os
 
 from flasgger import Swagger
 from flask import Flask
+from flask.helpers import get_debug_flag
 from flask_cors import CORS
 
 from app.config.config import Config
 from app.extensions import db
+from app.utils.catalog_cache import init_catalog_cache
+from app.utils.guest_token import GUEST_TOKEN_HEADER
+from app.utils.idempotency import REPLAYED_HEADER
 from app.utils.log_config import setup_logging
+from app.utils.pagination import NEXT_CURSOR_HEADER
 
 
 def create_app():
@@ -15,16 +20,26 @@ def create_app():
     app.config.from_object(Config)
 
     db.init_app(app)
+    init_catalog_cache(app)
     CORS(
         app,
         supports_credentials=True,
         resources={r"/*": {"origins": "https://d3pj8ooak7hbtk.cloudfront.net"}},
+        expose_headers=[
+            NEXT_CURSOR_HEADER,
+            GUEST_TOKEN_HEADER,
+            REPLAYED_HEADER,
+            "ETag",
+            "Last-Modified",
+        ],
     )
 
     os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
 
     Swagger(app)
 
+    from app.migrations import run_migrations
+    from app.routes.analytics_api import analytics_bp
     from app.routes.cart_api import cart_bp
     from app.routes.fruit_api import fruit_bp
     from app.routes.order_api import order_bp
@@ -34,11 +49,19 @@ def create_app():
     app.register_blueprint(user_bp, url_prefix="/user")
     app.register_blueprint(order_bp, url_prefix="/order")
     app.register_blueprint(cart_bp, url_prefix="/cart")
+    app.register_blueprint(analytics_bp, url_prefix="/analytics")
+
+    from app.cli import register_commands
+
+    register_commands(app)
 
     with app.app_context():
-        db.create_all()
+        run_migrations()
         seed_guest_user()
 
+    if app.config["BACKGROUND_JOBS"] and not _is_reloader_parent():
+        start_background_jobs(app)
+
     return app
 
 
@@ -55,3 +78,86 @@ def seed_guest_user():
         )
         db.session.add(guest)
         db.session.commit()
+
+
+def _is_reloader_parent() -> bool:
+    """
+    True in the Werkzeug reloader's watcher process, which only restarts
+    the serving child (started with ``WERKZEUG_RUN_MAIN=true``).
+    """
+    return get_debug_flag() and os.environ.get("WERKZEUG_RUN_MAIN") != "true"
+
+
+def start_background_jobs(app) -> dict:
+    """
+    Start the periodic maintenance threads of ``app`` once per process.
+
+    Each job runs only if its interval (or worker count) is positive.
+
+    Returns
+    -------
+    dict
+        Stop events of the started jobs by name (a list for the order
+        workers); also stored in ``app.extensions["background_jobs"]``.
+    """
+    from app.utils.periodic import start_periodic
+
+    if "background_jobs" in app.extensions:
+        return app.extensions["background_jobs"]
+
+    jobs = {}
+    if app.config["CART_SWEEP_INTERVAL_SECONDS"] > 0:
+        from app.services.cart_service import sweep_abandoned_carts
+
+        jobs["cart_sweeper"] = start_periodic(
+            app,
+            "cart-sweeper",
+            app.config["CART_SWEEP_INTERVAL_SECONDS"],
+            sweep_abandoned_carts,
+        )
+
+    if app.config["CART_HOLD_SWEEP_INTERVAL_SECONDS"] > 0:
+        from app.services.reservation_service import sweep_expired_holds
+
+        jobs["hold_sweeper"] = start_periodic(
+            app,
+            "hold-sweeper",
+            app.config["CART_HOLD_SWEEP_INTERVAL_SECONDS"],
+            sweep_expired_holds,
+        )
+
+    if app.config["ORDER_WORKERS"] > 0:
+        from app.services.order_service import process_order_jobs
+
+        jobs["order_workers"] = [
+            start_periodic(
+                app,
+                f"order-worker-{n}",
+                app.config["ORDER_QUEUE_POLL_SECONDS"],
+                process_order_jobs,
+            )
+            for n in range(app.config["ORDER_WORKERS"])
+        ]
+
+    if app.config["ORDER_ARCHIVE_INTERVAL_SECONDS"] > 0:
+        from app.services.archive_service import run_order_archival
+
+        jobs["order_archiver"] = start_periodic(
+            app,
+            "order-archiver",
+            app.config["ORDER_ARCHIVE_INTERVAL_SECONDS"],
+            run_order_archival,
+        )
+
+    if app.config["IDEMPOTENCY_PURGE_INTERVAL_SECONDS"] > 0:
+        from app.services.idempotency_service import purge_expired_keys
+
+        jobs["idempotency_purger"] = start_periodic(
+            app,
+            "idempotency-purger",
+            app.config["IDEMPOTENCY_PURGE_INTERVAL_SECONDS"],
+            purge_expired_keys,
+        )
+
+    app.extensions["background_jobs"] = jobs
+    return jobs
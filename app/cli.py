@@ -0,0 +1,189 @@
+import threading
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from app.migrations import run_migrations
+from app.migrations.query_plans import check_query_plans
+from app.services import (
+    analytics_service,
+    archive_service,
+    cart_service,
+    export_service,
+    fruit_service,
+    idempotency_service,
+    import_service,
+    order_service,
+    reservation_service,
+)
+
+db_cli = AppGroup("db", help="Schema migrations and query-plan checks.")
+fruit_cli = AppGroup("fruit", help="Fruit catalog maintenance.")
+cart_cli = AppGroup("cart", help="Cart maintenance.")
+order_cli = AppGroup("order", help="Order processing.")
+analytics_cli = AppGroup("analytics", help="Sales rollups.")
+jobs_cli = AppGroup("jobs", help="Periodic background jobs.")
+
+
+@db_cli.command("upgrade")
+def db_upgrade():
+    """Apply pending schema migrations."""
+    applied = run_migrations()
+    click.echo(f"Applied migrations: {applied}" if applied else "Schema up to date")
+
+
+@db_cli.command("check-plans")
+def db_check_plans():
+    """Fail if a hot query stops using its index."""
+    failures = check_query_plans()
+    for failure in failures:
+        click.echo(failure, err=True)
+    if failures:
+        raise SystemExit(1)
+    click.echo("All hot queries use their indexes")
+
+
+@db_cli.command("purge-idempotency-keys")
+def db_purge_idempotency_keys():
+    """Delete expired idempotency keys."""
+    deleted = idempotency_service.purge_expired_keys()
+    click.echo(f"Deleted {deleted} idempotency keys")
+
+
+@fruit_cli.command("import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(import_service.SUPPORTED_FORMATS))
+@click.option("--chunk-size", type=int, default=None, help="Rows per transaction.")
+def fruit_import(path, fmt, chunk_size):
+    """Bulk import fruits and lots from a CSV or NDJSON file."""
+    fmt = fmt or import_service.detect_format(path, None)
+    if not fmt:
+        raise click.UsageError("Cannot detect format; pass --format csv|ndjson")
+
+    with open(path, encoding="utf-8-sig", newline="") as stream:
+        report = import_service.import_fruits(stream, fmt, chunk_size=chunk_size)
+
+    for error in report["errors"]:
+        click.echo(f"row {error['row']}: {error['error']}", err=True)
+    click.echo(
+        f"Processed {report['processed']} rows: "
+        f"{report['fruits_created']} fruits, {report['lots_created']} lots created, "
+        f"{len(report['errors'])} errors"
+    )
+
+
+@fruit_cli.command("delete")
+@click.argument("ids", nargs=-1, type=int)
+@click.option(
+    "--ids-file",
+    type=click.File("r"),
+    help="File with one fruit id per line (use - for stdin).",
+)
+@click.option("--chunk-size", type=int, default=None, help="Ids per transaction.")
+def fruit_delete(ids, ids_file, chunk_size):
+    """Delete fruits and their lots, cart lines and orders."""
+    all_ids = list(ids)
+    if ids_file:
+        all_ids.extend(int(line) for line in ids_file if line.strip())
+    if not all_ids:
+        raise click.UsageError("Pass fruit ids or --ids-file")
+
+    counts = fruit_service.delete_fruits(all_ids, chunk_size=chunk_size)
+    click.echo(", ".join(f"{table}: {count}" for table, count in counts.items()))
+
+
+@cart_cli.command("sweep")
+@click.option("--chunk-size", type=int, default=None, help="Lines per transaction.")
+def cart_sweep(chunk_size):
+    """Delete abandoned guest carts and stale cart lines."""
+    deleted = cart_service.sweep_abandoned_carts(chunk_size=chunk_size)
+    click.echo(f"Deleted {deleted} cart lines")
+
+
+@cart_cli.command("release-holds")
+@click.option("--chunk-size", type=int, default=None, help="Holds per transaction.")
+def cart_release_holds(chunk_size):
+    """Release expired stock holds and return their stock."""
+    released = reservation_service.sweep_expired_holds(chunk_size=chunk_size)
+    click.echo(f"Released {released} holds")
+
+
+@order_cli.command("process")
+@click.option("--max-jobs", type=int, default=None, help="Stop after this many jobs.")
+def order_process(max_jobs):
+    """Run queued checkouts until the queue is empty."""
+    processed = order_service.process_order_jobs(max_jobs=max_jobs)
+    click.echo(f"Processed {processed} queued orders")
+
+
+@order_cli.command("archive")
+@click.option(
+    "--directory", type=click.Path(file_okay=False), help="NDJSON output directory."
+)
+def order_archive(directory):
+    """Archive old orders and export cold months to gzipped NDJSON."""
+    moved = archive_service.archive_orders()
+    paths = archive_service.export_cold_orders(directory=directory)
+    for path in paths:
+        click.echo(f"Wrote {path}")
+    click.echo(f"Archived {moved} orders, exported {len(paths)} months")
+
+
+@order_cli.command("export")
+@click.argument("output", type=click.Path(dir_okay=False, writable=True))
+@click.option("--format", "fmt", type=click.Choice(export_service.EXPORT_FORMATS))
+@click.option("--start", type=click.DateTime(["%Y-%m-%d"]), help="First day.")
+@click.option("--end", type=click.DateTime(["%Y-%m-%d"]), help="Last day.")
+def order_export(output, fmt, start, end):
+    """Export orders (archived ones included) to CSV or Parquet."""
+    fmt = fmt or ("parquet" if output.endswith(".parquet") else "csv")
+    start = start.date() if start else None
+    end = end.date() if end else None
+    try:
+        if fmt == "parquet":
+            count = export_service.write_parquet(output, start, end)
+        else:
+            with open(output, "w", encoding="utf-8", newline="") as stream:
+                count = export_service.write_csv(stream, start, end)
+    except export_service.ParquetUnavailableError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Exported {count} orders to {output}")
+
+
+@analytics_cli.command("rebuild")
+@click.option("--start", type=click.DateTime(["%Y-%m-%d"]), help="First day.")
+@click.option("--end", type=click.DateTime(["%Y-%m-%d"]), help="Last day.")
+def analytics_rebuild(start, end):
+    """Recompute the daily sales rollup from orders."""
+    written = analytics_service.rebuild_sales_daily(
+        start.date() if start else None, end.date() if end else None
+    )
+    click.echo(f"Wrote {written} daily sales rows")
+
+
+@jobs_cli.command("run")
+def jobs_run():
+    """Run the periodic jobs in this process until interrupted."""
+    from app import start_background_jobs
+
+    jobs = start_background_jobs(current_app._get_current_object())
+    if not jobs:
+        raise click.ClickException("Every job is disabled by its interval")
+    click.echo(f"Running jobs: {', '.join(jobs)}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+
+
+def register_commands(app):
+    """
+    Register the application's CLI command groups.
+    """
+    app.cli.add_command(db_cli)
+    app.cli.add_command(fruit_cli)
+    app.cli.add_command(cart_cli)
+    app.cli.add_command(order_cli)
+    app.cli.add_command(analytics_cli)
+    app.cli.add_command(jobs_cli)
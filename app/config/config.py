@@ -64,3 +64,78 @@ class Config:
         UPLOAD_FOLDER = "/tmp/uploads"
 
     MAX_CONTENT_LENGTH = 10 * 1024 * 1024  # 10 MB
+
+    # Keyset pagination for list endpoints
+    PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", 100))
+    PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", 500))
+
+    # Rows fetched per server-side cursor batch for streamed (?stream=true) lists
+    STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", 1000))
+
+    # Rows per transaction for bulk fruit imports
+    IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", 1000))
+
+    # Fruit ids per chunk (and transaction) for set-based fruit deletes
+    DELETE_CHUNK_SIZE = int(os.getenv("DELETE_CHUNK_SIZE", 500))
+
+    # In-process catalog read cache (0 disables it)
+    CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", 256))
+
+    # Periodic jobs (the sweepers, order workers, archival and idempotency
+    # purge below) start with the app only where BACKGROUND_JOBS=true, so
+    # web workers do not each run them; otherwise run one scheduler process
+    # (flask --app run jobs run). Never on in tests.
+    BACKGROUND_JOBS = (
+        FLASK_ENV != "test" and os.getenv("BACKGROUND_JOBS", "false").lower() == "true"
+    )
+
+    # Abandoned cart sweeper: guest lines expire after CART_GUEST_TTL_HOURS,
+    # any line after CART_STALE_TTL_DAYS (interval 0 disables the thread)
+    CART_GUEST_TTL_HOURS = int(os.getenv("CART_GUEST_TTL_HOURS", 24))
+    CART_STALE_TTL_DAYS = int(os.getenv("CART_STALE_TTL_DAYS", 30))
+    CART_SWEEP_CHUNK_SIZE = int(os.getenv("CART_SWEEP_CHUNK_SIZE", 500))
+    CART_SWEEP_INTERVAL_SECONDS = int(
+        os.getenv("CART_SWEEP_INTERVAL_SECONDS", 0 if FLASK_ENV == "test" else 900)
+    )
+
+    # Cart adds hold their quantity in stock for CART_HOLD_MINUTES; the hold
+    # sweeper releases expired holds every CART_HOLD_SWEEP_INTERVAL_SECONDS
+    # (0 disables the thread)
+    CART_HOLD_MINUTES = int(os.getenv("CART_HOLD_MINUTES", 15))
+    CART_HOLD_SWEEP_INTERVAL_SECONDS = int(
+        os.getenv("CART_HOLD_SWEEP_INTERVAL_SECONDS", 0 if FLASK_ENV == "test" else 60)
+    )
+
+    # Queued checkouts (POST /order/place?async=true): ORDER_WORKERS threads
+    # poll every ORDER_QUEUE_POLL_SECONDS (0 workers disables them); a job
+    # stuck processing for ORDER_JOB_TIMEOUT_SECONDS is picked up again
+    ORDER_WORKERS = int(os.getenv("ORDER_WORKERS", 0 if FLASK_ENV == "test" else 2))
+    ORDER_QUEUE_POLL_SECONDS = float(os.getenv("ORDER_QUEUE_POLL_SECONDS", 1))
+    ORDER_JOB_TIMEOUT_SECONDS = int(os.getenv("ORDER_JOB_TIMEOUT_SECONDS", 300))
+
+    # Order archival: orders older than ORDER_HOT_MONTHS move to
+    # orders_archive, archived months older than ORDER_COLD_MONTHS are
+    # exported to gzipped NDJSON in ORDER_ARCHIVE_DIR and dropped (interval 0
+    # disables the thread)
+    ORDER_HOT_MONTHS = int(os.getenv("ORDER_HOT_MONTHS", 6))
+    ORDER_COLD_MONTHS = int(os.getenv("ORDER_COLD_MONTHS", 24))
+    ORDER_ARCHIVE_DIR = os.getenv(
+        "ORDER_ARCHIVE_DIR", os.path.join(os.getcwd(), "archive", "orders")
+    )
+    ORDER_ARCHIVE_INTERVAL_SECONDS = int(
+        os.getenv("ORDER_ARCHIVE_INTERVAL_SECONDS", 0 if FLASK_ENV == "test" else 86400)
+    )
+
+    # Stored responses for Idempotency-Key retries expire after
+    # IDEMPOTENCY_TTL_HOURS (interval 0 disables the purge thread)
+    IDEMPOTENCY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_TTL_HOURS", 24))
+    # A claim still in progress after this long is taken over by a retry; keep
+    # it above the slowest idempotent request
+    IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS = int(
+        os.getenv("IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS", 300)
+    )
+    IDEMPOTENCY_PURGE_INTERVAL_SECONDS = int(
+        os.getenv(
+            "IDEMPOTENCY_PURGE_INTERVAL_SECONDS", 0 if FLASK_ENV == "test" else 3600
+        )
+    )
@@ -0,0 +1,111 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select, text
+
+from app.extensions import db
+from app.migrations import (
+    m0001_initial_schema,
+    m0002_search_index,
+    m0003_hot_path_indexes,
+    m0004_content_hash,
+    m0005_cart_line_key,
+    m0006_cart_added_date_index,
+    m0007_cart_guest_token,
+    m0008_parent_order_totals,
+    m0009_idempotency_keys,
+    m0010_order_history_index,
+    m0011_order_jobs,
+    m0012_sales_daily,
+    m0013_orders_archive,
+    m0014_cart_reservations,
+    m0015_data_versions,
+    m0016_order_version,
+)
+from app.utils.log_config import get_logger
+
+logger = get_logger("migrations")
+
+#: Ordered list of migration modules; each defines ``revision``,
+#: ``description`` and an idempotent ``upgrade()``.
+MIGRATIONS = [
+    m0001_initial_schema,
+    m0002_search_index,
+    m0003_hot_path_indexes,
+    m0004_content_hash,
+    m0005_cart_line_key,
+    m0006_cart_added_date_index,
+    m0007_cart_guest_token,
+    m0008_parent_order_totals,
+    m0009_idempotency_keys,
+    m0010_order_history_index,
+    m0011_order_jobs,
+    m0012_sales_daily,
+    m0013_orders_archive,
+    m0014_cart_reservations,
+    m0015_data_versions,
+    m0016_order_version,
+]
+
+# Arbitrary key for the PostgreSQL advisory lock serializing upgrades.
+_LOCK_KEY = 720_451
+
+_version_table = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String(200), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def applied_versions() -> set[int]:
+    """
+    Return the migration revisions already applied to the database.
+    """
+    _version_table.create(bind=db.session.connection(), checkfirst=True)
+    return set(db.session.execute(select(_version_table.c.version)).scalars())
+
+
+def run_migrations() -> list[int]:
+    """
+    Apply pending migrations in order, one transaction per migration.
+
+    On PostgreSQL an advisory lock keeps concurrently starting workers from
+    applying the same migration twice.
+
+    Returns
+    -------
+    list[int]
+        Revisions applied by this call.
+    """
+    applied = []
+    for migration in MIGRATIONS:
+        try:
+            if db.session.get_bind().dialect.name == "postgresql":
+                db.session.execute(
+                    text("SELECT pg_advisory_xact_lock(:key)"), {"key": _LOCK_KEY}
+                )
+            if migration.revision in applied_versions():
+                db.session.commit()
+                continue
+
+            migration.upgrade()
+            db.session.execute(
+                _version_table.insert().values(
+                    version=migration.revision,
+                    description=migration.description,
+                    applied_at=datetime.utcnow(),
+                )
+            )
+            db.session.commit()
+            applied.append(migration.revision)
+            logger.info(
+                "Migration applied",
+                revision=migration.revision,
+                description=migration.description,
+            )
+        except Exception:
+            db.session.rollback()
+            logger.exception("Migration failed", revision=migration.revision)
+            raise
+    return applied
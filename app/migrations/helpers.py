@@ -0,0 +1,20 @@
+from sqlalchemy import inspect, text
+
+from app.extensions import db
+
+
+def create_indexes(statements: list[str]):
+    """
+    Execute ``CREATE INDEX IF NOT EXISTS`` statements in the current transaction.
+    """
+    for statement in statements:
+        db.session.execute(text(statement))
+
+
+def add_column(table: str, column: str, ddl_type: str):
+    """
+    Execute ``ALTER TABLE ... ADD COLUMN`` unless the column already exists.
+    """
+    existing = {c["name"] for c in inspect(db.session.connection()).get_columns(table)}
+    if column not in existing:
+        db.session.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
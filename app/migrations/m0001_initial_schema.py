@@ -0,0 +1,112 @@
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    MetaData,
+    String,
+    Table,
+)
+
+from app.extensions import db
+
+revision = 1
+description = "Initial schema"
+
+# Frozen copy of the baseline tables; later migrations alter them, so this
+# must not follow the models.
+_metadata = MetaData()
+
+Table(
+    "users",
+    _metadata,
+    Column("user_id", Integer, primary_key=True),
+    Column("name", String(50), nullable=False),
+    Column("email", String(100), unique=True, nullable=False),
+    Column("phone_number", String(10), unique=True, nullable=True),
+)
+
+Table(
+    "fruit",
+    _metadata,
+    Column("fruit_id", Integer, primary_key=True),
+    Column("name", String(50), nullable=False),
+    Column("color", String(50), nullable=False),
+    Column("description", String(200), nullable=True),
+    Column("has_seeds", Boolean),
+    Column("size", String(50), nullable=True),
+    Column("image_url", String(200), nullable=True),
+)
+
+Table(
+    "fruit_info",
+    _metadata,
+    Column("info_id", Integer, primary_key=True),
+    Column(
+        "fruit_id",
+        Integer,
+        ForeignKey("fruit.fruit_id", ondelete="CASCADE"),
+        nullable=False,
+    ),
+    Column("weight", Float, nullable=False),
+    Column("price", Float, nullable=False),
+    Column("total_quantity", Integer, nullable=False),
+    Column("available_quantity", Integer, nullable=True),
+    Column("created_at", DateTime),
+    Column("sell_by_date", DateTime, nullable=False),
+)
+
+Table(
+    "cart",
+    _metadata,
+    Column("cart_id", Integer, primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.user_id"), nullable=False),
+    Column(
+        "fruit_id",
+        Integer,
+        ForeignKey("fruit.fruit_id", ondelete="CASCADE"),
+        nullable=False,
+    ),
+    Column(
+        "info_id",
+        Integer,
+        ForeignKey("fruit_info.info_id", ondelete="CASCADE"),
+        nullable=False,
+    ),
+    Column("quantity", Integer, nullable=False),
+    Column("item_price", Float, nullable=True),
+    Column("added_date", DateTime),
+)
+
+Table(
+    "parent_orders",
+    _metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.user_id"), nullable=False),
+    Column("order_date", DateTime),
+)
+
+Table(
+    "orders",
+    _metadata,
+    Column("order_id", Integer, primary_key=True),
+    Column("parent_order_id", Integer, ForeignKey("parent_orders.id"), nullable=True),
+    Column("user_id", Integer, ForeignKey("users.user_id"), nullable=False),
+    Column(
+        "fruit_id",
+        Integer,
+        ForeignKey("fruit.fruit_id", ondelete="SET NULL"),
+        nullable=True,
+    ),
+    Column("info_id", Integer, ForeignKey("fruit_info.info_id"), nullable=True),
+    Column("is_seeded", Boolean),
+    Column("quantity", Integer, nullable=False),
+    Column("order_date", DateTime),
+    Column("price_by_fruit", Float, nullable=False),
+)
+
+
+def upgrade():
+    _metadata.create_all(bind=db.session.connection(), checkfirst=True)
@@ -0,0 +1,8 @@
+from app.services import search_index
+
+revision = 2
+description = "Fruit name/color search index"
+
+
+def upgrade():
+    search_index.ensure_search_index()
@@ -0,0 +1,26 @@
+from app.migrations.helpers import create_indexes
+
+revision = 3
+description = "Foreign-key and hot filter indexes"
+
+
+def upgrade():
+    create_indexes(
+        [
+            "CREATE INDEX IF NOT EXISTS ix_cart_user_id ON cart (user_id)",
+            "CREATE INDEX IF NOT EXISTS ix_cart_fruit_id ON cart (fruit_id)",
+            "CREATE INDEX IF NOT EXISTS ix_cart_info_id ON cart (info_id)",
+            "CREATE INDEX IF NOT EXISTS ix_fruit_info_fruit_id "
+            "ON fruit_info (fruit_id)",
+            "CREATE INDEX IF NOT EXISTS ix_fruit_info_price ON fruit_info (price)",
+            "CREATE INDEX IF NOT EXISTS ix_fruit_info_weight ON fruit_info (weight)",
+            "CREATE INDEX IF NOT EXISTS ix_orders_user_date "
+            "ON orders (user_id, order_date)",
+            "CREATE INDEX IF NOT EXISTS ix_orders_order_date "
+            "ON orders (order_date, order_id)",
+            "CREATE INDEX IF NOT EXISTS ix_orders_fruit_id ON orders (fruit_id)",
+            "CREATE INDEX IF NOT EXISTS ix_orders_info_id ON orders (info_id)",
+            "CREATE INDEX IF NOT EXISTS ix_parent_orders_user_id "
+            "ON parent_orders (user_id)",
+        ]
+    )
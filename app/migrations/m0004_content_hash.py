@@ -0,0 +1,129 @@
+import hashlib
+from datetime import date, datetime
+
+from sqlalchemy import bindparam, column, select, table, update
+
+from app.extensions import db
+from app.migrations.helpers import add_column, create_indexes
+from app.utils.log_config import get_logger
+
+revision = 4
+description = "Content-hash uniqueness keys for fruit and fruit_info"
+
+logger = get_logger("migrations")
+
+_BATCH_SIZE = 1000
+
+# Frozen copies of the hashing in ``app.models.fruit`` as of this revision;
+# later changes to the models must not change what this migration computes.
+_fruit = table(
+    "fruit",
+    column("fruit_id"),
+    column("name"),
+    column("color"),
+    column("size"),
+    column("has_seeds"),
+    column("description"),
+    column("content_hash"),
+)
+_fruit_info = table(
+    "fruit_info",
+    column("info_id"),
+    column("fruit_id"),
+    column("weight"),
+    column("price"),
+    column("total_quantity"),
+    column("sell_by_date"),
+    column("content_hash"),
+)
+_HASH_FIELDS = {
+    "fruit": ("name", "color", "size", "has_seeds", "description"),
+    "fruit_info": ("fruit_id", "weight", "price", "total_quantity", "sell_by_date"),
+}
+
+
+def _normalize(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, (int, float)):
+        return f"{float(value):.6f}"
+    if isinstance(value, datetime):
+        return value.replace(microsecond=0).isoformat()
+    if isinstance(value, date):
+        return datetime.combine(value, datetime.min.time()).isoformat()
+    return " ".join(str(value).split()).casefold()
+
+
+def _hash_of(table_name: str, row) -> str:
+    values = dict(row)
+    if table_name == "fruit":
+        values["has_seeds"] = bool(values.get("has_seeds"))
+    normalized = "\x1f".join(
+        _normalize(values.get(f)) for f in _HASH_FIELDS[table_name]
+    )
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def _backfill(table, pk):
+    """
+    Hash every row without a ``content_hash``.
+
+    Rows duplicating an already-hashed row keep a NULL hash so the unique
+    index can still be built; they are logged for manual cleanup.
+    """
+    seen = set(
+        db.session.execute(
+            select(table.c.content_hash).where(table.c.content_hash.is_not(None))
+        ).scalars()
+    )
+    rows = db.session.execute(
+        select(pk, *(table.c[f] for f in _HASH_FIELDS[table.name]))
+        .where(table.c.content_hash.is_(None))
+        .order_by(pk)
+    ).mappings()
+
+    stmt = (
+        update(table)
+        .where(pk == bindparam("row_id"))
+        .values(content_hash=bindparam("row_hash"))
+    )
+    batch, duplicates = [], 0
+    for row in rows:
+        row_hash = _hash_of(table.name, row)
+        if row_hash in seen:
+            duplicates += 1
+            continue
+        seen.add(row_hash)
+        batch.append({"row_id": row[pk.name], "row_hash": row_hash})
+        if len(batch) >= _BATCH_SIZE:
+            db.session.execute(stmt, batch)
+            batch = []
+    if batch:
+        db.session.execute(stmt, batch)
+
+    if duplicates:
+        logger.warning(
+            "Duplicate rows left without content hash",
+            table=table.name,
+            count=duplicates,
+        )
+
+
+def upgrade():
+    for table, pk in (
+        (_fruit, _fruit.c.fruit_id),
+        (_fruit_info, _fruit_info.c.info_id),
+    ):
+        add_column(table.name, "content_hash", "VARCHAR(64)")
+        _backfill(table, pk)
+
+    create_indexes(
+        [
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_fruit_content_hash "
+            "ON fruit (content_hash)",
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_fruit_info_content_hash "
+            "ON fruit_info (content_hash)",
+        ]
+    )
@@ -0,0 +1,34 @@
+from sqlalchemy import text
+
+from app.extensions import db
+from app.migrations.helpers import create_indexes
+
+revision = 5
+description = "Unique cart line per user and lot"
+
+
+def upgrade():
+    # Fold duplicate lines into the oldest one before adding the unique key.
+    db.session.execute(
+        text(
+            "UPDATE cart SET "
+            "quantity = (SELECT SUM(d.quantity) FROM cart d "
+            "WHERE d.user_id = cart.user_id AND d.info_id = cart.info_id), "
+            "item_price = (SELECT SUM(d.item_price) FROM cart d "
+            "WHERE d.user_id = cart.user_id AND d.info_id = cart.info_id) "
+            "WHERE cart_id IN (SELECT MIN(cart_id) FROM cart "
+            "GROUP BY user_id, info_id HAVING COUNT(*) > 1)"
+        )
+    )
+    db.session.execute(
+        text(
+            "DELETE FROM cart WHERE cart_id NOT IN "
+            "(SELECT MIN(cart_id) FROM cart GROUP BY user_id, info_id)"
+        )
+    )
+    create_indexes(
+        [
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_cart_user_info "
+            "ON cart (user_id, info_id)",
+        ]
+    )
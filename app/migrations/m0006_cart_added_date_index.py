@@ -0,0 +1,10 @@
+from app.migrations.helpers import create_indexes
+
+revision = 6
+description = "Index cart.added_date for the abandoned cart sweeper"
+
+
+def upgrade():
+    create_indexes(
+        ["CREATE INDEX IF NOT EXISTS ix_cart_added_date ON cart (added_date)"]
+    )
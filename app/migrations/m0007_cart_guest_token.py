@@ -0,0 +1,19 @@
+from sqlalchemy import text
+
+from app.extensions import db
+from app.migrations.helpers import add_column, create_indexes
+
+revision = 7
+description = "Per-visitor guest cart tokens"
+
+
+def upgrade():
+    # Existing guest lines keep the empty token, as do registered users.
+    add_column("cart", "guest_token", "VARCHAR(64) NOT NULL DEFAULT ''")
+    db.session.execute(text("DROP INDEX IF EXISTS ix_cart_user_info"))
+    create_indexes(
+        [
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_cart_owner_info "
+            "ON cart (guest_token, user_id, info_id)",
+        ]
+    )
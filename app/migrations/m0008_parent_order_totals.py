@@ -0,0 +1,14 @@
+from app.migrations.helpers import add_column, create_indexes
+
+revision = 8
+description = "Stored parent order totals and order-line lookup by parent"
+
+
+def upgrade():
+    add_column("parent_orders", "total_amount", "FLOAT")
+    create_indexes(
+        [
+            "CREATE INDEX IF NOT EXISTS ix_orders_parent_order_id "
+            "ON orders (parent_order_id)",
+        ]
+    )
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, Text
+
+from app.extensions import db
+
+revision = 9
+description = "Idempotency keys for retried POST requests"
+
+_idempotency_keys = Table(
+    "idempotency_keys",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("key", String(255), nullable=False),
+    Column("scope", String(255), nullable=False),
+    Column("fingerprint", String(64), nullable=False),
+    Column("status_code", Integer, nullable=True),
+    Column("response_body", Text, nullable=True),
+    Column("response_headers", Text, nullable=True),
+    Column("created_at", DateTime, nullable=False, index=True),
+    Index("ix_idempotency_scope_key", "scope", "key", unique=True),
+)
+
+
+def upgrade():
+    _idempotency_keys.create(bind=db.session.connection(), checkfirst=True)
@@ -0,0 +1,22 @@
+from sqlalchemy import text
+
+from app.extensions import db
+from app.migrations.helpers import create_indexes
+from app.utils.dialect import dialect_name
+
+revision = 10
+description = "Covering index for keyset-paged order history"
+
+_PAYLOAD = "fruit_id, info_id, is_seeded, quantity, price_by_fruit"
+
+
+def upgrade():
+    include = f" INCLUDE ({_PAYLOAD})" if dialect_name() == "postgresql" else ""
+    create_indexes(
+        [
+            "CREATE INDEX IF NOT EXISTS ix_orders_user_history "
+            f"ON orders (user_id, order_date DESC, order_id DESC){include}",
+        ]
+    )
+    # Superseded: ix_orders_user_history leads with the same columns.
+    db.session.execute(text("DROP INDEX IF EXISTS ix_orders_user_date"))
@@ -0,0 +1,41 @@
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+)
+
+from app.extensions import db
+
+revision = 11
+description = "Queue table for asynchronous checkouts"
+
+_metadata = MetaData()
+# Referenced tables, for the foreign keys only.
+Table("users", _metadata, Column("user_id", Integer, primary_key=True))
+Table("parent_orders", _metadata, Column("id", Integer, primary_key=True))
+
+_order_jobs = Table(
+    "order_jobs",
+    _metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.user_id"), nullable=False),
+    Column("cart_ids", Text, nullable=False),
+    Column("status", String(16), nullable=False),
+    Column("parent_order_id", Integer, ForeignKey("parent_orders.id"), nullable=True),
+    Column("result", Text, nullable=True),
+    Column("error", String(255), nullable=True),
+    Column("created_at", DateTime),
+    Column("claimed_at", DateTime, nullable=True),
+    Column("finished_at", DateTime, nullable=True),
+    Index("ix_order_jobs_status_id", "status", "id"),
+)
+
+
+def upgrade():
+    _order_jobs.create(bind=db.session.connection(), checkfirst=True)
@@ -0,0 +1,63 @@
+from sqlalchemy import (
+    Column,
+    Date,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    MetaData,
+    Table,
+    func,
+    select,
+)
+
+from app.extensions import db
+
+revision = 12
+description = "Daily sales rollup per fruit"
+
+_metadata = MetaData()
+
+_sales_daily = Table(
+    "sales_daily",
+    _metadata,
+    Column("day", Date, primary_key=True),
+    Column("fruit_id", Integer, primary_key=True, autoincrement=False),
+    Column("order_lines", Integer, nullable=False),
+    Column("quantity", Integer, nullable=False),
+    Column("revenue", Float, nullable=False),
+    Index("ix_sales_daily_fruit_day", "fruit_id", "day"),
+)
+
+# The orders columns the backfill reads, as of this revision.
+_orders = Table(
+    "orders",
+    _metadata,
+    Column("order_id", Integer, primary_key=True),
+    Column("fruit_id", Integer),
+    Column("quantity", Integer),
+    Column("order_date", DateTime),
+    Column("price_by_fruit", Float),
+)
+
+
+def upgrade():
+    _sales_daily.create(bind=db.session.connection(), checkfirst=True)
+    if db.session.execute(select(_sales_daily.c.day).limit(1)).first():
+        return
+
+    day = func.date(_orders.c.order_date)
+    db.session.execute(
+        _sales_daily.insert().from_select(
+            ["day", "fruit_id", "order_lines", "quantity", "revenue"],
+            select(
+                day,
+                _orders.c.fruit_id,
+                func.count(_orders.c.order_id),
+                func.sum(_orders.c.quantity),
+                func.sum(_orders.c.quantity * _orders.c.price_by_fruit),
+            )
+            .where(_orders.c.fruit_id.is_not(None))
+            .group_by(day, _orders.c.fruit_id),
+        )
+    )
@@ -0,0 +1,43 @@
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    MetaData,
+    Table,
+    text,
+)
+
+from app.extensions import db
+
+revision = 13
+description = "Archive table for cold orders (monthly partitions on PostgreSQL)"
+
+_orders_archive = Table(
+    "orders_archive",
+    MetaData(),
+    Column("order_id", Integer, primary_key=True, autoincrement=False),
+    Column("order_date", DateTime, primary_key=True),
+    Column("parent_order_id", Integer, nullable=True),
+    Column("user_id", Integer, nullable=False),
+    Column("fruit_id", Integer, nullable=True),
+    Column("info_id", Integer, nullable=True),
+    Column("is_seeded", Boolean),
+    Column("quantity", Integer, nullable=False),
+    Column("price_by_fruit", Float, nullable=False),
+    Index(
+        "ix_orders_archive_user_history",
+        "user_id",
+        text("order_date DESC"),
+        text("order_id DESC"),
+    ),
+    Index("ix_orders_archive_order_date", "order_date", "order_id"),
+    Index("ix_orders_archive_fruit_id", "fruit_id"),
+    postgresql_partition_by="RANGE (order_date)",
+)
+
+
+def upgrade():
+    _orders_archive.create(bind=db.session.connection(), checkfirst=True)
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, DateTime, Integer, MetaData, Table
+
+from app.extensions import db
+
+revision = 14
+description = "Stock holds for cart lines"
+
+_cart_reservations = Table(
+    "cart_reservations",
+    MetaData(),
+    Column("cart_id", Integer, primary_key=True, autoincrement=False),
+    Column("info_id", Integer, nullable=False),
+    Column("quantity", Integer, nullable=False),
+    Column("expires_at", DateTime, nullable=False, index=True),
+)
+
+
+def upgrade():
+    _cart_reservations.create(bind=db.session.connection(), checkfirst=True)
@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select
+
+from app.extensions import db
+
+revision = 15
+description = "Shared change counters for cache validators"
+
+_data_versions = Table(
+    "data_versions",
+    MetaData(),
+    Column("name", String(64), primary_key=True),
+    Column("version", Integer, nullable=False, default=0),
+    Column("updated_at", DateTime, nullable=False),
+)
+
+
+def upgrade():
+    _data_versions.create(bind=db.session.connection(), checkfirst=True)
+    exists = db.session.execute(
+        select(_data_versions.c.name).where(_data_versions.c.name == "catalog")
+    ).first()
+    if not exists:
+        db.session.execute(
+            _data_versions.insert().values(
+                name="catalog", version=1, updated_at=datetime.utcnow()
+            )
+        )
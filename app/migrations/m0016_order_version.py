@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select
+
+from app.extensions import db
+
+revision = 16
+description = "Change counter for the order list validators"
+
+_data_versions = Table(
+    "data_versions",
+    MetaData(),
+    Column("name", String(64), primary_key=True),
+    Column("version", Integer, nullable=False, default=0),
+    Column("updated_at", DateTime, nullable=False),
+)
+
+
+def upgrade():
+    exists = db.session.execute(
+        select(_data_versions.c.name).where(_data_versions.c.name == "orders")
+    ).first()
+    if not exists:
+        db.session.execute(
+            _data_versions.insert().values(
+                name="orders", version=1, updated_at=datetime.utcnow()
+            )
+        )
@@ -0,0 +1,177 @@
+from datetime import datetime
+
+from sqlalchemy import select, text, tuple_
+
+from app.extensions import db
+from app.utils.log_config import get_logger
+
+logger = get_logger("query_plans")
+
+
+def hot_queries() -> list[tuple]:
+    """
+    Return ``(name, statement, index_name)`` for every hot query.
+
+    Each statement mirrors a filter used by the services and must be served
+    by the named index.
+    """
+    from app.models.cart import Cart, CartReservation
+    from app.models.fruit import Fruit, FruitInfo
+    from app.models.idempotency import IdempotencyKey
+    from app.models.orders import Order, OrderJob
+    from app.models.sales import SalesDaily
+
+    return [
+        (
+            "cart_by_user",
+            select(Cart.cart_id).where(Cart.user_id == 1),
+            "ix_cart_user_id",
+        ),
+        (
+            "cart_by_fruit",
+            select(Cart.cart_id).where(Cart.fruit_id == 1),
+            "ix_cart_fruit_id",
+        ),
+        (
+            "cart_by_info",
+            select(Cart.cart_id).where(Cart.info_id == 1),
+            "ix_cart_info_id",
+        ),
+        (
+            "cart_by_guest_token",
+            select(Cart.cart_id).where(Cart.guest_token == "token", Cart.user_id == -1),
+            "ix_cart_owner_info",
+        ),
+        (
+            "cart_sweep",
+            select(Cart.cart_id)
+            .where(Cart.added_date < datetime(2000, 1, 1))
+            .order_by(Cart.added_date),
+            "ix_cart_added_date",
+        ),
+        (
+            "cart_hold_sweep",
+            select(CartReservation.cart_id)
+            .where(CartReservation.expires_at < datetime(2000, 1, 1))
+            .order_by(CartReservation.expires_at),
+            "ix_cart_reservations_expires_at",
+        ),
+        (
+            "fruit_by_content_hash",
+            select(Fruit.fruit_id).where(Fruit.content_hash == "0" * 64),
+            "ix_fruit_content_hash",
+        ),
+        (
+            "fruit_info_by_content_hash",
+            select(FruitInfo.info_id).where(FruitInfo.content_hash == "0" * 64),
+            "ix_fruit_info_content_hash",
+        ),
+        (
+            "fruit_info_by_fruit",
+            select(FruitInfo.info_id).where(FruitInfo.fruit_id == 1),
+            "ix_fruit_info_fruit_id",
+        ),
+        (
+            "fruit_info_price_range",
+            select(FruitInfo.info_id).where(FruitInfo.price.between(1.0, 5.0)),
+            "ix_fruit_info_price",
+        ),
+        (
+            "fruit_info_weight_range",
+            select(FruitInfo.info_id).where(FruitInfo.weight.between(1.0, 5.0)),
+            "ix_fruit_info_weight",
+        ),
+        (
+            "idempotency_key_lookup",
+            select(IdempotencyKey.status_code).where(
+                IdempotencyKey.scope == "POST /order/place/1",
+                IdempotencyKey.key == "key",
+            ),
+            "ix_idempotency_scope_key",
+        ),
+        (
+            "idempotency_key_purge",
+            select(IdempotencyKey.id).where(
+                IdempotencyKey.created_at < datetime(2000, 1, 1)
+            ),
+            "ix_idempotency_keys_created_at",
+        ),
+        (
+            "order_job_claim",
+            select(OrderJob.id)
+            .where(OrderJob.status == OrderJob.QUEUED)
+            .order_by(OrderJob.id)
+            .limit(1),
+            "ix_order_jobs_status_id",
+        ),
+        (
+            "order_history",
+            select(Order.order_id)
+            .where(
+                Order.user_id == 1,
+                tuple_(Order.order_date, Order.order_id) < (datetime(2000, 1, 1), 1),
+            )
+            .order_by(Order.order_date.desc(), Order.order_id.desc()),
+            "ix_orders_user_history",
+        ),
+        (
+            "sales_by_fruit",
+            select(SalesDaily.day).where(
+                SalesDaily.fruit_id == 1,
+                SalesDaily.day.between(datetime(2000, 1, 1), datetime(2000, 1, 7)),
+            ),
+            "ix_sales_daily_fruit_day",
+        ),
+        (
+            "orders_by_fruit",
+            select(Order.order_id).where(Order.fruit_id == 1),
+            "ix_orders_fruit_id",
+        ),
+    ]
+
+
+def explain(statement) -> str:
+    """
+    Return the database's query plan for ``statement`` as text.
+
+    On PostgreSQL sequential scans are disabled for the check, so the plan
+    shows whether an index *can* serve the query regardless of table size.
+    """
+    dialect = db.session.get_bind().dialect
+    sql = str(
+        statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+    )
+
+    if dialect.name == "postgresql":
+        db.session.execute(text("SET LOCAL enable_seqscan = off"))
+        rows = db.session.execute(text(f"EXPLAIN {sql}")).scalars().all()
+        return "\n".join(rows)
+
+    # Cached EXPLAIN statements are not re-planned after DDL, so tag the SQL
+    # with the schema version to get a fresh statement whenever it changes.
+    schema_version = db.session.execute(text("PRAGMA schema_version")).scalar()
+    rows = db.session.execute(
+        text(f"EXPLAIN QUERY PLAN /* schema {schema_version} */ {sql}")
+    ).all()
+    return "\n".join(row[-1] for row in rows)
+
+
+def check_query_plans() -> list[str]:
+    """
+    Verify every hot query is planned with its index.
+
+    Returns
+    -------
+    list[str]
+        One message per query that no longer uses its index; empty if all pass.
+    """
+    failures = []
+    try:
+        for name, statement, index_name in hot_queries():
+            plan = explain(statement)
+            if index_name not in plan:
+                failures.append(f"{name}: expected {index_name}, got plan: {plan}")
+                logger.warning("Hot query not using index", query=name, plan=plan)
+    finally:
+        db.session.rollback()
+    return failures
@@ -3,19 +3,37 @@ from app import db
 
 class Cart(db.Model):
     __tablename__ = "cart"
+    __table_args__ = (
+        # One line per lot per owner (user, or guest visitor token); adds merge
+        # into it (see cart_service). Leading with guest_token also makes this
+        # the lookup index for a single guest's lines.
+        db.Index(
+            "ix_cart_owner_info", "guest_token", "user_id", "info_id", unique=True
+        ),
+    )
+
     cart_id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("users.user_id"), nullable=False)
+    user_id = db.Column(
+        db.Integer, db.ForeignKey("users.user_id"), nullable=False, index=True
+    )
     fruit_id = db.Column(
-        db.Integer, db.ForeignKey("fruit.fruit_id", ondelete="CASCADE"), nullable=False
+        db.Integer,
+        db.ForeignKey("fruit.fruit_id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
     )
     info_id = db.Column(
         db.Integer,
         db.ForeignKey("fruit_info.info_id", ondelete="CASCADE"),
         nullable=False,
+        index=True,
+    )
+    guest_token = db.Column(
+        db.String(64), nullable=False, default="", server_default=""
     )
     quantity = db.Column(db.Integer, nullable=False)
     item_price = db.Column(db.Float, nullable=True)
-    added_date = db.Column(db.DateTime, default=db.func.current_timestamp())
+    added_date = db.Column(db.DateTime, default=db.func.current_timestamp(), index=True)
 
     user = db.relationship("User", backref="cart")
     fruit = db.relationship("Fruit", backref=db.backref("cart", passive_deletes=True))
@@ -45,3 +63,28 @@ class Cart(db.Model):
             "fruit_name": self.fruit.name if self.fruit else None,
             "image_url": self.fruit.image_url if self.fruit else None,
         }
+
+
+class CartReservation(db.Model):
+    """
+    Stock held for a cart line until ``expires_at``.
+
+    The held quantity is taken out of ``FruitInfo.available_quantity`` when
+    the line is added; checkout converts the hold into the order and the
+    hold sweeper puts expired holds back (see ``reservation_service``).
+    """
+
+    __tablename__ = "cart_reservations"
+
+    # No foreign keys: holds are released (stock returned) by the services
+    # before their cart lines go, and orphans are swept once they expire.
+    cart_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    info_id = db.Column(db.Integer, nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return (
+            f"<CartReservation Cart: {self.cart_id}, Lot: {self.info_id}, "
+            f"Quantity: {self.quantity}, Expires: {self.expires_at}>"
+        )
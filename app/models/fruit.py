@@ -1,8 +1,37 @@
-from datetime import datetime
+import hashlib
+from datetime import date, datetime
+
+from sqlalchemy import event
 
 from app import db
 
 
+def _normalize(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, (int, float)):
+        return f"{float(value):.6f}"
+    if isinstance(value, datetime):
+        return value.replace(microsecond=0).isoformat()
+    if isinstance(value, date):
+        return datetime.combine(value, datetime.min.time()).isoformat()
+    return " ".join(str(value).split()).casefold()
+
+
+def content_hash(*values) -> str:
+    """
+    Hash ``values`` into a normalized duplicate-detection key.
+
+    Strings are trimmed and case-folded, numbers compared to six decimals and
+    dates at second precision, so records that only differ in formatting
+    share a key.
+    """
+    normalized = "\x1f".join(_normalize(v) for v in values)
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
 class Fruit(db.Model):
     __tablename__ = "fruit"
     fruit_id = db.Column(db.Integer, primary_key=True)
@@ -12,6 +41,10 @@ class Fruit(db.Model):
     has_seeds = db.Column(db.Boolean, default=False)
     size = db.Column(db.String(50), nullable=True)
     image_url = db.Column(db.String(200), nullable=True)
+    content_hash = db.Column(db.String(64), nullable=True, unique=True, index=True)
+
+    #: Columns that identify a fruit for duplicate detection.
+    HASH_FIELDS = ("name", "color", "size", "has_seeds", "description")
 
     fruit_info = db.relationship(
         "FruitInfo",
@@ -21,18 +54,22 @@ class Fruit(db.Model):
         passive_deletes=True,
     )
 
-    def exists(self):
-        filters = {
-            "name": self.name,
-            "color": self.color,
-            "size": self.size,
-            "has_seeds": self.has_seeds,
-        }
+    @classmethod
+    def hash_of(cls, values: dict) -> str:
+        """
+        Content hash of a fruit given as a dict of ``HASH_FIELDS``.
+        """
+        values = {**values, "has_seeds": bool(values.get("has_seeds"))}
+        return content_hash(*(values.get(f) for f in cls.HASH_FIELDS))
 
-        if self.description is not None:
-            filters["description"] = self.description
+    def compute_content_hash(self) -> str:
+        return self.hash_of({f: getattr(self, f) for f in self.HASH_FIELDS})
 
-        return Fruit.query.filter_by(**filters).first() is not None
+    def exists(self):
+        return (
+            Fruit.query.filter_by(content_hash=self.compute_content_hash()).first()
+            is not None
+        )
 
     def to_dict(self):
         return {
@@ -50,28 +87,47 @@ class FruitInfo(db.Model):
     __tablename__ = "fruit_info"
     info_id = db.Column(db.Integer, primary_key=True)
     fruit_id = db.Column(
-        db.Integer, db.ForeignKey("fruit.fruit_id", ondelete="CASCADE"), nullable=False
+        db.Integer,
+        db.ForeignKey("fruit.fruit_id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
     )
-    weight = db.Column(db.Float, nullable=False)
-    price = db.Column(db.Float, nullable=False)
+    weight = db.Column(db.Float, nullable=False, index=True)
+    price = db.Column(db.Float, nullable=False, index=True)
     total_quantity = db.Column(db.Integer, nullable=False)
     available_quantity = db.Column(db.Integer, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     sell_by_date = db.Column(db.DateTime, nullable=False)
+    content_hash = db.Column(db.String(64), nullable=True, unique=True, index=True)
+
+    #: Columns that identify a lot for duplicate detection.
+    HASH_FIELDS = ("fruit_id", "weight", "price", "total_quantity", "sell_by_date")
 
     fruit = db.relationship("Fruit", back_populates="fruit_info")
 
+    @classmethod
+    def hash_of(cls, values: dict) -> str:
+        """
+        Content hash of a lot given as a dict of ``HASH_FIELDS``.
+        """
+        return content_hash(*(values.get(f) for f in cls.HASH_FIELDS))
+
+    def compute_content_hash(self) -> str:
+        return self.hash_of({f: getattr(self, f) for f in self.HASH_FIELDS})
+
     def exists(self):
         return (
-            FruitInfo.query.filter_by(
-                fruit_id=self.fruit_id,
-                weight=self.weight,
-                price=self.price,
-                total_quantity=self.total_quantity,
-                sell_by_date=self.sell_by_date,
-            ).first()
+            FruitInfo.query.filter_by(content_hash=self.compute_content_hash()).first()
             is not None
         )
 
     def __repr__(self):
         return f"<FruitInfo {self.fruit_id}, Weight: {self.weight}, Price: {self.price}, Quantity: {self.total_quantity}>"
+
+
+@event.listens_for(Fruit, "before_insert")
+@event.listens_for(Fruit, "before_update")
+@event.listens_for(FruitInfo, "before_insert")
+@event.listens_for(FruitInfo, "before_update")
+def _set_content_hash(mapper, connection, target):
+    target.content_hash = target.compute_content_hash()
@@ -0,0 +1,33 @@
+from app import db
+
+
+class IdempotencyKey(db.Model):
+    """
+    Stored outcome of a request sent with an ``Idempotency-Key`` header.
+
+    A row is claimed (``status_code`` NULL) before the request runs and
+    completed with the response afterwards; replays within the TTL return
+    the stored response (see ``app.utils.idempotency``).
+    """
+
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        db.Index("ix_idempotency_scope_key", "scope", "key", unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(255), nullable=False)
+    # User hash, method and path the key was used with, e.g.
+    # "3f2a9c0d1e4b5a67 POST /order/place/7"
+    scope = db.Column(db.String(255), nullable=False)
+    # sha256 of the request, so a key reused for a different body is rejected
+    fingerprint = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer, nullable=True)
+    response_body = db.Column(db.Text, nullable=True)
+    response_headers = db.Column(db.Text, nullable=True)
+    created_at = db.Column(
+        db.DateTime, default=db.func.current_timestamp(), nullable=False, index=True
+    )
+
+    def __repr__(self):
+        return f"<IdempotencyKey {self.scope} {self.key}, Status: {self.status_code}>"
@@ -6,8 +6,11 @@ from app.models.users import User
 class ParentOrder(db.Model):
     __tablename__ = "parent_orders"
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("users.user_id"), nullable=False)
+    user_id = db.Column(
+        db.Integer, db.ForeignKey("users.user_id"), nullable=False, index=True
+    )
     order_date = db.Column(db.DateTime, default=db.func.current_timestamp())
+    total_amount = db.Column(db.Float, nullable=True)
 
     user = db.relationship("User", backref="parent_orders")
     items = db.relationship("Order", backref="parent_order", lazy=True)
@@ -15,15 +18,40 @@ class ParentOrder(db.Model):
 
 class Order(db.Model):
     __tablename__ = "orders"
+    __table_args__ = (
+        # Order history pages: filter, newest-first order and keyset seek in
+        # one index; on PostgreSQL the payload columns are included so pages
+        # are index-only scans.
+        db.Index(
+            "ix_orders_user_history",
+            "user_id",
+            db.text("order_date DESC"),
+            db.text("order_id DESC"),
+            postgresql_include=[
+                "fruit_id",
+                "info_id",
+                "is_seeded",
+                "quantity",
+                "price_by_fruit",
+            ],
+        ),
+        db.Index("ix_orders_order_date", "order_date", "order_id"),
+    )
+
     order_id = db.Column(db.Integer, primary_key=True)
     parent_order_id = db.Column(
-        db.Integer, db.ForeignKey("parent_orders.id"), nullable=True
+        db.Integer, db.ForeignKey("parent_orders.id"), nullable=True, index=True
     )
     user_id = db.Column(db.Integer, db.ForeignKey("users.user_id"), nullable=False)
     fruit_id = db.Column(
-        db.Integer, db.ForeignKey("fruit.fruit_id", ondelete="SET NULL"), nullable=True
+        db.Integer,
+        db.ForeignKey("fruit.fruit_id", ondelete="SET NULL"),
+        nullable=True,
+        index=True,
+    )
+    info_id = db.Column(
+        db.Integer, db.ForeignKey("fruit_info.info_id"), nullable=True, index=True
     )
-    info_id = db.Column(db.Integer, db.ForeignKey("fruit_info.info_id"), nullable=True)
     is_seeded = db.Column(db.Boolean, default=False)
     quantity = db.Column(db.Integer, nullable=False)
     order_date = db.Column(db.DateTime, default=db.func.current_timestamp())
@@ -68,3 +96,77 @@ class Order(db.Model):
             "price_by_fruit": self.price_by_fruit,
             "total_price": self.total_price,
         }
+
+
+class OrderArchive(db.Model):
+    """
+    Orders older than ``ORDER_HOT_MONTHS``, moved out of ``orders`` a month
+    at a time by ``archive_service``.
+
+    On PostgreSQL the table is natively partitioned by month of
+    ``order_date`` (``orders_archive_YYYY_MM``); on SQLite it is a plain
+    table and a month is a range of its ``order_date`` index. Columns match
+    ``orders`` so the same projections read both.
+    """
+
+    __tablename__ = "orders_archive"
+    __table_args__ = (
+        db.Index(
+            "ix_orders_archive_user_history",
+            "user_id",
+            db.text("order_date DESC"),
+            db.text("order_id DESC"),
+        ),
+        db.Index("ix_orders_archive_order_date", "order_date", "order_id"),
+        db.Index("ix_orders_archive_fruit_id", "fruit_id"),
+        {"postgresql_partition_by": "RANGE (order_date)"},
+    )
+
+    # The partition key must be part of the primary key on PostgreSQL.
+    order_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    order_date = db.Column(db.DateTime, primary_key=True)
+    parent_order_id = db.Column(db.Integer, nullable=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    fruit_id = db.Column(db.Integer, nullable=True)
+    info_id = db.Column(db.Integer, nullable=True)
+    is_seeded = db.Column(db.Boolean, default=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    price_by_fruit = db.Column(db.Float, nullable=False)
+
+    def __repr__(self):
+        return f"<OrderArchive {self.order_id}, User: {self.user_id}, Date: {self.order_date}>"
+
+
+class OrderJob(db.Model):
+    """
+    A checkout queued by ``POST /order/place?async=true``.
+
+    Workers claim ``queued`` jobs oldest first, run the checkout and record
+    the outcome in the same transaction (see ``order_service``).
+    """
+
+    __tablename__ = "order_jobs"
+    __table_args__ = (db.Index("ix_order_jobs_status_id", "status", "id"),)
+
+    QUEUED = "queued"
+    PROCESSING = "processing"
+    DONE = "done"
+    FAILED = "failed"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.user_id"), nullable=False)
+    # JSON list of the cart line ids to check out
+    cart_ids = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(16), nullable=False, default=QUEUED)
+    parent_order_id = db.Column(
+        db.Integer, db.ForeignKey("parent_orders.id"), nullable=True
+    )
+    # JSON order summary once done
+    result = db.Column(db.Text, nullable=True)
+    error = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<OrderJob {self.id}, User: {self.user_id}, Status: {self.status}>"
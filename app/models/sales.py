@@ -0,0 +1,26 @@
+from app import db
+
+
+class SalesDaily(db.Model):
+    """
+    Order totals per day and fruit.
+
+    Kept up to date by every checkout (see ``order_service``) and rebuilt
+    from ``orders`` by ``analytics_service.rebuild_sales_daily``; analytics
+    endpoints read only this table.
+    """
+
+    __tablename__ = "sales_daily"
+    __table_args__ = (db.Index("ix_sales_daily_fruit_day", "fruit_id", "day"),)
+
+    day = db.Column(db.Date, primary_key=True)
+    # No foreign key: rows are removed with the fruit's orders (delete_fruits)
+    fruit_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    order_lines = db.Column(db.Integer, nullable=False, default=0)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return (
+            f"<SalesDaily {self.day} Fruit: {self.fruit_id}, Revenue: {self.revenue}>"
+        )
@@ -0,0 +1,21 @@
+from app import db
+
+
+class DataVersion(db.Model):
+    """
+    Change counter for a cached or revalidated resource.
+
+    Writers bump the row in the same transaction as the change, or right
+    after it for checkout (see ``version_service``), so every process
+    derives the same validators and notices other processes' writes with a
+    primary-key read.
+    """
+
+    __tablename__ = "data_versions"
+
+    name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<DataVersion {self.name}: {self.version}>"
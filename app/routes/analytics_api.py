@@ -0,0 +1,56 @@
+from flasgger import swag_from
+from flask import Blueprint, jsonify, request
+from pydantic import ValidationError
+
+from app.services import analytics_service
+from app.utils.log_config import get_logger
+from app.validations.analytics_validation import (
+    RevenueQueryValidation,
+    TopSellersQueryValidation,
+)
+
+analytics_bp = Blueprint("analytics_bp", __name__)
+logger = get_logger("analytics_routes")
+
+# -----------------------------------------------
+# Revenue per Fruit per Day
+# -----------------------------------------------
+
+
+@analytics_bp.route("/revenue", methods=["GET"])
+@swag_from("swagger_docs/analytics/get_revenue.yml")
+def get_revenue():
+    try:
+        validated = RevenueQueryValidation(**request.args.to_dict())
+        rows = analytics_service.get_revenue_by_day(
+            validated.start, validated.end, validated.fruit_id
+        )
+        return jsonify(rows), 200
+    except ValidationError as ve:
+        logger.warning("Validation error in revenue report", errors=ve.errors())
+        return jsonify({"error": ve.errors(include_context=False)}), 400
+    except Exception as e:
+        logger.exception("Failed to build revenue report")
+        return jsonify({"error": str(e)}), 500
+
+
+# -----------------------------------------------
+# Top Sellers
+# -----------------------------------------------
+
+
+@analytics_bp.route("/top-sellers", methods=["GET"])
+@swag_from("swagger_docs/analytics/get_top_sellers.yml")
+def get_top_sellers():
+    try:
+        validated = TopSellersQueryValidation(**request.args.to_dict())
+        rows = analytics_service.get_top_sellers(
+            validated.start, validated.end, limit=validated.limit, by=validated.by
+        )
+        return jsonify(rows), 200
+    except ValidationError as ve:
+        logger.warning("Validation error in top sellers report", errors=ve.errors())
+        return jsonify({"error": ve.errors(include_context=False)}), 400
+    except Exception as e:
+        logger.exception("Failed to build top sellers report")
+        return jsonify({"error": str(e)}), 500
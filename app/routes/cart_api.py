@@ -6,12 +6,46 @@ from app.extensions import db
 from app.models.cart import Cart
 from app.models.users import User
 from app.services import cart_service
+from app.services.reservation_service import OutOfStockError
+from app.utils.guest_token import GUEST_TOKEN_HEADER, get_guest_token, new_guest_token
+from app.utils.idempotency import idempotent
 from app.utils.log_config import get_logger
-from app.validations.cart_validation import CartAddValidation, CartUpdateValidation
+from app.validations.cart_validation import (
+    CartAddValidation,
+    CartBatchAddValidation,
+    CartUpdateValidation,
+)
 
 cart_bp = Blueprint("cart_bp", __name__)
 logger = get_logger("cart_routes")
 
+
+def _guest_token_for(user_id: int, issue: bool = False) -> str | None:
+    """
+    The request's guest cart token when acting as the guest user.
+
+    With ``issue`` a new token is created for a guest without one.
+    """
+    if user_id != cart_service.GUEST_USER_ID:
+        return None
+    token = get_guest_token()
+    return token or (new_guest_token() if issue else None)
+
+
+def _guest_token_headers(token: str | None) -> dict:
+    return {GUEST_TOKEN_HEADER: token} if token else {}
+
+
+def _missing_guest_token(user_id: int):
+    """
+    A 401 response when the guest cart is accessed without a token.
+    """
+    if user_id == cart_service.GUEST_USER_ID and not get_guest_token():
+        logger.warning("Guest cart accessed without a token")
+        return jsonify({"error": f"{GUEST_TOKEN_HEADER} header is required"}), 401
+    return None
+
+
 # -----------------------------------------------
 # Add Cart Item
 # -----------------------------------------------
@@ -19,21 +53,30 @@ logger = get_logger("cart_routes")
 
 @cart_bp.route("/add", methods=["POST"])
 @swag_from("swagger_docs/cart/add_cart_item.yml")
+@idempotent
 def add_cart_item():
     try:
         data = request.get_json()
         logger.info("Cart add request received", data=data)
 
         validated = CartAddValidation(**data)
+        guest_token = _guest_token_for(validated.user_id, issue=True)
         item = cart_service.add_to_cart(
-            validated.user_id, validated.fruit_id, validated.quantity
+            validated.user_id,
+            validated.fruit_id,
+            validated.quantity,
+            guest_token=guest_token,
         )
 
-        return jsonify(item.as_dict()), 201
+        return jsonify(item.as_dict()), 201, _guest_token_headers(guest_token)
     except ValidationError as ve:
         logger.warning("Validation error in cart add", errors=ve.errors())
         return jsonify({"error": ve.errors()}), 400  # ✅ Correct status code
 
+    except OutOfStockError as e:
+        logger.warning("Not enough stock for cart add", exception=str(e))
+        return jsonify({"error": str(e)}), 409
+
     except ValueError as ve:
         logger.warning("Business logic error in cart add", exception=str(ve))
         return jsonify({"error": str(ve)}), 404
@@ -43,6 +86,44 @@ def add_cart_item():
         return jsonify({"error": "Internal Server Error"}), 500
 
 
+# -----------------------------------------------
+# Add Cart Items in Batch
+# -----------------------------------------------
+
+
+@cart_bp.route("/add-batch", methods=["POST"])
+@swag_from("swagger_docs/cart/add_cart_items_batch.yml")
+def add_cart_items_batch():
+    try:
+        data = request.get_json()
+        logger.info("Cart batch add request received", data=data)
+
+        validated = CartBatchAddValidation(**data)
+        guest_token = _guest_token_for(validated.user_id, issue=True)
+        items = cart_service.add_to_cart_batch(
+            validated.user_id,
+            [item.model_dump() for item in validated.items],
+            guest_token=guest_token,
+        )
+
+        return jsonify(items), 201, _guest_token_headers(guest_token)
+    except ValidationError as ve:
+        logger.warning("Validation error in cart batch add", errors=ve.errors())
+        return jsonify({"error": ve.errors()}), 400
+
+    except OutOfStockError as e:
+        logger.warning("Not enough stock for cart batch add", exception=str(e))
+        return jsonify({"error": str(e)}), 409
+
+    except ValueError as ve:
+        logger.warning("Business logic error in cart batch add", exception=str(ve))
+        return jsonify({"error": str(ve)}), 404
+
+    except Exception as e:
+        logger.error("Unhandled exception in cart batch add", exception=str(e))
+        return jsonify({"error": "Internal Server Error"}), 500
+
+
 # -----------------------------------------------
 # Associate Cart with User
 # -----------------------------------------------
@@ -65,8 +146,13 @@ def associate_cart():
         logger.warning("Target user not found", user_id=new_user_id)
         return jsonify({"error": "Target user not found"}), 404
 
-    updated = Cart.query.filter_by(user_id=old_user_id).update({"user_id": new_user_id})
-    db.session.commit()
+    try:
+        updated = cart_service.associate_cart(
+            old_user_id, new_user_id, guest_token=_guest_token_for(old_user_id)
+        )
+    except ValueError as ve:
+        logger.warning("Invalid associate-cart request", error=str(ve))
+        return jsonify({"error": str(ve)}), 400
     logger.info("Cart reassignment complete", updated=updated)
     return (
         jsonify(
@@ -89,14 +175,18 @@ def get_cart_items(user_id):
     except ValueError:
         logger.warning("Invalid user ID format", user_id=user_id)
         return jsonify({"error": "Invalid user ID"}), 400
+    missing_token = _missing_guest_token(user_id)
+    if missing_token:
+        return missing_token
 
-    cart_items = Cart.query.filter_by(user_id=user_id).all()
+    cart_items = cart_service.get_cart_items_by_user(
+        user_id, guest_token=_guest_token_for(user_id)
+    )
     if not cart_items:
         logger.info("No cart items found", user_id=user_id)
         return jsonify({"message": "No cart items found for this user"}), 404
 
-    logger.info("Cart items fetched", count=len(cart_items), user_id=user_id)
-    return jsonify([item.as_dict() for item in cart_items]), 200
+    return jsonify(cart_items), 200
 
 
 # -----------------------------------------------
@@ -117,11 +207,7 @@ def update_cart_item(cart_id):
             logger.warning("Cart item not found", cart_id=cart_id)
             return jsonify({"error": "Cart item not found"}), 404
 
-        cart_item.quantity = validated_data.quantity
-        if cart_item.fruit_info and cart_item.fruit_info.price:
-            cart_item.item_price = cart_item.quantity * cart_item.fruit_info.price
-
-        db.session.commit()
+        cart_item = cart_service.update_cart_item(cart_id, validated_data.quantity)
         logger.info("Cart item updated", cart_id=cart_item.cart_id)
         return (
             jsonify(
@@ -136,6 +222,9 @@ def update_cart_item(cart_id):
     except ValidationError as ve:
         logger.error("Validation error on update", cart_id=cart_id, errors=ve.errors())
         return jsonify({"error": "Validation Error", "details": ve.errors()}), 400
+    except OutOfStockError as e:
+        logger.warning("Not enough stock for cart update", cart_id=cart_id)
+        return jsonify({"error": str(e)}), 409
     except Exception as e:
         logger.exception("Error updating cart item")
         return jsonify({"error": str(e)}), 500
@@ -155,8 +244,7 @@ def delete_cart_item(cart_id):
             logger.warning("Cart item not found for deletion", cart_id=cart_id)
             return jsonify({"error": "Cart item not found"}), 404
 
-        db.session.delete(cart_item)
-        db.session.commit()
+        cart_service.delete_cart_item(cart_id)
         logger.info("Cart item deleted", cart_id=cart_id)
         return jsonify({"message": "Cart item deleted successfully"}), 200
     except Exception:
@@ -169,21 +257,21 @@ def delete_cart_item(cart_id):
 # -----------------------------------------------
 
 
-@cart_bp.route("/clear/<int:user_id>", methods=["DELETE"])
+@cart_bp.route("/clear/<int(signed=True):user_id>", methods=["DELETE"])
 @swag_from("swagger_docs/cart/clear_user_cart.yml")
 def clear_cart(user_id):
+    missing_token = _missing_guest_token(user_id)
+    if missing_token:
+        return missing_token
     try:
-        cart_items = Cart.query.filter_by(user_id=user_id).all()
-
-        if not cart_items:
+        count = cart_service.clear_cart_for_user(
+            user_id, guest_token=_guest_token_for(user_id)
+        )
+        if not count:
             logger.info("No cart items to clear", user_id=user_id)
             return jsonify({"message": "No cart items to delete"}), 404
 
-        for item in cart_items:
-            db.session.delete(item)
-
-        db.session.commit()
-        logger.info("All cart items cleared", user_id=user_id)
+        logger.info("All cart items cleared", user_id=user_id, count=count)
         return jsonify({"message": "All cart items cleared for user"}), 200
     except Exception:
         logger.exception("Failed to clear cart")
@@ -1,3 +1,5 @@
+import io
+import json
 import os
 import uuid
 from datetime import datetime
@@ -7,7 +9,9 @@ from flask import Blueprint, jsonify, request
 from werkzeug.utils import secure_filename
 
 import aws_utils.s3_utils as s3_utils
-from app.services import fruit_service
+from app.services import fruit_service, import_service
+from app.utils import conditional, pagination, streaming
+from app.utils.catalog_cache import get_catalog_cache
 from app.utils.log_config import get_logger
 
 fruit_bp = Blueprint("fruit_bp", __name__)
@@ -81,6 +85,35 @@ def add_fruit_with_info():
         return jsonify({"error": "Upload failed", "details": str(e)}), 500
 
 
+# -----------------------------------------------
+# Bulk Import Fruits
+# -----------------------------------------------
+
+
+@fruit_bp.route("/import", methods=["POST"])
+@swag_from("swagger_docs/fruit/import_fruits.yml")
+def import_fruits():
+    try:
+        file = request.files.get("file")
+        if file:
+            stream = io.TextIOWrapper(file.stream, encoding="utf-8-sig")
+            detected = import_service.detect_format(file.filename, file.mimetype)
+        else:
+            stream = io.StringIO(request.get_data(as_text=True))
+            detected = import_service.detect_format(None, request.mimetype)
+
+        fmt = request.args.get("format") or detected
+        if fmt not in import_service.SUPPORTED_FORMATS:
+            return jsonify({"error": "Import format must be csv or ndjson"}), 400
+
+        report = import_service.import_fruits(stream, fmt)
+        logger.info("Fruit import request processed", format=fmt)
+        return jsonify(report), 200
+    except Exception as e:
+        logger.exception("Fruit import failed")
+        return jsonify({"error": "Import failed", "details": str(e)}), 500
+
+
 # -----------------------------------------------
 # Get All Fruits
 # -----------------------------------------------
@@ -90,8 +123,34 @@ def add_fruit_with_info():
 @swag_from("swagger_docs/fruit/get_all_fruits.yml")
 def get_all_fruits():
     try:
-        data = fruit_service.get_all_fruits()
-        return jsonify(data), 200
+        if streaming.wants_stream():
+            return streaming.stream_json_array(fruit_service.iter_all_fruits())
+
+        limit, cursor = pagination.get_page_args((int,))
+
+        rows = fruit_service.get_all_fruits(
+            limit=limit + 1, after_id=cursor[0] if cursor else None
+        )
+        # Stock is read live for every page, so it is part of the validator:
+        # a stock change only moves the ETag of the pages showing that lot.
+        etag = conditional.make_etag(
+            "fruit-all",
+            get_catalog_cache().version,
+            request.query_string,
+            *(f["available_quantity"] for f in rows),
+        )
+        not_modified = conditional.not_modified(etag)
+        if not_modified:
+            return not_modified
+
+        data, next_cursor = pagination.split_page(
+            rows, limit, lambda f: (f["fruit_id"],)
+        )
+        response = conditional.with_validators(jsonify(data), etag)
+        return response, 200, pagination.page_headers(next_cursor)
+    except ValueError as ve:
+        logger.warning("Invalid pagination parameters", error=str(ve))
+        return jsonify({"error": str(ve)}), 400
     except Exception as e:
         logger.exception("Failed to fetch fruits")
         return jsonify({"error": str(e)}), 500
@@ -109,12 +168,35 @@ def get_fruit_by_id(fruit_id):
         result = fruit_service.get_fruit_by_id(fruit_id)
         if not result:
             return jsonify({"error": "Fruit not found"}), 404
-        return jsonify(result), 200
+
+        etag = conditional.make_etag(
+            "fruit",
+            get_catalog_cache().version,
+            fruit_id,
+            result["available_quantity"],
+        )
+        not_modified = conditional.not_modified(etag)
+        if not_modified:
+            return not_modified
+
+        response = conditional.with_validators(jsonify(result), etag)
+        return response, 200
     except Exception as e:
         logger.exception("Failed to get fruit by ID")
         return jsonify({"error": str(e)}), 500
 
 
+# -----------------------------------------------
+# Catalog Cache Stats
+# -----------------------------------------------
+
+
+@fruit_bp.route("/cache/stats", methods=["GET"])
+@swag_from("swagger_docs/fruit/catalog_cache_stats.yml")
+def catalog_cache_stats():
+    return jsonify(get_catalog_cache().stats()), 200
+
+
 # -----------------------------------------------
 # Search Fruits
 # -----------------------------------------------
@@ -125,8 +207,15 @@ def get_fruit_by_id(fruit_id):
 def search_fruits():
     try:
         filters = dict(request.args)
-        results = fruit_service.search_fruits(filters)
-        return jsonify(results), 200
+        if filters.get("search", "").strip():
+            cursor_types, key = (float, int), lambda f: (f["score"], f["info_id"])
+        else:
+            cursor_types, key = (int,), lambda f: (f["info_id"],)
+
+        limit, cursor = pagination.get_page_args(cursor_types)
+        rows = fruit_service.search_fruits(filters, limit=limit + 1, after=cursor)
+        results, next_cursor = pagination.split_page(rows, limit, key)
+        return jsonify(results), 200, pagination.page_headers(next_cursor)
     except ValueError as ve:
         logger.warning("Search validation failed", error=str(ve))
         return jsonify({"error": str(ve)}), 400
@@ -135,6 +224,34 @@ def search_fruits():
         return jsonify({"error": str(e)}), 500
 
 
+# -----------------------------------------------
+# Search Facets
+# -----------------------------------------------
+
+
+@fruit_bp.route("/facets", methods=["GET"])
+@swag_from("swagger_docs/fruit/search_facets.yml")
+def search_facets():
+    try:
+        # Stock filters bypass the facet cache, so hash the counts themselves.
+        facets = fruit_service.get_facets(dict(request.args))
+        etag = conditional.make_etag(
+            "fruit-facets", request.query_string, json.dumps(facets, sort_keys=True)
+        )
+        not_modified = conditional.not_modified(etag)
+        if not_modified:
+            return not_modified
+
+        response = conditional.with_validators(jsonify(facets), etag)
+        return response, 200
+    except ValueError as ve:
+        logger.warning("Facet filter validation failed", error=str(ve))
+        return jsonify({"error": str(ve)}), 400
+    except Exception as e:
+        logger.exception("Facet computation failed")
+        return jsonify({"error": str(e)}), 500
+
+
 # -----------------------------------------------
 # Update Fruit Info
 # -----------------------------------------------
@@ -166,6 +283,12 @@ def update_fruit_info(fruit_id):
             200,
         )
 
+    except fruit_service.DuplicateFruitInfoError as de:
+        logger.warning("Fruit info update conflict", reason=str(de))
+        return jsonify({"error": str(de)}), 409
+    except ValueError as ve:
+        logger.warning("Invalid fruit info update", reason=str(ve))
+        return jsonify({"error": str(ve)}), 400
     except Exception as e:
         logger.exception("Failed to update fruit info")
         return jsonify({"error": str(e)}), 500
@@ -190,14 +313,16 @@ def delete_fruits(fruit_id=None):
         if not ids:
             return jsonify({"error": "No fruit ID(s) provided"}), 400
 
-        deleted = fruit_service.delete_fruits(ids)
+        counts = fruit_service.delete_fruits(ids)
+        deleted = counts["fruit"]
         if deleted == 0:
             return jsonify({"error": "No fruits found to delete"}), 404
 
         return (
             jsonify(
                 {
-                    "message": f"Deleted {deleted} fruit{'s' if deleted > 1 else ''} successfully"
+                    "message": f"Deleted {deleted} fruit{'s' if deleted > 1 else ''} successfully",
+                    "deleted": counts,
                 }
             ),
             200,
@@ -1,14 +1,35 @@
+import tempfile
+from datetime import datetime
+
 from flasgger import swag_from
-from flask import Blueprint, jsonify, request
+from flask import (
+    Blueprint,
+    Response,
+    jsonify,
+    request,
+    send_file,
+    stream_with_context,
+    url_for,
+)
 from pydantic import ValidationError
 
-from app.services import order_service
+from app.services import export_service, order_service, version_service
+from app.utils import conditional, pagination, streaming
+from app.utils.idempotency import idempotent
 from app.utils.log_config import get_logger
-from app.validations.order_validation import OrderValidation
+from app.validations.order_validation import OrderExportValidation, OrderValidation
 
 order_bp = Blueprint("order_bp", __name__)
 logger = get_logger("order_routes")
 
+# Orders are paged newest first on (order_date, order_id).
+_ORDER_CURSOR = (datetime, int)
+
+
+def _order_key(order: dict) -> tuple:
+    return order["order_date"], order["order_id"]
+
+
 # -----------------------------------------------
 # Place Order
 # -----------------------------------------------
@@ -16,9 +37,18 @@ logger = get_logger("order_routes")
 
 @order_bp.route("/place/<int:user_id>", methods=["POST"])
 @swag_from("swagger_docs/order/place_order.yml")
+@idempotent
 def place_order(user_id: int):
     try:
         validated = OrderValidation(**request.get_json())
+        if request.args.get("async", "").lower() == "true":
+            job = order_service.enqueue_order(user_id, validated.cart_ids)
+            location = url_for(".get_order_status", job_id=job["job_id"])
+            return (
+                jsonify({"message": "Order queued", **job}),
+                202,
+                {"Location": location},
+            )
         summary = order_service.place_order(user_id, validated.cart_ids)
         return jsonify({"message": "Order placed", **summary}), 201
     except ValidationError as ve:
@@ -32,6 +62,24 @@ def place_order(user_id: int):
         return jsonify({"error": str(e)}), 500
 
 
+# -----------------------------------------------
+# Queued Order Status
+# -----------------------------------------------
+
+
+@order_bp.route("/status/<int:job_id>", methods=["GET"])
+@swag_from("swagger_docs/order/get_order_status.yml")
+def get_order_status(job_id: int):
+    try:
+        job = order_service.get_order_job(job_id)
+        if job is None:
+            return jsonify({"error": "Order job not found"}), 404
+        return jsonify(job), 200
+    except Exception as e:
+        logger.exception("Failed to retrieve order status", job_id=job_id)
+        return jsonify({"error": str(e)}), 500
+
+
 # -----------------------------------------------
 # Get Order by User ID
 # -----------------------------------------------
@@ -41,10 +89,25 @@ def place_order(user_id: int):
 @swag_from("swagger_docs/order/get_order_history.yml")
 def get_order_history(user_id):
     try:
-        history = order_service.get_order_history(user_id)
-        if not history:
+        limit, cursor = pagination.get_page_args(_ORDER_CURSOR)
+
+        version, last_modified = version_service.get_version(version_service.ORDERS)
+        etag = conditional.make_etag(
+            "order-history", version, user_id, request.query_string
+        )
+        not_modified = conditional.not_modified(etag, last_modified)
+        if not_modified:
+            return not_modified
+
+        rows = order_service.get_order_history(user_id, limit=limit + 1, before=cursor)
+        if not rows and cursor is None:
             return jsonify({"error": "No orders found for this user"}), 404
-        return jsonify(history), 200
+        history, next_cursor = pagination.split_page(rows, limit, _order_key)
+        response = conditional.with_validators(jsonify(history), etag, last_modified)
+        return response, 200, pagination.page_headers(next_cursor)
+    except ValueError as ve:
+        logger.warning("Invalid pagination parameters", error=str(ve))
+        return jsonify({"error": str(ve)}), 400
     except Exception as e:
         logger.exception("Failed to retrieve order history", user_id=user_id)
         return jsonify({"error": str(e)}), 500
@@ -59,10 +122,75 @@ def get_order_history(user_id):
 @swag_from("swagger_docs/order/get_all_orders.yml")
 def get_all_orders():
     try:
-        orders = order_service.get_all_orders()
-        if not orders:
+        if streaming.wants_stream():
+            return streaming.stream_json_array(order_service.iter_all_orders())
+
+        limit, cursor = pagination.get_page_args(_ORDER_CURSOR)
+
+        version, last_modified = version_service.get_version(version_service.ORDERS)
+        etag = conditional.make_etag("orders", version, request.query_string)
+        not_modified = conditional.not_modified(etag, last_modified)
+        if not_modified:
+            return not_modified
+
+        rows = order_service.get_all_orders(limit=limit + 1, before=cursor)
+        if not rows and cursor is None:
             return jsonify({"error": "No orders found"}), 404
-        return jsonify(orders), 200
+        orders, next_cursor = pagination.split_page(rows, limit, _order_key)
+        response = conditional.with_validators(jsonify(orders), etag, last_modified)
+        return response, 200, pagination.page_headers(next_cursor)
+    except ValueError as ve:
+        logger.warning("Invalid pagination parameters", error=str(ve))
+        return jsonify({"error": str(ve)}), 400
     except Exception as e:
         logger.exception("Failed to retrieve all orders")
         return jsonify({"error": str(e)}), 500
+
+
+# -----------------------------------------------
+# Export Orders
+# -----------------------------------------------
+
+
+@order_bp.route("/export", methods=["GET"])
+@swag_from("swagger_docs/order/export_orders.yml")
+def export_orders():
+    try:
+        validated = OrderExportValidation(**request.args.to_dict())
+        start, end = validated.start, validated.end
+        filename = "orders"
+        if start or end:
+            filename += f"-{start or 'start'}-{end or 'end'}"
+
+        if validated.format == "csv":
+            return Response(
+                stream_with_context(export_service.iter_csv(start, end)),
+                mimetype="text/csv",
+                headers={
+                    "Content-Disposition": f'attachment; filename="{filename}.csv"'
+                },
+            )
+
+        # Parquet needs a seekable file for its footer; spool it to disk.
+        spool = tempfile.TemporaryFile()
+        try:
+            export_service.write_parquet(spool, start, end)
+        except Exception:
+            spool.close()
+            raise
+        spool.seek(0)
+        return send_file(
+            spool,
+            mimetype="application/vnd.apache.parquet",
+            as_attachment=True,
+            download_name=f"{filename}.parquet",
+        )
+    except ValidationError as ve:
+        logger.warning("Validation error in order export", errors=ve.errors())
+        return jsonify({"error": ve.errors(include_context=False)}), 400
+    except export_service.ParquetUnavailableError as pe:
+        logger.warning("Order export unavailable", reason=str(pe))
+        return jsonify({"error": str(pe)}), 501
+    except Exception as e:
+        logger.exception("Failed to export orders")
+        return jsonify({"error": str(e)}), 500
@@ -3,6 +3,7 @@ from flask import Blueprint, jsonify, request
 from pydantic import ValidationError
 
 from app.services import user_service
+from app.utils import pagination, streaming
 from app.utils.log_config import get_logger
 from app.validations.user_validation import UserValidation
 
@@ -41,12 +42,26 @@ def add_user():
 @swag_from("swagger_docs/user/get_all_users.yml")
 def get_all_users():
     """
-    Get all registered users.
+    Get registered users, one keyset page at a time.
     """
     try:
-        users = user_service.get_all_users()
+        if streaming.wants_stream():
+            return streaming.stream_json_array(user_service.iter_all_users())
+
+        limit, cursor = pagination.get_page_args((int,))
+        rows = user_service.get_all_users(
+            limit=limit + 1, after_id=cursor[0] if cursor else None
+        )
+        users, next_cursor = pagination.split_page(rows, limit, lambda u: (u.user_id,))
         logger.info("Fetched all users", count=len(users))
-        return jsonify([u.to_dict() for u in users]), 200
+        return (
+            jsonify([u.to_dict() for u in users]),
+            200,
+            pagination.page_headers(next_cursor),
+        )
+    except ValueError as ve:
+        logger.warning("Invalid pagination parameters", error=str(ve))
+        return jsonify({"error": str(ve)}), 400
     except Exception as e:
         logger.exception("Error fetching users")
         return jsonify({"error": str(e)}), 500
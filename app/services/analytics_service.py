@@ -0,0 +1,258 @@
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List
+
+from sqlalchemy import delete, func, insert, select, union_all
+
+from app.extensions import db
+from app.models.fruit import Fruit
+from app.models.orders import Order, OrderArchive
+from app.models.sales import SalesDaily
+from app.utils.dialect import dialect_insert
+from app.utils.log_config import get_logger
+
+logger = get_logger("analytics_service")
+
+#: Default window (days, ending today) for each report.
+REVENUE_DEFAULT_DAYS = 30
+TOP_SELLERS_DEFAULT_DAYS = 7
+
+
+def _date_range(start: date | None, end: date | None, days: int) -> tuple:
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=days - 1)
+    return start, end
+
+
+def record_sales(order_lines: Iterable[dict]):
+    """
+    Add placed order lines to the daily rollup in the caller's transaction.
+
+    Lines are summed per ``(day, fruit_id)`` first, then applied with one
+    upsert that increments existing rows.
+
+    Parameters
+    ----------
+    order_lines : Iterable[dict]
+        Order rows with ``order_date``, ``fruit_id``, ``quantity`` and
+        ``price_by_fruit``.
+    """
+    totals: Dict[tuple, dict] = {}
+    for line in order_lines:
+        if line["fruit_id"] is None:
+            continue
+        key = (line["order_date"].date(), line["fruit_id"])
+        row = totals.setdefault(
+            key,
+            {
+                "day": key[0],
+                "fruit_id": key[1],
+                "order_lines": 0,
+                "quantity": 0,
+                "revenue": 0.0,
+            },
+        )
+        row["order_lines"] += 1
+        row["quantity"] += line["quantity"]
+        row["revenue"] += line["quantity"] * line["price_by_fruit"]
+    if not totals:
+        return
+
+    stmt = dialect_insert(SalesDaily)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["day", "fruit_id"],
+        set_={
+            "order_lines": SalesDaily.order_lines + stmt.excluded.order_lines,
+            "quantity": SalesDaily.quantity + stmt.excluded.quantity,
+            "revenue": SalesDaily.revenue + stmt.excluded.revenue,
+        },
+    )
+    db.session.execute(stmt, list(totals.values()))
+
+
+def _oldest_retained_day() -> date | None:
+    """
+    First day of the oldest month still held in ``orders`` or
+    ``orders_archive``; ``None`` when both are empty.
+
+    Cold months are exported and dropped whole, so no source rows exist
+    before this day once they are gone.
+    """
+    dates = db.session.execute(
+        select(
+            *(
+                select(func.min(model.order_date)).scalar_subquery()
+                for model in (Order, OrderArchive)
+            )
+        )
+    ).one()
+    dates = [d for d in dates if d is not None]
+    if not dates:
+        return None
+    oldest = min(dates)
+    return date(oldest.year, oldest.month, 1)
+
+
+def rebuild_sales_daily(
+    start: date | None = None, end: date | None = None, commit: bool = True
+) -> int:
+    """
+    Recompute the daily rollup from ``orders`` and ``orders_archive``.
+
+    Rollup rows in the range are replaced with one ``INSERT ... SELECT ...
+    GROUP BY``; use it to backfill or after editing orders directly. Days
+    before the oldest retained month are never touched: their orders have
+    been exported to cold storage and the rollup is all that is left.
+
+    Parameters
+    ----------
+    start, end : date, optional
+        Inclusive day range; the whole retained history when omitted.
+    commit : bool
+        Commit when done (the schema migration runs it in its own
+        transaction).
+
+    Returns
+    -------
+    int
+        Number of rollup rows written.
+    """
+    retained = _oldest_retained_day()
+    if retained is None or (end and end < retained):
+        logger.info("Sales rollup rebuild skipped", start=start, end=end)
+        return 0
+    start = max(start, retained) if start else retained
+
+    first_day = datetime.combine(start, time.min)
+    order_filter = [lambda m: m.order_date >= first_day]
+    rollup_filter = [SalesDaily.day >= start]
+    if end:
+        next_day = datetime.combine(end + timedelta(days=1), time.min)
+        order_filter.append(lambda m: m.order_date < next_day)
+        rollup_filter.append(SalesDaily.day <= end)
+
+    # Archived orders count too; the archive shares the orders columns.
+    orders = union_all(
+        *(
+            select(
+                model.order_id,
+                model.fruit_id,
+                model.quantity,
+                model.order_date,
+                model.price_by_fruit,
+            ).where(model.fruit_id.is_not(None), *(f(model) for f in order_filter))
+            for model in (Order, OrderArchive)
+        )
+    ).subquery()
+    day = func.date(orders.c.order_date)
+
+    try:
+        db.session.execute(delete(SalesDaily).where(*rollup_filter))
+        written = db.session.execute(
+            insert(SalesDaily).from_select(
+                ["day", "fruit_id", "order_lines", "quantity", "revenue"],
+                select(
+                    day,
+                    orders.c.fruit_id,
+                    func.count(orders.c.order_id),
+                    func.sum(orders.c.quantity),
+                    func.sum(orders.c.quantity * orders.c.price_by_fruit),
+                ).group_by(day, orders.c.fruit_id),
+            )
+        ).rowcount
+        if commit:
+            db.session.commit()
+        logger.info("Sales rollup rebuilt", start=start, end=end, rows=written)
+        return written
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Sales rollup rebuild failed")
+        raise
+
+
+def get_revenue_by_day(
+    start: date | None = None, end: date | None = None, fruit_id: int | None = None
+) -> List[dict]:
+    """
+    Revenue and units sold per day and fruit.
+
+    Parameters
+    ----------
+    start, end : date, optional
+        Inclusive day range; defaults to the last ``REVENUE_DEFAULT_DAYS``.
+    fruit_id : int, optional
+        Restrict to one fruit.
+
+    Returns
+    -------
+    List[dict]
+        ``day``, ``fruit_id``, ``fruit_name``, ``order_lines``, ``quantity``
+        and ``revenue``, by day then fruit.
+    """
+    start, end = _date_range(start, end, REVENUE_DEFAULT_DAYS)
+    stmt = (
+        select(
+            SalesDaily.day,
+            SalesDaily.fruit_id,
+            Fruit.name.label("fruit_name"),
+            SalesDaily.order_lines,
+            SalesDaily.quantity,
+            SalesDaily.revenue,
+        )
+        .outerjoin(Fruit, Fruit.fruit_id == SalesDaily.fruit_id)
+        .where(SalesDaily.day.between(start, end))
+        .order_by(SalesDaily.day, SalesDaily.fruit_id)
+    )
+    if fruit_id is not None:
+        stmt = stmt.where(SalesDaily.fruit_id == fruit_id)
+
+    rows = db.session.execute(stmt).mappings().all()
+    return [
+        {**row, "day": row["day"].isoformat(), "revenue": round(row["revenue"], 2)}
+        for row in rows
+    ]
+
+
+def get_top_sellers(
+    start: date | None = None,
+    end: date | None = None,
+    limit: int = 10,
+    by: str = "revenue",
+) -> List[dict]:
+    """
+    Best selling fruits over a day range.
+
+    Parameters
+    ----------
+    start, end : date, optional
+        Inclusive day range; defaults to the last ``TOP_SELLERS_DEFAULT_DAYS``.
+    limit : int
+        Number of fruits to return.
+    by : str
+        Rank by ``"revenue"`` or ``"quantity"``.
+
+    Returns
+    -------
+    List[dict]
+        ``fruit_id``, ``fruit_name``, ``order_lines``, ``quantity`` and
+        ``revenue``, best first.
+    """
+    start, end = _date_range(start, end, TOP_SELLERS_DEFAULT_DAYS)
+    quantity = func.sum(SalesDaily.quantity).label("quantity")
+    revenue = func.sum(SalesDaily.revenue).label("revenue")
+    rank = revenue if by == "revenue" else quantity
+    stmt = (
+        select(
+            SalesDaily.fruit_id,
+            Fruit.name.label("fruit_name"),
+            func.sum(SalesDaily.order_lines).label("order_lines"),
+            quantity,
+            revenue,
+        )
+        .outerjoin(Fruit, Fruit.fruit_id == SalesDaily.fruit_id)
+        .where(SalesDaily.day.between(start, end))
+        .group_by(SalesDaily.fruit_id, Fruit.name)
+        .order_by(rank.desc(), SalesDaily.fruit_id)
+        .limit(limit)
+    )
+    rows = db.session.execute(stmt).mappings().all()
+    return [{**row, "revenue": round(row["revenue"], 2)} for row in rows]
@@ -0,0 +1,227 @@
+import gzip
+import json
+import os
+from datetime import date, datetime
+from typing import List
+
+from flask import current_app
+from sqlalchemy import delete, func, insert, select, text
+
+from app.extensions import db
+from app.models.orders import Order, OrderArchive
+from app.services import version_service
+from app.utils.dialect import dialect_name
+from app.utils.log_config import get_logger
+
+logger = get_logger("archive_service")
+
+#: Columns shared by ``orders`` and ``orders_archive``.
+ORDER_COLUMNS = (
+    "order_id",
+    "parent_order_id",
+    "user_id",
+    "fruit_id",
+    "info_id",
+    "is_seeded",
+    "quantity",
+    "order_date",
+    "price_by_fruit",
+)
+
+
+def _month_start(day: date) -> datetime:
+    return datetime(day.year, day.month, 1)
+
+
+def _add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def hot_cutoff(now: datetime | None = None) -> datetime:
+    """
+    Start of the oldest month kept in ``orders``; older orders are archived.
+    """
+    month = _month_start(now or datetime.utcnow())
+    return _add_months(month, -current_app.config["ORDER_HOT_MONTHS"])
+
+
+def cold_cutoff(now: datetime | None = None) -> datetime:
+    """
+    Start of the oldest month kept in ``orders_archive``; older months are
+    exported to NDJSON files and dropped.
+    """
+    month = _month_start(now or datetime.utcnow())
+    return _add_months(month, -current_app.config["ORDER_COLD_MONTHS"])
+
+
+def _partition_name(month: datetime) -> str:
+    return f"{OrderArchive.__tablename__}_{month:%Y_%m}"
+
+
+def _ensure_partition(month: datetime):
+    """
+    Create the PostgreSQL partition for ``month`` (no-op on SQLite).
+    """
+    if dialect_name() != "postgresql":
+        return
+    db.session.execute(
+        text(
+            f"CREATE TABLE IF NOT EXISTS {_partition_name(month)} "
+            f"PARTITION OF {OrderArchive.__tablename__} "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') "
+            f"TO ('{_add_months(month, 1):%Y-%m-%d}')"
+        )
+    )
+
+
+def _drop_partition(month: datetime) -> int:
+    """
+    Remove an archived month: drop its partition on PostgreSQL, delete its
+    ``order_date`` range elsewhere.
+    """
+    if dialect_name() == "postgresql":
+        db.session.execute(text(f"DROP TABLE IF EXISTS {_partition_name(month)}"))
+        return 0
+    return db.session.execute(
+        delete(OrderArchive).where(
+            OrderArchive.order_date >= month,
+            OrderArchive.order_date < _add_months(month, 1),
+        )
+    ).rowcount
+
+
+def _oldest_month(model, before: datetime) -> datetime | None:
+    oldest = db.session.execute(
+        select(func.min(model.order_date)).where(model.order_date < before)
+    ).scalar()
+    return None if oldest is None else _month_start(oldest)
+
+
+def archive_orders(now: datetime | None = None) -> int:
+    """
+    Move orders older than ``ORDER_HOT_MONTHS`` into ``orders_archive``.
+
+    Whole months move together, oldest first, each with one ``INSERT ...
+    SELECT`` and one ``DELETE`` in its own transaction, so ``orders`` only
+    ever holds the recent months that most reads ask for. Each month bumps
+    the ``orders`` version so order list validators change with it.
+
+    Parameters
+    ----------
+    now : datetime, optional
+        Reference time (UTC); defaults to the current time.
+
+    Returns
+    -------
+    int
+        Number of orders moved.
+    """
+    cutoff = hot_cutoff(now)
+    moved = 0
+    try:
+        while (month := _oldest_month(Order, cutoff)) is not None:
+            in_month = (
+                Order.order_date >= month,
+                Order.order_date < min(_add_months(month, 1), cutoff),
+            )
+            _ensure_partition(month)
+            db.session.execute(
+                insert(OrderArchive).from_select(
+                    list(ORDER_COLUMNS),
+                    select(*(Order.__table__.c[c] for c in ORDER_COLUMNS)).where(
+                        *in_month
+                    ),
+                )
+            )
+            count = db.session.execute(
+                delete(Order)
+                .where(*in_month)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            version_service.bump(version_service.ORDERS)
+            db.session.commit()
+            moved += count
+            logger.info("Orders archived", month=f"{month:%Y-%m}", count=count)
+        return moved
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Order archival failed", moved=moved)
+        raise
+
+
+def _write_month(month: datetime, directory: str) -> tuple[str, int]:
+    """
+    Write one archived month to ``orders-YYYY-MM.ndjson.gz`` in ``directory``.
+
+    The file is written under a temporary name and renamed when complete,
+    so a crash never leaves a truncated archive behind.
+    """
+    path = os.path.join(directory, f"orders-{month:%Y-%m}.ndjson.gz")
+    partial = f"{path}.partial"
+    stmt = (
+        select(*(OrderArchive.__table__.c[c] for c in ORDER_COLUMNS))
+        .where(
+            OrderArchive.order_date >= month,
+            OrderArchive.order_date < _add_months(month, 1),
+        )
+        .order_by(OrderArchive.order_date, OrderArchive.order_id)
+        .execution_options(yield_per=current_app.config["STREAM_BATCH_SIZE"])
+    )
+    count = 0
+    with gzip.open(partial, "wt", encoding="utf-8") as out:
+        for row in db.session.execute(stmt).mappings():
+            out.write(json.dumps({**row, "order_date": row["order_date"].isoformat()}))
+            out.write("\n")
+            count += 1
+    os.replace(partial, path)
+    return path, count
+
+
+def export_cold_orders(
+    now: datetime | None = None, directory: str | None = None
+) -> List[str]:
+    """
+    Export archived months older than ``ORDER_COLD_MONTHS`` to gzipped
+    NDJSON files, then drop them from the database.
+
+    Each month is written completely before its partition (or row range)
+    is dropped and the ``orders`` version bumped, in its own transaction.
+
+    Parameters
+    ----------
+    now : datetime, optional
+        Reference time (UTC); defaults to the current time.
+    directory : str, optional
+        Output directory; defaults to ``ORDER_ARCHIVE_DIR``.
+
+    Returns
+    -------
+    List[str]
+        Paths of the files written.
+    """
+    cutoff = cold_cutoff(now)
+    directory = directory or current_app.config["ORDER_ARCHIVE_DIR"]
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    try:
+        while (month := _oldest_month(OrderArchive, cutoff)) is not None:
+            path, count = _write_month(month, directory)
+            _drop_partition(month)
+            version_service.bump(version_service.ORDERS)
+            db.session.commit()
+            paths.append(path)
+            logger.info("Cold orders exported", month=f"{month:%Y-%m}", count=count)
+        return paths
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Cold order export failed", exported=len(paths))
+        raise
+
+
+def run_order_archival():
+    """
+    Archive orders past the hot window, then export months past the cold one.
+    """
+    archive_orders()
+    export_cold_orders()
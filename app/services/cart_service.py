@@ -1,16 +1,108 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from flask import current_app
+from sqlalchemy import and_, delete, or_, select, tuple_, update
+from sqlalchemy.orm import aliased
+
 from app.extensions import db
 from app.models.cart import Cart
-from app.models.fruit import FruitInfo
+from app.models.fruit import Fruit, FruitInfo
 from app.models.users import User
+from app.services import reservation_service
+from app.utils.dialect import dialect_insert
 from app.utils.log_config import get_logger
 
 logger = get_logger("cart_service")
 
 
-def add_to_cart(user_id: int, fruit_id: int, quantity: int) -> Cart:
+#: ``user_id`` shared by anonymous shoppers; each visitor's lines are told
+#: apart by ``guest_token`` (empty for registered users).
+GUEST_USER_ID = -1
+
+#: Cart payload columns; fruit attributes come from the same query.
+_CART_COLUMNS = (
+    Cart.cart_id,
+    Cart.user_id,
+    Cart.fruit_id,
+    Cart.quantity,
+    Cart.item_price,
+    Cart.added_date,
+    Fruit.name.label("fruit_name"),
+    Fruit.image_url,
+)
+
+
+def _owner_token(user_id: int, guest_token: str | None) -> str:
+    """
+    ``guest_token`` column value of the lines owned by a user or visitor.
+
+    Raises
+    ------
+    ValueError
+        For the guest user without a token: an empty token would match the
+        lines of every legacy guest cart.
+    """
+    if user_id != GUEST_USER_ID:
+        return ""
+    if not guest_token:
+        raise ValueError("guest_token is required for the guest cart")
+    return guest_token
+
+
+def _owned_by(user_id: int, guest_token: str | None = None, model=Cart):
+    """
+    Filter for the cart lines of one registered user or one guest visitor.
+    """
+    return and_(
+        model.user_id == user_id,
+        model.guest_token == _owner_token(user_id, guest_token),
+    )
+
+
+def _cart_select():
+    return select(*_CART_COLUMNS).outerjoin(Fruit, Fruit.fruit_id == Cart.fruit_id)
+
+
+def _cart_row_to_dict(row) -> Dict[str, Any]:
+    item = dict(row)
+    item["added_date"] = row["added_date"].isoformat() if row["added_date"] else None
+    return item
+
+
+def _cart_upsert():
+    """
+    INSERT a cart line, merging into the user's existing line for the lot.
+
+    On a ``(guest_token, user_id, info_id)`` conflict the quantities are added and
+    ``item_price`` is recomputed at the incoming unit price, atomically in
+    the database. ``added_date`` is refreshed too, so the cart sweeper does
+    not release a line that was just added to. Parameters are bound at
+    execute time, so the statement also works with executemany.
+    """
+    stmt = dialect_insert(Cart)
+    quantity = Cart.quantity + stmt.excluded.quantity
+    unit_price = stmt.excluded.item_price / stmt.excluded.quantity
+    return stmt.on_conflict_do_update(
+        index_elements=["guest_token", "user_id", "info_id"],
+        set_={
+            "quantity": quantity,
+            "item_price": quantity * unit_price,
+            "added_date": stmt.excluded.added_date,
+        },
+    )
+
+
+def add_to_cart(
+    user_id: int, fruit_id: int, quantity: int, guest_token: str | None = None
+) -> Cart:
     """
     Add a fruit item to the user's cart.
 
+    Adding a lot already in the cart increases that line's quantity instead
+    of creating a second line. The added quantity is held in stock for
+    ``CART_HOLD_MINUTES`` (see ``reservation_service``).
+
     Parameters
     ----------
     user_id : int
@@ -19,43 +111,54 @@ def add_to_cart(user_id: int, fruit_id: int, quantity: int) -> Cart:
         The ID of the fruit being added.
     quantity : int
         Quantity of the fruit.
+    guest_token : str, optional
+        The visitor's cart token when ``user_id`` is the guest user.
 
     Returns
     -------
     Cart
-        The created cart item.
+        The created or merged cart item.
+
+    Raises
+    ------
+    OutOfStockError
+        If the lot does not have ``quantity`` available.
     """
     fruit_info = FruitInfo.query.filter_by(fruit_id=fruit_id).first()
     if not fruit_info:
         logger.warning("Fruit not found for cart add", fruit_id=fruit_id)
         raise ValueError("Fruit not found")
 
-    if user_id != -1:
+    if user_id != GUEST_USER_ID:
         user = User.query.get(user_id)
         if not user:
             logger.warning("User not found for cart add", user_id=user_id)
             raise ValueError("User not found")
 
-    item_price = fruit_info.price * quantity
-    cart = Cart(
-        user_id=user_id,
-        fruit_id=fruit_id,
-        info_id=fruit_info.info_id,
-        quantity=quantity,
-        item_price=item_price,
-    )
-
     try:
-        db.session.add(cart)
+        cart_id = db.session.execute(
+            _cart_upsert().returning(Cart.cart_id),
+            {
+                "user_id": user_id,
+                "guest_token": _owner_token(user_id, guest_token),
+                "fruit_id": fruit_id,
+                "info_id": fruit_info.info_id,
+                "quantity": quantity,
+                "item_price": fruit_info.price * quantity,
+            },
+        ).scalar_one()
+        reservation_service.hold_stock(
+            [{"cart_id": cart_id, "info_id": fruit_info.info_id, "quantity": quantity}]
+        )
         db.session.commit()
         logger.info(
             "Cart item successfully added",
-            cart_id=cart.cart_id,
+            cart_id=cart_id,
             user_id=user_id,
             fruit_id=fruit_id,
             quantity=quantity,
         )
-        return cart
+        return db.session.get(Cart, cart_id)
     except Exception as e:
         db.session.rollback()
         logger.exception(
@@ -67,20 +170,225 @@ def add_to_cart(user_id: int, fruit_id: int, quantity: int) -> Cart:
         raise
 
 
-def get_cart_items_by_user(user_id: int) -> list:
+def add_to_cart_batch(
+    user_id: int, items: List[dict], guest_token: str | None = None
+) -> List[Dict[str, Any]]:
+    """
+    Add several fruit items to the user's cart in one transaction.
+
+    Every FruitInfo is resolved with a single ``IN`` query and the user is
+    checked once; either all lines are added or none are. Repeated fruits
+    and lots already in the cart are merged into one line. The added
+    quantities are held in stock like ``add_to_cart`` does.
+
+    Parameters
+    ----------
+    user_id : int
+        The ID of the user adding the items.
+    items : List[dict]
+        ``{"fruit_id", "quantity"}`` lines.
+    guest_token : str, optional
+        The visitor's cart token when ``user_id`` is the guest user.
+
+    Returns
+    -------
+    List[Dict]
+        The resulting cart lines, in request order.
+    """
+    quantities = {}
+    for item in items:
+        quantities[item["fruit_id"]] = (
+            quantities.get(item["fruit_id"], 0) + item["quantity"]
+        )
+
+    rows = db.session.execute(
+        select(FruitInfo.fruit_id, FruitInfo.info_id, FruitInfo.price)
+        .where(FruitInfo.fruit_id.in_(quantities))
+        .order_by(FruitInfo.info_id)
+    ).all()
+
+    # Same lot as add_to_cart: the first FruitInfo of each fruit.
+    infos = {}
+    for info in rows:
+        infos.setdefault(info.fruit_id, info)
+
+    missing = sorted(quantities.keys() - infos.keys())
+    if missing:
+        logger.warning("Fruit not found for cart batch add", fruit_ids=missing)
+        raise ValueError(f"Fruit not found: {', '.join(map(str, missing))}")
+
+    if user_id != GUEST_USER_ID:
+        user = User.query.get(user_id)
+        if not user:
+            logger.warning("User not found for cart batch add", user_id=user_id)
+            raise ValueError("User not found")
+
+    try:
+        db.session.execute(
+            _cart_upsert(),
+            [
+                {
+                    "user_id": user_id,
+                    "guest_token": _owner_token(user_id, guest_token),
+                    "fruit_id": fruit_id,
+                    "info_id": infos[fruit_id].info_id,
+                    "quantity": quantity,
+                    "item_price": infos[fruit_id].price * quantity,
+                }
+                for fruit_id, quantity in quantities.items()
+            ],
+        )
+        lines = {
+            row["fruit_id"]: _cart_row_to_dict(row)
+            for row in db.session.execute(
+                _cart_select().where(
+                    _owned_by(user_id, guest_token),
+                    Cart.info_id.in_([info.info_id for info in infos.values()]),
+                )
+            ).mappings()
+        }
+        reservation_service.hold_stock(
+            [
+                {
+                    "cart_id": lines[fruit_id]["cart_id"],
+                    "info_id": infos[fruit_id].info_id,
+                    "quantity": quantity,
+                }
+                for fruit_id, quantity in quantities.items()
+            ]
+        )
+        db.session.commit()
+        logger.info("Cart batch added", user_id=user_id, count=len(quantities))
+        return [lines[fruit_id] for fruit_id in quantities]
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Failed to add cart batch", user_id=user_id)
+        raise
+
+
+def associate_cart(
+    old_user_id: int, new_user_id: int, guest_token: str | None = None
+) -> int:
+    """
+    Move every cart line of ``old_user_id`` to ``new_user_id``.
+
+    For the guest user only the lines of the visitor holding
+    ``guest_token`` are moved. Lines for a lot the target user already has
+    are merged into the target's line and their stock holds are released;
+    the rest are reassigned and keep their holds. Runs as a fixed number of
+    set-based, indexed statements in one transaction.
+
+    Parameters
+    ----------
+    old_user_id : int
+    new_user_id : int
+    guest_token : str, optional
+        Required when ``old_user_id`` is the guest user.
+
+    Returns
+    -------
+    int
+        Number of cart lines moved or merged.
+    """
+    if old_user_id == new_user_id:
+        return 0
+    if old_user_id == GUEST_USER_ID and not guest_token:
+        raise ValueError("guest_token is required to associate a guest cart")
+
+    source = aliased(Cart)
+
+    def incoming(column):
+        # The guest's value for the target line's lot (correlated on info_id).
+        return (
+            select(column)
+            .where(
+                _owned_by(old_user_id, guest_token, source),
+                source.info_id == Cart.info_id,
+            )
+            .scalar_subquery()
+        )
+
+    try:
+        merged = db.session.execute(
+            update(Cart)
+            .where(
+                _owned_by(new_user_id),
+                Cart.info_id.in_(
+                    select(source.info_id).where(
+                        _owned_by(old_user_id, guest_token, source)
+                    )
+                ),
+            )
+            .values(
+                quantity=Cart.quantity + incoming(source.quantity),
+                item_price=Cart.item_price + incoming(source.item_price),
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+        target = aliased(Cart)
+        merged_lines = (
+            _owned_by(old_user_id, guest_token),
+            Cart.info_id.in_(
+                select(target.info_id).where(_owned_by(new_user_id, model=target))
+            ),
+        )
+        released = reservation_service.release_holds(
+            select(Cart.cart_id).where(*merged_lines)
+        )
+        db.session.execute(
+            delete(Cart)
+            .where(*merged_lines)
+            .execution_options(synchronize_session=False)
+        )
+        moved = db.session.execute(
+            update(Cart)
+            .where(_owned_by(old_user_id, guest_token))
+            .values(user_id=new_user_id, guest_token=_owner_token(new_user_id, None))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        logger.info(
+            "Cart associated",
+            old_user_id=old_user_id,
+            new_user_id=new_user_id,
+            merged=merged,
+            moved=moved,
+            released=released,
+        )
+        return merged + moved
+    except Exception as e:
+        db.session.rollback()
+        logger.exception(
+            "Failed to associate cart", old_user_id=old_user_id, new_user_id=new_user_id
+        )
+        raise
+
+
+def get_cart_items_by_user(
+    user_id: int, guest_token: str | None = None
+) -> List[Dict[str, Any]]:
     """
-    Retrieve all cart items for a user.
+    Retrieve all cart items for a user (or one guest visitor).
+
+    Cart lines and their fruit attributes are read with one joined
+    projection query, so the cost does not grow with the number of lines.
 
     Parameters
     ----------
     user_id : int
+    guest_token : str, optional
+        The visitor's cart token when ``user_id`` is the guest user.
 
     Returns
     -------
-    list
-        List of Cart items.
+    List[Dict]
+        Cart items in the ``Cart.as_dict`` payload shape, oldest first.
     """
-    items = Cart.query.filter_by(user_id=user_id).all()
+    rows = db.session.execute(
+        _cart_select().where(_owned_by(user_id, guest_token)).order_by(Cart.cart_id)
+    ).mappings()
+    items = [_cart_row_to_dict(row) for row in rows]
     logger.info("Fetched cart items for user", user_id=user_id, count=len(items))
     return items
 
@@ -89,6 +397,8 @@ def update_cart_item(cart_id: int, quantity: int) -> Cart:
     """
     Update the quantity of a specific cart item.
 
+    The line's stock hold is resized to the new quantity and renewed.
+
     Parameters
     ----------
     cart_id : int
@@ -100,24 +410,35 @@ def update_cart_item(cart_id: int, quantity: int) -> Cart:
     -------
     Cart
         The updated cart item.
+
+    Raises
+    ------
+    OutOfStockError
+        If the lot does not have enough stock for the increase.
     """
     cart_item = Cart.query.get(cart_id)
     if not cart_item:
         logger.warning("Cart item not found for update", cart_id=cart_id)
         raise ValueError("Cart item not found")
 
-    cart_item.quantity = quantity
-    if cart_item.fruit_info and cart_item.fruit_info.price:
-        cart_item.item_price = quantity * cart_item.fruit_info.price
+    try:
+        reservation_service.set_hold(cart_item.cart_id, cart_item.info_id, quantity)
+        cart_item.quantity = quantity
+        if cart_item.fruit_info and cart_item.fruit_info.price:
+            cart_item.item_price = quantity * cart_item.fruit_info.price
 
-    db.session.commit()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Failed to update cart item", cart_id=cart_id)
+        raise
     logger.info("Cart item updated", cart_id=cart_item.cart_id, quantity=quantity)
     return cart_item
 
 
 def delete_cart_item(cart_id: int) -> bool:
     """
-    Delete a specific cart item by ID.
+    Delete a specific cart item by ID, releasing its stock hold.
 
     Parameters
     ----------
@@ -130,8 +451,14 @@ def delete_cart_item(cart_id: int) -> bool:
     """
     cart = Cart.query.get(cart_id)
     if cart:
-        db.session.delete(cart)
-        db.session.commit()
+        try:
+            reservation_service.release_holds([cart_id])
+            db.session.delete(cart)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("Failed to delete cart item", cart_id=cart_id)
+            raise
         logger.info("Cart item deleted", cart_id=cart_id)
         return True
 
@@ -139,25 +466,110 @@ def delete_cart_item(cart_id: int) -> bool:
     return False
 
 
-def clear_cart_for_user(user_id: int) -> int:
+def clear_cart_for_user(user_id: int, guest_token: str | None = None) -> int:
     """
-    Remove all cart items for a given user.
+    Remove all cart items for a given user (or one guest visitor) with a
+    single DELETE, after releasing their stock holds.
 
     Parameters
     ----------
     user_id : int
+    guest_token : str, optional
+        The visitor's cart token when ``user_id`` is the guest user.
 
     Returns
     -------
     int
         Number of items deleted.
     """
-    items = Cart.query.filter_by(user_id=user_id).all()
-    count = len(items)
+    try:
+        released = reservation_service.release_holds(
+            select(Cart.cart_id).where(_owned_by(user_id, guest_token))
+        )
+        count = db.session.execute(
+            delete(Cart)
+            .where(_owned_by(user_id, guest_token))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        logger.info(
+            "Cleared cart for user", user_id=user_id, count=count, released=released
+        )
+        return count
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Failed to clear cart", user_id=user_id)
+        raise
+
+
+def sweep_abandoned_carts(
+    now: datetime | None = None, chunk_size: int | None = None
+) -> int:
+    """
+    Delete guest cart lines older than ``CART_GUEST_TTL_HOURS`` and any
+    cart line older than ``CART_STALE_TTL_DAYS``.
 
-    for item in items:
-        db.session.delete(item)
+    Expired lines are walked in ``added_date`` order through its index and
+    deleted in chunks, each in its own short transaction; any stock they
+    still hold is released with them.
 
-    db.session.commit()
-    logger.info("Cleared cart for user", user_id=user_id, count=count)
-    return count
+    Parameters
+    ----------
+    now : datetime, optional
+        Reference time (UTC); defaults to the current time.
+    chunk_size : int, optional
+        Lines per chunk; defaults to ``CART_SWEEP_CHUNK_SIZE``.
+
+    Returns
+    -------
+    int
+        Number of cart lines deleted.
+    """
+    config = current_app.config
+    now = now or datetime.utcnow()
+    chunk_size = chunk_size or config["CART_SWEEP_CHUNK_SIZE"]
+    guest_cutoff = now - timedelta(hours=config["CART_GUEST_TTL_HOURS"])
+    stale_cutoff = now - timedelta(days=config["CART_STALE_TTL_DAYS"])
+
+    expired = and_(
+        Cart.added_date < max(guest_cutoff, stale_cutoff),
+        or_(
+            and_(Cart.user_id == GUEST_USER_ID, Cart.added_date < guest_cutoff),
+            Cart.added_date < stale_cutoff,
+        ),
+    )
+
+    deleted, released, last = 0, 0, None
+    try:
+        while True:
+            stmt = (
+                select(Cart.cart_id, Cart.added_date)
+                .where(expired)
+                .order_by(Cart.added_date, Cart.cart_id)
+                .limit(chunk_size)
+            )
+            if last is not None:
+                stmt = stmt.where(tuple_(Cart.added_date, Cart.cart_id) > last)
+            rows = db.session.execute(stmt).all()
+            if not rows:
+                break
+
+            ids = [row.cart_id for row in rows]
+            released += reservation_service.release_holds(ids)
+            deleted += db.session.execute(
+                delete(Cart)
+                .where(Cart.cart_id.in_(ids))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.commit()
+
+            if len(rows) < chunk_size:
+                break
+            last = tuple(rows[-1])
+
+        logger.info("Abandoned carts swept", deleted=deleted, released=released)
+        return deleted
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Cart sweep failed", deleted=deleted)
+        raise
@@ -0,0 +1,171 @@
+import csv
+import io
+from datetime import date, datetime, time, timedelta
+from typing import IO, Iterator, List
+
+from flask import current_app
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models.fruit import Fruit
+from app.models.orders import Order, OrderArchive
+from app.utils.log_config import get_logger
+
+logger = get_logger("export_service")
+
+EXPORT_FORMATS = ("csv", "parquet")
+
+#: Exported columns, in file order.
+EXPORT_COLUMNS = (
+    "order_id",
+    "parent_order_id",
+    "user_id",
+    "fruit_id",
+    "fruit_name",
+    "info_id",
+    "is_seeded",
+    "quantity",
+    "price_by_fruit",
+    "total_price",
+    "order_date",
+)
+
+
+class ParquetUnavailableError(RuntimeError):
+    """
+    Raised when a Parquet export is requested but ``pyarrow`` is missing.
+    """
+
+
+def _export_select(model, start: date | None, end: date | None):
+    stmt = (
+        select(
+            model.order_id,
+            model.parent_order_id,
+            model.user_id,
+            model.fruit_id,
+            Fruit.name,
+            model.info_id,
+            model.is_seeded,
+            model.quantity,
+            model.price_by_fruit,
+            (model.quantity * model.price_by_fruit),
+            model.order_date,
+        )
+        .outerjoin(Fruit, Fruit.fruit_id == model.fruit_id)
+        .order_by(model.order_date, model.order_id)
+    )
+    if start:
+        stmt = stmt.where(model.order_date >= datetime.combine(start, time.min))
+    if end:
+        next_day = datetime.combine(end + timedelta(days=1), time.min)
+        stmt = stmt.where(model.order_date < next_day)
+    return stmt.execution_options(yield_per=current_app.config["STREAM_BATCH_SIZE"])
+
+
+def iter_order_batches(
+    start: date | None = None, end: date | None = None
+) -> Iterator[List[tuple]]:
+    """
+    Yield orders placed between ``start`` and ``end`` (inclusive days),
+    oldest first, in batches of ``STREAM_BATCH_SIZE`` row tuples.
+
+    Rows come straight from a server-side cursor as plain tuples in
+    ``EXPORT_COLUMNS`` order (no ORM objects), archived orders first, so
+    memory is bounded by one batch whatever the range.
+    """
+    for model in (OrderArchive, Order):
+        result = db.session.execute(_export_select(model, start, end))
+        for batch in result.partitions():
+            yield batch
+
+
+def iter_csv(start: date | None = None, end: date | None = None) -> Iterator[str]:
+    """
+    Yield the CSV export (header first) one batch of rows at a time.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in iter_order_batches(start, end):
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def write_csv(out: IO[str], start: date | None = None, end: date | None = None) -> int:
+    """
+    Write the CSV export to a text stream.
+
+    Returns
+    -------
+    int
+        Number of orders written.
+    """
+    writer = csv.writer(out)
+    writer.writerow(EXPORT_COLUMNS)
+    count = 0
+    for batch in iter_order_batches(start, end):
+        writer.writerows(batch)
+        count += len(batch)
+    logger.info("Orders exported", format="csv", start=start, end=end, count=count)
+    return count
+
+
+def write_parquet(out, start: date | None = None, end: date | None = None) -> int:
+    """
+    Write the export as a Parquet file, one row group per batch.
+
+    ``pyarrow`` is imported on first use.
+
+    Parameters
+    ----------
+    out : str or binary file object
+        Destination path or seekable binary stream.
+
+    Returns
+    -------
+    int
+        Number of orders written.
+
+    Raises
+    ------
+    ParquetUnavailableError
+        If ``pyarrow`` is not installed.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ParquetUnavailableError(
+            "Parquet export requires the pyarrow package"
+        ) from e
+
+    schema = pa.schema(
+        [
+            ("order_id", pa.int64()),
+            ("parent_order_id", pa.int64()),
+            ("user_id", pa.int64()),
+            ("fruit_id", pa.int64()),
+            ("fruit_name", pa.string()),
+            ("info_id", pa.int64()),
+            ("is_seeded", pa.bool_()),
+            ("quantity", pa.int64()),
+            ("price_by_fruit", pa.float64()),
+            ("total_price", pa.float64()),
+            ("order_date", pa.timestamp("us")),
+        ]
+    )
+    count = 0
+    with pq.ParquetWriter(out, schema, compression="snappy") as writer:
+        for batch in iter_order_batches(start, end):
+            arrays = [
+                pa.array(column, type=field.type)
+                for column, field in zip(zip(*batch), schema)
+            ]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            count += len(batch)
+    logger.info("Orders exported", format="parquet", start=start, end=end, count=count)
+    return count
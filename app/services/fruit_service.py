@@ -1,15 +1,26 @@
+from collections import Counter
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List
 
-from sqlalchemy import or_
+from flask import current_app
+from sqlalchemy import and_, case, delete, func, or_, select
+from sqlalchemy.exc import IntegrityError
 
 from app.extensions import db
 from app.models.fruit import Fruit, FruitInfo
+from app.services import search_index, version_service
+from app.utils.catalog_cache import get_catalog_cache
 from app.utils.log_config import get_logger
 
 logger = get_logger("fruit_service")
 
 
+class DuplicateFruitInfoError(ValueError):
+    """
+    Raised when an updated lot would duplicate another lot's details.
+    """
+
+
 def add_fruit_with_info(data: dict, image_url: str) -> tuple[Fruit, FruitInfo]:
     """
     Add a new fruit and its associated FruitInfo.
@@ -58,46 +69,153 @@ def add_fruit_with_info(data: dict, image_url: str) -> tuple[Fruit, FruitInfo]:
             raise ValueError("Fruit info with these details already exists")
 
         db.session.add(fruit_info)
+        search_index.index_fruits([fruit])
+        version_service.bump(version_service.CATALOG)
         db.session.commit()
         logger.info("Fruit and FruitInfo added", fruit_id=fruit.fruit_id)
 
         return fruit, fruit_info
 
+    except IntegrityError:
+        # A concurrent insert won the content-hash unique index.
+        db.session.rollback()
+        logger.warning("Duplicate fruit inserted concurrently", name=data["name"])
+        raise ValueError("Fruit with these details already exists")
     except Exception as e:
         db.session.rollback()
         logger.exception("Error adding fruit")
         raise
 
 
-def get_all_fruits() -> List[Dict[str, Any]]:
+# Columns served by the catalog read endpoints, in payload order.
+_CATALOG_COLUMNS = (
+    Fruit.fruit_id,
+    Fruit.name,
+    Fruit.color,
+    Fruit.description,
+    Fruit.has_seeds,
+    Fruit.size,
+    Fruit.image_url,
+    FruitInfo.info_id,
+    FruitInfo.weight,
+    FruitInfo.price,
+    FruitInfo.total_quantity,
+    FruitInfo.available_quantity,
+    FruitInfo.sell_by_date,
+)
+
+
+def _catalog_select():
+    """
+    Build the column-projected catalog SELECT.
+
+    Each fruit is joined to its first FruitInfo lot (lowest ``info_id``), so
+    the catalog is read in a single query without hydrating ORM objects.
+    """
+    first_info = (
+        select(FruitInfo.fruit_id, func.min(FruitInfo.info_id).label("info_id"))
+        .group_by(FruitInfo.fruit_id)
+        .subquery()
+    )
+    return (
+        select(*_CATALOG_COLUMNS)
+        .join(first_info, first_info.c.fruit_id == Fruit.fruit_id)
+        .join(FruitInfo, FruitInfo.info_id == first_info.c.info_id)
+    )
+
+
+def _catalog_row_to_dict(row) -> Dict[str, Any]:
+    """
+    Serialize a catalog row mapping into the API payload shape.
+    """
+    item = dict(row)
+    item["sell_by_date"] = row["sell_by_date"].isoformat()
+    return item
+
+
+def _with_live_stock(key, load) -> List[Dict[str, Any]]:
+    """
+    Serve catalog rows from the cache with live ``available_quantity``.
+
+    Stock moves on every cart write and checkout, so it is kept out of the
+    cached rows and out of the catalog version: a miss keeps the stock its
+    own query just read, a hit reads the stock of its lots by primary key.
     """
-    Retrieve all fruits with their FruitInfo.
+    stock = {}
+
+    def load_without_stock():
+        rows = load()
+        for row in rows:
+            stock[row["info_id"]] = row.pop("available_quantity")
+        return rows
+
+    rows = get_catalog_cache().get_or_load(key, load_without_stock)
+    if rows and not stock:
+        stock = dict(
+            db.session.execute(
+                select(FruitInfo.info_id, FruitInfo.available_quantity).where(
+                    FruitInfo.info_id.in_([row["info_id"] for row in rows])
+                )
+            ).all()
+        )
+    return [{**row, "available_quantity": stock.get(row["info_id"])} for row in rows]
+
+
+def get_all_fruits(
+    limit: int | None = None, after_id: int | None = None
+) -> List[Dict[str, Any]]:
+    """
+    Retrieve fruits with their FruitInfo, ordered by ``fruit_id``.
+
+    Parameters
+    ----------
+    limit : int, optional
+        Maximum number of fruits to return.
+    after_id : int, optional
+        Keyset cursor; only fruits with a greater ``fruit_id`` are returned.
 
     Returns
     -------
     List[Dict]
+        Served from the catalog cache between catalog writes, with live
+        ``available_quantity``.
     """
-    fruits = Fruit.query.all()
-    fruit_infos = FruitInfo.query.all()
-
-    result = []
-    for fruit in fruits:
-        info = next((i for i in fruit_infos if i.fruit_id == fruit.fruit_id), None)
-        if info:
-            result.append(
-                {
-                    **fruit.to_dict(),
-                    "info_id": info.info_id,
-                    "weight": info.weight,
-                    "price": info.price,
-                    "total_quantity": info.total_quantity,
-                    "available_quantity": info.available_quantity,
-                    "sell_by_date": info.sell_by_date.isoformat(),
-                }
-            )
 
-    logger.info("Fetched all fruits", count=len(result))
-    return result
+    def load():
+        stmt = _catalog_select().order_by(Fruit.fruit_id)
+        if after_id is not None:
+            stmt = stmt.where(Fruit.fruit_id > after_id)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+
+        rows = db.session.execute(stmt).mappings()
+        result = [_catalog_row_to_dict(row) for row in rows]
+
+        logger.info("Fetched all fruits", count=len(result))
+        return result
+
+    return _with_live_stock(("all", limit, after_id), load)
+
+
+def iter_all_fruits() -> Iterator[Dict[str, Any]]:
+    """
+    Stream every fruit with its FruitInfo, ordered by ``fruit_id``.
+
+    Rows are read through a server-side cursor in ``STREAM_BATCH_SIZE``
+    batches, so memory stays flat regardless of catalog size.
+
+    Yields
+    ------
+    dict
+        Catalog rows in the ``get_all_fruits`` payload shape.
+    """
+    stmt = (
+        _catalog_select()
+        .order_by(Fruit.fruit_id)
+        .execution_options(yield_per=current_app.config["STREAM_BATCH_SIZE"])
+    )
+    for row in db.session.execute(stmt).mappings():
+        yield _catalog_row_to_dict(row)
 
 
 def get_fruit_by_id(fruit_id: int) -> Dict[str, Any] | None:
@@ -111,35 +229,90 @@ def get_fruit_by_id(fruit_id: int) -> Dict[str, Any] | None:
     Returns
     -------
     dict or None
+        Served from the catalog cache between catalog writes, with live
+        ``available_quantity``.
     """
-    fruit = Fruit.query.get(fruit_id)
-    if not fruit:
-        return None
 
-    info = FruitInfo.query.filter_by(fruit_id=fruit_id).first()
-    if not info:
-        return None
+    def load():
+        row = (
+            db.session.execute(_catalog_select().where(Fruit.fruit_id == fruit_id))
+            .mappings()
+            .first()
+        )
+        if not row:
+            return []
+
+        logger.info("Fetched fruit by ID", fruit_id=fruit_id)
+        return [_catalog_row_to_dict(row)]
+
+    rows = _with_live_stock(("fruit", fruit_id), load)
+    return rows[0] if rows else None
+
+
+#: FruitInfo columns accepting ``<field>_min`` / ``<field>_max`` search filters.
+_RANGE_FIELDS = ("price", "weight", "total_quantity", "available_quantity")
+
+#: Filters that match on live stock; facets using them bypass the cache.
+_STOCK_FILTERS = ("value", "available_quantity_min", "available_quantity_max")
+
+#: Upper bounds of the price and weight facet buckets; a final open-ended
+#: bucket collects everything above the last bound.
+PRICE_BUCKETS = (1, 2, 5, 10)
+WEIGHT_BUCKETS = (0.25, 0.5, 1, 2)
+
+_FACET_GROUPS = ("color", "size", "has_seeds", "price_bucket", "weight_bucket")
+
+
+def _search_conditions(filters: dict) -> list:
+    """
+    Build the WHERE clauses for the numeric ``search_fruits`` filters.
+    """
+    conditions = []
+
+    value = filters.get("value")
+    if value:
+        val = float(value)
+        conditions.append(
+            or_(
+                FruitInfo.price == val,
+                FruitInfo.weight == val,
+                FruitInfo.total_quantity == val,
+                FruitInfo.available_quantity == val,
+            )
+        )
+
+    for field in _RANGE_FIELDS:
+        min_val = filters.get(f"{field}_min")
+        max_val = filters.get(f"{field}_max")
+        col = getattr(FruitInfo, field)
 
-    logger.info("Fetched fruit by ID", fruit_id=fruit_id)
-    return {
-        **fruit.to_dict(),
-        "info_id": info.info_id,
-        "weight": info.weight,
-        "price": info.price,
-        "total_quantity": info.total_quantity,
-        "available_quantity": info.available_quantity,
-        "sell_by_date": info.sell_by_date.isoformat(),
-    }
+        if min_val:
+            conditions.append(col >= float(min_val))
+        if max_val:
+            conditions.append(col <= float(max_val))
 
+    return conditions
 
-def search_fruits(filters: dict) -> List[Dict[str, Any]]:
+
+def search_fruits(
+    filters: dict, limit: int | None = None, after: tuple | None = None
+) -> List[Dict[str, Any]]:
     """
     Search fruits by keyword or numeric filters.
 
+    A ``search`` keyword is resolved through the search index and results are
+    ranked by relevance (each result carries a ``score``); otherwise results
+    are ordered by ``info_id``.
+
     Parameters
     ----------
     filters : dict
         Includes keys like 'search', 'value', 'price_min', etc.
+    limit : int, optional
+        Maximum number of results to return.
+    after : tuple, optional
+        Keyset cursor of the last result already seen: ``(score, info_id)``
+        for keyword searches, ``(info_id,)`` otherwise.
 
     Returns
     -------
@@ -147,52 +320,38 @@ def search_fruits(filters: dict) -> List[Dict[str, Any]]:
         Filtered fruit results
     """
     try:
-        query = FruitInfo.query.join(Fruit)
-
-        value = filters.get("value")
-        if value:
-            val = float(value)
-            query = query.filter(
-                or_(
-                    FruitInfo.price == val,
-                    FruitInfo.weight == val,
-                    FruitInfo.total_quantity == val,
-                    FruitInfo.available_quantity == val,
-                )
-            )
+        stmt = (
+            select(*_CATALOG_COLUMNS)
+            .join_from(FruitInfo, Fruit)
+            .where(*_search_conditions(filters))
+        )
 
         search_term = filters.get("search", "").strip()
         if search_term:
-            query = query.filter(
-                or_(
-                    Fruit.name.ilike(f"%{search_term}%"),
-                    Fruit.color.ilike(f"%{search_term}%"),
-                )
+            ranked = search_index.ranked_matches(search_term)
+            stmt = (
+                stmt.add_columns(ranked.c.score)
+                .join(ranked, ranked.c.fruit_id == Fruit.fruit_id)
+                .order_by(ranked.c.score.desc(), FruitInfo.info_id)
             )
+            if after is not None:
+                score, info_id = after
+                stmt = stmt.where(
+                    or_(
+                        ranked.c.score < score,
+                        and_(ranked.c.score == score, FruitInfo.info_id > info_id),
+                    )
+                )
+        else:
+            stmt = stmt.order_by(FruitInfo.info_id)
+            if after is not None:
+                stmt = stmt.where(FruitInfo.info_id > after[0])
 
-        for field in ["price", "weight", "total_quantity", "available_quantity"]:
-            min_val = filters.get(f"{field}_min")
-            max_val = filters.get(f"{field}_max")
-            col = getattr(FruitInfo, field)
-
-            if min_val:
-                query = query.filter(col >= float(min_val))
-            if max_val:
-                query = query.filter(col <= float(max_val))
+        if limit is not None:
+            stmt = stmt.limit(limit)
 
-        infos = query.all()
-        result = [
-            {
-                **info.fruit.to_dict(),
-                "info_id": info.info_id,
-                "weight": info.weight,
-                "price": info.price,
-                "total_quantity": info.total_quantity,
-                "available_quantity": info.available_quantity,
-                "sell_by_date": info.sell_by_date.isoformat(),
-            }
-            for info in infos
-        ]
+        rows = db.session.execute(stmt).mappings()
+        result = [_catalog_row_to_dict(row) for row in rows]
 
         logger.info("Search results returned", count=len(result))
         return result
@@ -202,6 +361,110 @@ def search_fruits(filters: dict) -> List[Dict[str, Any]]:
         raise
 
 
+def _bucket(column, bounds: tuple):
+    """
+    SQL expression mapping ``column`` to the index of its bucket in ``bounds``.
+    """
+    return case(
+        *((column < bound, index) for index, bound in enumerate(bounds)),
+        else_=len(bounds),
+    )
+
+
+def _bucket_counts(counts: Counter, bounds: tuple) -> List[Dict[str, Any]]:
+    lowers = (0, *bounds)
+    buckets = []
+    for index, lower in enumerate(lowers):
+        upper = bounds[index] if index < len(bounds) else None
+        buckets.append(
+            {
+                "bucket": f"{lower}-{upper}" if upper is not None else f"{lower}+",
+                "min": lower,
+                "max": upper,
+                "count": counts[index],
+            }
+        )
+    return buckets
+
+
+def _value_counts(counts: Counter) -> List[Dict[str, Any]]:
+    return [
+        {"value": value, "count": count}
+        for value, count in sorted(
+            counts.items(), key=lambda item: (-item[1], str(item[0]))
+        )
+    ]
+
+
+def get_facets(filters: dict) -> Dict[str, Any]:
+    """
+    Count search results by color, size, seeds, and price/weight bucket.
+
+    All facets come from a single ``GROUP BY`` over the filtered lots; the
+    per-facet totals are folded from its (small) set of groups.
+
+    Parameters
+    ----------
+    filters : dict
+        The ``search_fruits`` filters; paging keys are ignored.
+
+    Returns
+    -------
+    dict
+        ``total`` plus one list of counts per facet. Served from the catalog
+        cache between catalog writes, unless a filter matches on stock.
+    """
+    search_term = filters.get("search", "").strip()
+    key_filters = tuple(
+        sorted(
+            (k, v)
+            for k, v in filters.items()
+            if v and (k == "value" or k.endswith(("_min", "_max")))
+        )
+    )
+
+    def load():
+        price_bucket = _bucket(FruitInfo.price, PRICE_BUCKETS).label("price_bucket")
+        weight_bucket = _bucket(FruitInfo.weight, WEIGHT_BUCKETS).label("weight_bucket")
+        groups = (Fruit.color, Fruit.size, Fruit.has_seeds, price_bucket, weight_bucket)
+        stmt = (
+            select(*groups, func.count().label("count"))
+            .join_from(FruitInfo, Fruit)
+            .where(*_search_conditions(filters))
+            .group_by(*groups)
+        )
+        if search_term:
+            ranked = search_index.ranked_matches(search_term)
+            stmt = stmt.join(ranked, ranked.c.fruit_id == Fruit.fruit_id)
+
+        facets = {name: Counter() for name in _FACET_GROUPS}
+        total = 0
+        for row in db.session.execute(stmt).mappings():
+            total += row["count"]
+            for name in _FACET_GROUPS:
+                facets[name][row[name]] += row["count"]
+
+        logger.info("Facets computed", total=total)
+        return {
+            "total": total,
+            "color": _value_counts(facets["color"]),
+            "size": _value_counts(facets["size"]),
+            "has_seeds": _value_counts(facets["has_seeds"]),
+            "price": _bucket_counts(facets["price_bucket"], PRICE_BUCKETS),
+            "weight": _bucket_counts(facets["weight_bucket"], WEIGHT_BUCKETS),
+        }
+
+    try:
+        if any(filters.get(name) for name in _STOCK_FILTERS):
+            return load()
+        return get_catalog_cache().get_or_load(
+            ("facets", search_term.casefold(), key_filters), load
+        )
+    except Exception as e:
+        logger.exception("Failed to compute facets")
+        raise
+
+
 def update_fruit_info(fruit_id: int, data: dict) -> FruitInfo | None:
     """
     Update FruitInfo by fruit ID.
@@ -214,6 +477,13 @@ def update_fruit_info(fruit_id: int, data: dict) -> FruitInfo | None:
     Returns
     -------
     FruitInfo or None
+
+    Raises
+    ------
+    DuplicateFruitInfoError
+        If the updated lot duplicates another one.
+    ValueError
+        If ``sell_by_date`` is malformed.
     """
     fruit = Fruit.query.get(fruit_id)
     if not fruit:
@@ -236,48 +506,96 @@ def update_fruit_info(fruit_id: int, data: dict) -> FruitInfo | None:
                     value = datetime.strptime(value, "%Y-%m-%dT%H:%M:%S")
                 setattr(info, key, value)
 
+        version_service.bump(version_service.CATALOG)
         db.session.commit()
         logger.info("Fruit info updated", fruit_id=fruit_id)
         return info
 
+    except IntegrityError:
+        # The new details collide with another lot's content hash.
+        db.session.rollback()
+        logger.warning("Duplicate fruit info on update", fruit_id=fruit_id)
+        raise DuplicateFruitInfoError("Fruit info with these details already exists")
     except Exception as e:
         db.session.rollback()
         logger.exception("Failed to update fruit info", fruit_id=fruit_id)
         raise
 
 
-def delete_fruits(ids: List[int]) -> int:
+def delete_fruits(ids: List[int], chunk_size: int | None = None) -> Dict[str, int]:
     """
-    Delete fruits and related info by list of IDs.
+    Delete fruits and everything referencing them, set-based.
+
+    Ids are processed in chunks; each chunk issues one ``DELETE ... WHERE
+    fruit_id IN (...)`` per table and is committed on its own, so large
+    cleanups never hold long locks and the statement count does not grow
+    with the number of rows. Their ``sales_daily`` rollup rows go with the
+    orders, and stock holds on their lots are dropped with the lots.
 
     Parameters
     ----------
     ids : List[int]
+    chunk_size : int, optional
+        Ids per chunk; defaults to ``DELETE_CHUNK_SIZE``.
 
     Returns
     -------
-    int
-        Number of fruits deleted
+    Dict[str, int]
+        Rows deleted per table: ``cart``, ``orders`` (archived orders
+        included), ``fruit_info``, ``fruit``.
     """
-    from app.models.cart import Cart
-    from app.models.orders import Order
+    from app.models.cart import Cart, CartReservation
+    from app.models.orders import Order, OrderArchive
+    from app.models.sales import SalesDaily
 
-    deleted_count = 0
+    chunk_size = chunk_size or current_app.config["DELETE_CHUNK_SIZE"]
+    unique_ids = sorted(set(ids))
+    counts = {"cart": 0, "orders": 0, "fruit_info": 0, "fruit": 0}
 
     try:
-        for fruit_id in ids:
-            Cart.query.filter_by(fruit_id=fruit_id).delete()
-            Order.query.filter_by(fruit_id=fruit_id).delete()
-            FruitInfo.query.filter_by(fruit_id=fruit_id).delete()
-
-            fruit = Fruit.query.get(fruit_id)
-            if fruit:
-                db.session.delete(fruit)
-                deleted_count += 1
-
-        db.session.commit()
-        logger.info("Fruits deleted", count=deleted_count)
-        return deleted_count
+        for start in range(0, len(unique_ids), chunk_size):
+            chunk = unique_ids[start : start + chunk_size]
+            db.session.execute(
+                delete(CartReservation).where(
+                    CartReservation.info_id.in_(
+                        select(FruitInfo.info_id).where(FruitInfo.fruit_id.in_(chunk))
+                    )
+                )
+            )
+            deleted = Counter()
+            for key, model in (
+                ("cart", Cart),
+                ("orders", Order),
+                ("orders", OrderArchive),
+                ("fruit_info", FruitInfo),
+                ("fruit", Fruit),
+            ):
+                result = db.session.execute(
+                    delete(model)
+                    .where(model.fruit_id.in_(chunk))
+                    .execution_options(synchronize_session=False)
+                )
+                deleted[key] += result.rowcount
+            changed = [
+                name
+                for name, key in (
+                    (version_service.CATALOG, "fruit"),
+                    (version_service.ORDERS, "orders"),
+                )
+                if deleted[key]
+            ]
+            if changed:
+                version_service.bump(*changed)
+            for key, rows in deleted.items():
+                counts[key] += rows
+            # Keep the sales rollup in step with the deleted orders.
+            db.session.execute(delete(SalesDaily).where(SalesDaily.fruit_id.in_(chunk)))
+
+            search_index.remove_fruits(chunk)
+            db.session.commit()
+
+        logger.info("Fruits deleted", **counts)
+        return counts
 
     except Exception as e:
         db.session.rollback()
@@ -0,0 +1,175 @@
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, delete, or_, select, update
+
+from app.extensions import db
+from app.models.idempotency import IdempotencyKey
+from app.utils.dialect import dialect_insert
+from app.utils.log_config import get_logger
+
+logger = get_logger("idempotency_service")
+
+_STORED_COLUMNS = (
+    IdempotencyKey.fingerprint,
+    IdempotencyKey.status_code,
+    IdempotencyKey.response_body,
+    IdempotencyKey.response_headers,
+)
+
+
+def _cutoff(now: datetime | None = None) -> datetime:
+    hours = current_app.config["IDEMPOTENCY_TTL_HOURS"]
+    return (now or datetime.utcnow()) - timedelta(hours=hours)
+
+
+def _stale_claim_cutoff(now: datetime | None = None) -> datetime:
+    seconds = current_app.config["IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS"]
+    return (now or datetime.utcnow()) - timedelta(seconds=seconds)
+
+
+def _keyed(scope: str, key: str):
+    return (IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+
+
+def _claimed(scope: str, key: str, claimed_at: datetime):
+    return (
+        *_keyed(scope, key),
+        IdempotencyKey.created_at == claimed_at,
+        IdempotencyKey.status_code.is_(None),
+    )
+
+
+def claim(
+    scope: str, key: str, fingerprint: str
+) -> tuple[datetime | None, dict | None]:
+    """
+    Reserve ``key`` for a request about to run, unless it was already used.
+
+    An expired row for the key is replaced, and so is a claim still in
+    progress after ``IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS``: its request is
+    taken to have died without releasing it. The claim is committed
+    immediately so concurrent retries see it.
+
+    Parameters
+    ----------
+    scope : str
+        User, method and path of the request.
+    key : str
+        Client supplied idempotency key.
+    fingerprint : str
+        Hash of the request; stored to detect a key reused for another body.
+
+    Returns
+    -------
+    tuple
+        ``(claimed_at, None)`` if the key was claimed for this request, to
+        pass to ``complete`` or ``release``; otherwise ``(None, stored)``
+        with the stored ``fingerprint``, ``status_code`` (None while still
+        in progress), ``response_body`` and ``response_headers``.
+    """
+    try:
+        now = datetime.utcnow()
+        db.session.execute(
+            delete(IdempotencyKey).where(
+                *_keyed(scope, key),
+                or_(
+                    IdempotencyKey.created_at < _cutoff(now),
+                    and_(
+                        IdempotencyKey.status_code.is_(None),
+                        IdempotencyKey.created_at < _stale_claim_cutoff(now),
+                    ),
+                ),
+            )
+        )
+        claimed = db.session.execute(
+            dialect_insert(IdempotencyKey)
+            .values(scope=scope, key=key, fingerprint=fingerprint, created_at=now)
+            .on_conflict_do_nothing(index_elements=["scope", "key"])
+            .returning(IdempotencyKey.id)
+        ).scalar()
+        stored = None
+        if claimed is None:
+            stored = dict(
+                db.session.execute(select(*_STORED_COLUMNS).where(*_keyed(scope, key)))
+                .mappings()
+                .one()
+            )
+        db.session.commit()
+        return (now if claimed is not None else None), stored
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Failed to claim idempotency key", scope=scope)
+        raise
+
+
+def complete(
+    scope: str,
+    key: str,
+    claimed_at: datetime,
+    status_code: int,
+    body: str,
+    headers: str,
+):
+    """
+    Store the response of a claimed request for later replays.
+
+    Nothing is stored if the claim was taken over in the meantime.
+    """
+    try:
+        db.session.execute(
+            update(IdempotencyKey)
+            .where(*_claimed(scope, key, claimed_at))
+            .values(
+                status_code=status_code,
+                response_body=body,
+                response_headers=headers,
+            )
+        )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Failed to store idempotent response", scope=scope)
+        raise
+
+
+def release(scope: str, key: str, claimed_at: datetime):
+    """
+    Drop a claim whose request failed, so a retry runs the request again.
+    """
+    try:
+        db.session.execute(
+            delete(IdempotencyKey).where(*_claimed(scope, key, claimed_at))
+        )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Failed to release idempotency key", scope=scope)
+        raise
+
+
+def purge_expired_keys(now: datetime | None = None) -> int:
+    """
+    Delete idempotency keys older than ``IDEMPOTENCY_TTL_HOURS``.
+
+    Parameters
+    ----------
+    now : datetime, optional
+        Reference time (UTC); defaults to the current time.
+
+    Returns
+    -------
+    int
+        Number of keys deleted.
+    """
+    try:
+        deleted = db.session.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.created_at < _cutoff(now))
+        ).rowcount
+        db.session.commit()
+        logger.info("Expired idempotency keys purged", deleted=deleted)
+        return deleted
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Idempotency key purge failed")
+        raise
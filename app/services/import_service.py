@@ -0,0 +1,253 @@
+import csv
+import json
+from datetime import datetime, time
+from itertools import islice
+from typing import IO, Any, Dict, Iterator, List, Tuple
+
+from flask import current_app
+from pydantic import ValidationError
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models.fruit import Fruit, FruitInfo, content_hash
+from app.services import search_index, version_service
+from app.utils.dialect import dialect_insert
+from app.utils.log_config import get_logger
+from app.validations.fruit_validation import FruitImportValidation
+
+logger = get_logger("import_service")
+
+SUPPORTED_FORMATS = ("csv", "ndjson")
+
+_LOT_FIELDS = ("weight", "price", "total_quantity", "sell_by_date")
+
+
+def detect_format(filename: str | None, content_type: str | None) -> str | None:
+    """
+    Guess the import format from a filename or MIME type.
+    """
+    name = (filename or "").lower()
+    mime = (content_type or "").lower()
+    if name.endswith(".csv") or "csv" in mime:
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in mime or "jsonl" in mime:
+        return "ndjson"
+    return None
+
+
+def _read_rows(stream: IO[str], fmt: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Yield ``(row_number, raw_row)``; undecodable NDJSON lines yield the error.
+    """
+    if fmt == "csv":
+        for number, row in enumerate(csv.DictReader(stream), start=1):
+            yield number, row
+        return
+
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield number, ValueError(f"Invalid JSON: {e.msg}")
+
+
+def _validate(raw: Any) -> Dict[str, Any]:
+    if isinstance(raw, Exception):
+        raise raw
+    if not isinstance(raw, dict):
+        raise ValueError("Row must be an object")
+
+    cleaned = {k.strip(): v for k, v in raw.items() if k and v is not None and v != ""}
+    try:
+        row = FruitImportValidation(**cleaned).model_dump()
+    except ValidationError as ve:
+        raise ValueError(
+            "; ".join(
+                f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in ve.errors()
+            )
+        )
+
+    if row["available_quantity"] is None:
+        row["available_quantity"] = row["total_quantity"]
+    row["sell_by_date"] = datetime.combine(row["sell_by_date"], time.min)
+    return row
+
+
+def _existing_hashes(column, hashes: set) -> Dict[str, int]:
+    """
+    Map each known content hash to its primary key with one indexed IN probe.
+    """
+    pk = column.table.primary_key.columns[0]
+    rows = db.session.execute(select(column, pk).where(column.in_(hashes)))
+    return dict(rows.all())
+
+
+def _import_chunk(chunk: List[Tuple[int, dict]], report: dict):
+    """
+    Insert one chunk of validated rows in a single transaction.
+
+    Duplicates are resolved through the ``content_hash`` unique indexes:
+    known hashes are probed up front (so skips can be reported per row) and
+    inserts use ``ON CONFLICT DO NOTHING`` for rows that race in concurrently.
+    Counts and search indexing only cover the rows the inserts RETURNed.
+    """
+    fruit_hashes = {Fruit.hash_of(row) for _, row in chunk}
+    fruit_ids = _existing_hashes(Fruit.content_hash, fruit_hashes)
+
+    new_fruits = {}
+    for _, row in chunk:
+        fruit_hash = Fruit.hash_of(row)
+        if fruit_hash not in fruit_ids and fruit_hash not in new_fruits:
+            new_fruits[fruit_hash] = {
+                **{f: row[f] for f in Fruit.HASH_FIELDS},
+                "image_url": row["image_url"],
+                "content_hash": fruit_hash,
+            }
+
+    created = []
+    if new_fruits:
+        created = db.session.execute(
+            dialect_insert(Fruit)
+            .on_conflict_do_nothing(index_elements=["content_hash"])
+            .returning(Fruit.fruit_id, Fruit.name, Fruit.color, Fruit.content_hash),
+            list(new_fruits.values()),
+        ).all()
+        for fruit in created:
+            fruit_ids[fruit.content_hash] = fruit.fruit_id
+        raced = new_fruits.keys() - fruit_ids.keys()
+        if raced:
+            fruit_ids.update(_existing_hashes(Fruit.content_hash, raced))
+        search_index.index_fruits(
+            [
+                {"fruit_id": f.fruit_id, "name": f.name, "color": f.color}
+                for f in created
+            ]
+        )
+
+    lots = {}
+    for number, row in chunk:
+        lot = {
+            "fruit_id": fruit_ids[Fruit.hash_of(row)],
+            "weight": row["weight"],
+            "price": row["price"],
+            "total_quantity": row["total_quantity"],
+            "available_quantity": row["available_quantity"],
+            "sell_by_date": row["sell_by_date"],
+            "created_at": datetime.utcnow(),
+        }
+        lot["content_hash"] = FruitInfo.hash_of(lot)
+        lots[lot["content_hash"]] = (number, lot)
+
+    existing_lots = _existing_hashes(FruitInfo.content_hash, set(lots))
+    new_lots = {h: lot for h, lot in lots.items() if h not in existing_lots}
+
+    inserted_lots = set()
+    if new_lots:
+        inserted_lots = set(
+            db.session.execute(
+                dialect_insert(FruitInfo)
+                .on_conflict_do_nothing(index_elements=["content_hash"])
+                .returning(FruitInfo.content_hash),
+                [lot for _, lot in new_lots.values()],
+            ).scalars()
+        )
+    skipped = [
+        {"row": number, "error": "Fruit info with these details already exists"}
+        for lot_hash, (number, _) in lots.items()
+        if lot_hash not in inserted_lots
+    ]
+
+    if created or inserted_lots:
+        version_service.bump(version_service.CATALOG)
+    db.session.commit()
+
+    # Only a committed chunk reports its rows; a failed one reports them all
+    # as failed instead.
+    report["fruits_created"] += len(created)
+    report["lots_created"] += len(inserted_lots)
+    report["skipped"] += len(skipped)
+    report["errors"].extend(skipped)
+
+
+def import_fruits(stream: IO[str], fmt: str, chunk_size: int | None = None) -> dict:
+    """
+    Bulk import fruits and their lots from CSV or NDJSON.
+
+    Rows are validated and de-duplicated in memory, then inserted with
+    executemany in one transaction per chunk. Rows for an existing fruit
+    add a new lot to it; lots whose content hash already exists are
+    reported and skipped.
+
+    Parameters
+    ----------
+    stream : IO[str]
+        Text stream with a CSV header row or one JSON object per line.
+    fmt : str
+        ``"csv"`` or ``"ndjson"``.
+    chunk_size : int, optional
+        Rows per transaction; defaults to ``IMPORT_CHUNK_SIZE``.
+
+    Returns
+    -------
+    dict
+        Counts of processed/created/skipped rows and per-row ``errors``.
+    """
+    if fmt not in SUPPORTED_FORMATS:
+        raise ValueError(f"Unsupported import format: {fmt}")
+    chunk_size = chunk_size or current_app.config["IMPORT_CHUNK_SIZE"]
+
+    report = {
+        "processed": 0,
+        "fruits_created": 0,
+        "lots_created": 0,
+        "skipped": 0,
+        "errors": [],
+    }
+    seen_lots = set()
+    rows = _read_rows(stream, fmt)
+
+    while True:
+        batch = list(islice(rows, chunk_size))
+        if not batch:
+            break
+
+        chunk = []
+        for number, raw in batch:
+            report["processed"] += 1
+            try:
+                row = _validate(raw)
+            except ValueError as e:
+                report["errors"].append({"row": number, "error": str(e)})
+                continue
+
+            key = content_hash(Fruit.hash_of(row), *(row[f] for f in _LOT_FIELDS))
+            if key in seen_lots:
+                report["skipped"] += 1
+                report["errors"].append(
+                    {"row": number, "error": "Duplicate row in import"}
+                )
+                continue
+            seen_lots.add(key)
+            chunk.append((number, row))
+
+        if not chunk:
+            continue
+        try:
+            _import_chunk(chunk, report)
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("Import chunk failed", first_row=chunk[0][0])
+            report["errors"].extend(
+                {"row": number, "error": f"Chunk failed: {e}"} for number, _ in chunk
+            )
+
+    logger.info(
+        "Fruit import finished",
+        processed=report["processed"],
+        fruits_created=report["fruits_created"],
+        lots_created=report["lots_created"],
+        errors=len(report["errors"]),
+    )
+    return report
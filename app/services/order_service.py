@@ -1,110 +1,516 @@
-from datetime import datetime
+import json
+from datetime import datetime, timedelta
+from typing import Iterator
+
+from flask import current_app
+from sqlalchemy import delete, insert, select, tuple_, union_all, update
 
 from app.extensions import db
 from app.models.cart import Cart
-from app.models.fruit import FruitInfo
-from app.models.orders import Order
+from app.models.fruit import Fruit, FruitInfo
+from app.models.orders import Order, OrderArchive, OrderJob, ParentOrder
 from app.models.users import User
+from app.services import analytics_service, reservation_service, version_service
 from app.utils.log_config import get_logger
 
 logger = get_logger("order_service")
 
 
+def _check_order_request(user_id: int, cart_ids: list[int]):
+    user = User.query.get(user_id)
+    if not user:
+        raise ValueError("User not found")
+
+    if not cart_ids:
+        raise ValueError("Cart is empty")
+
+
+def _checkout(user_id: int, cart_ids: list[int]) -> dict:
+    """
+    Check out the selected cart lines in the caller's transaction.
+
+    Stock held for the lines at cart time is converted into the order as
+    is; only quantities beyond the holds are taken from stock (with the
+    usual re-check), and holds larger than their line give the excess back.
+    One ``ParentOrder`` with the stored total groups the order lines, which
+    are inserted with one executemany INSERT and read back with one
+    projection query; the statement count is the same for any number of
+    lines. The daily sales rollup is updated in the same transaction.
+    Nothing is committed.
+    """
+    selected = set(cart_ids)
+    lines = db.session.execute(
+        select(
+            Cart.cart_id,
+            Cart.fruit_id,
+            Cart.info_id,
+            Cart.quantity,
+            Fruit.name.label("fruit_name"),
+            Fruit.size.label("fruit_size"),
+        )
+        .outerjoin(Fruit, Fruit.fruit_id == Cart.fruit_id)
+        .where(Cart.cart_id.in_(selected), Cart.user_id == user_id)
+        .order_by(Cart.cart_id)
+    ).all()
+    if not lines:
+        logger.warning("No cart items to place order", user_id=user_id)
+        raise ValueError("Cart is empty")
+    missing = sorted(selected - {line.cart_id for line in lines})
+    if missing:
+        logger.warning("Cart items not found", user_id=user_id, cart_ids=missing)
+        raise ValueError(f"Cart items not found: {', '.join(map(str, missing))}")
+
+    requested = {}
+    for line in lines:
+        requested[line.info_id] = requested.get(line.info_id, 0) + line.quantity
+    held = reservation_service.convert_holds(selected)
+    changed = {
+        info_id: quantity - held.get(info_id, 0)
+        for info_id, quantity in requested.items()
+        if quantity != held.get(info_id, 0)
+    }
+    prices = reservation_service.take_stock(changed) if changed else {}
+    if len(prices) < len(requested):
+        prices.update(
+            db.session.execute(
+                select(FruitInfo.info_id, FruitInfo.price).where(
+                    FruitInfo.info_id.in_(requested.keys() - prices.keys())
+                )
+            ).all()
+        )
+
+    order_date = datetime.utcnow()
+    total = sum(line.quantity * prices[line.info_id] for line in lines)
+    parent_id = db.session.execute(
+        insert(ParentOrder)
+        .values(user_id=user_id, order_date=order_date, total_amount=total)
+        .returning(ParentOrder.id)
+    ).scalar_one()
+
+    params = [
+        {
+            "parent_order_id": parent_id,
+            "user_id": user_id,
+            "fruit_id": line.fruit_id,
+            "info_id": line.info_id,
+            "is_seeded": False,
+            "quantity": line.quantity,
+            "price_by_fruit": prices[line.info_id],
+            "order_date": order_date,
+        }
+        for line in lines
+    ]
+    db.session.execute(insert(Order), params)
+    analytics_service.record_sales(params)
+    order_rows = (
+        db.session.execute(
+            _order_select()
+            .where(Order.parent_order_id == parent_id)
+            .order_by(Order.order_id)
+        )
+        .mappings()
+        .all()
+    )
+
+    db.session.execute(
+        delete(Cart)
+        .where(Cart.cart_id.in_(selected))
+        .execution_options(synchronize_session=False)
+    )
+    return {
+        "order_id": parent_id,
+        "order_total": round(total, 2),
+        "order_items": [_order_row_to_dict(row) for row in order_rows],
+    }
+
+
 def place_order(user_id: int, cart_ids: list[int]) -> dict:
     """
-    Create an order from a user's cart.
+    Create an order from the selected lines of a user's cart.
+
+    Only ``cart_ids`` are checked out; the rest of the cart is kept.
 
     Parameters
     ----------
     user_id : int
+    cart_ids : list[int]
+        Cart lines to check out; all must belong to the user.
 
     Returns
     -------
     dict
-        Summary of the placed order.
+        Summary of the placed order: ``order_id`` (the parent order),
+        ``order_total`` and ``order_items``.
     """
-    user = User.query.get(user_id)
-    if not user:
-        raise ValueError("User not found")
-
-    if not cart_ids:
-        raise ValueError("Cart is empty")
+    _check_order_request(user_id, cart_ids)
 
-    carts = Cart.query.filter(Cart.cart_id.in_(cart_ids), Cart.user_id == user_id).all()
-    if not carts:
-        raise ValueError("Cart is empty")
     try:
-        cart_items = Cart.query.filter_by(user_id=user_id).all()
-        if not cart_items:
-            logger.warning("No cart items to place order", user_id=user_id)
-            raise ValueError("Cart is empty")
+        summary = _checkout(user_id, cart_ids)
+        db.session.commit()
+        version_service.bump_committed(version_service.ORDERS)
+        logger.info(
+            "Order placed",
+            user_id=user_id,
+            parent_order_id=summary["order_id"],
+            item_count=len(summary["order_items"]),
+            total=summary["order_total"],
+        )
+        return summary
+
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Failed to place order", user_id=user_id)
+        raise
 
-        created_orders = []
-        total = 0.0
 
-        for item in cart_items:
-            fruit_info = item.fruit_info
-            if fruit_info.available_quantity < item.quantity:
-                logger.warning("Not enough quantity", fruit_id=item.fruit_id)
-                raise ValueError("Not enough stock for one or more fruits")
+def enqueue_order(user_id: int, cart_ids: list[int]) -> dict:
+    """
+    Queue a checkout for the order workers instead of running it now.
+
+    Parameters
+    ----------
+    user_id : int
+    cart_ids : list[int]
+        Cart lines to check out; validated when the job runs.
 
-            fruit_info.available_quantity -= item.quantity
+    Returns
+    -------
+    dict
+        ``job_id`` and ``status`` of the queued job.
+    """
+    _check_order_request(user_id, cart_ids)
 
-            order = Order(
+    try:
+        job_id = db.session.execute(
+            insert(OrderJob)
+            .values(
                 user_id=user_id,
-                fruit_id=item.fruit_id,
-                info_id=item.info_id,
-                quantity=item.quantity,
-                price_by_fruit=fruit_info.price,
-                order_date=datetime.utcnow(),
+                cart_ids=json.dumps(sorted(set(cart_ids))),
+                status=OrderJob.QUEUED,
+                created_at=datetime.utcnow(),
             )
-            db.session.add(order)
-            created_orders.append(order)
-            total += order.total_price
-            db.session.delete(item)
-
+            .returning(OrderJob.id)
+        ).scalar_one()
         db.session.commit()
-        logger.info(
-            "Order placed", user_id=user_id, item_count=len(created_orders), total=total
+        logger.info("Order queued", user_id=user_id, job_id=job_id)
+        return {"job_id": job_id, "status": OrderJob.QUEUED}
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Failed to queue order", user_id=user_id)
+        raise
+
+
+def _claim_order_job():
+    """
+    Mark the oldest queued job as processing and return it.
+
+    Jobs left ``processing`` longer than ``ORDER_JOB_TIMEOUT_SECONDS`` (a
+    worker died mid-checkout) are queued again first; that is safe because
+    a checkout and its job outcome commit together, and the outcome is only
+    written while the claim is still held. On PostgreSQL the
+    candidate row is locked with SKIP LOCKED so workers never contend.
+    """
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=current_app.config["ORDER_JOB_TIMEOUT_SECONDS"])
+    db.session.execute(
+        update(OrderJob)
+        .where(OrderJob.status == OrderJob.PROCESSING, OrderJob.claimed_at < stale)
+        .values(status=OrderJob.QUEUED)
+    )
+    next_id = (
+        select(OrderJob.id)
+        .where(OrderJob.status == OrderJob.QUEUED)
+        .order_by(OrderJob.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    job = db.session.execute(
+        update(OrderJob)
+        .where(OrderJob.id == next_id, OrderJob.status == OrderJob.QUEUED)
+        .values(status=OrderJob.PROCESSING, claimed_at=now)
+        .returning(
+            OrderJob.id, OrderJob.user_id, OrderJob.cart_ids, OrderJob.claimed_at
         )
-        return {
-            "order_total": round(total, 2),
-            "order_items": [o.as_dict() for o in created_orders],
-        }
+    ).first()
+    db.session.commit()
+    return job
+
+
+def _finish_order_job(job, **values) -> bool:
+    """
+    Record the outcome of a claimed job, in the caller's transaction.
 
+    The write only applies while ``job`` still holds its claim; a job that
+    was requeued as stale and claimed again belongs to the new worker.
+
+    Returns
+    -------
+    bool
+        False if the claim was lost and nothing was written.
+    """
+    finished = db.session.execute(
+        update(OrderJob)
+        .where(
+            OrderJob.id == job.id,
+            OrderJob.status == OrderJob.PROCESSING,
+            OrderJob.claimed_at == job.claimed_at,
+        )
+        .values(finished_at=datetime.utcnow(), **values)
+    ).rowcount
+    return finished == 1
+
+
+def process_next_order_job() -> int | None:
+    """
+    Claim and run one queued checkout.
+
+    The order and the job's ``done`` status commit in one transaction. A
+    checkout rejected with ``ValueError`` (empty cart, not enough stock, ...)
+    marks the job ``failed`` with that message. If the job was requeued and
+    claimed by another worker meanwhile, the checkout is rolled back and
+    that worker's outcome stands.
+
+    Returns
+    -------
+    int or None
+        Id of the processed job, or None if the queue is empty.
+    """
+    try:
+        job = _claim_order_job()
     except Exception as e:
         db.session.rollback()
-        logger.exception("Failed to place order", user_id=user_id)
+        logger.exception("Failed to claim order job")
         raise
+    if job is None:
+        return None
+
+    try:
+        cart_ids = json.loads(job.cart_ids)
+        _check_order_request(job.user_id, cart_ids)
+        summary = _checkout(job.user_id, cart_ids)
+        if not _finish_order_job(
+            job,
+            status=OrderJob.DONE,
+            parent_order_id=summary["order_id"],
+            result=json.dumps(summary),
+        ):
+            # Another worker took the job over; its outcome stands.
+            db.session.rollback()
+            logger.warning("Order job claim lost", job_id=job.id)
+            return job.id
+        db.session.commit()
+        version_service.bump_committed(version_service.ORDERS)
+        logger.info(
+            "Queued order placed",
+            job_id=job.id,
+            user_id=job.user_id,
+            parent_order_id=summary["order_id"],
+        )
+    except Exception as e:
+        db.session.rollback()
+        if isinstance(e, ValueError):
+            logger.warning("Queued order rejected", job_id=job.id, reason=str(e))
+            error = str(e)
+        else:
+            logger.exception("Queued order failed", job_id=job.id)
+            error = "Failed to place order"
+        if not _finish_order_job(job, status=OrderJob.FAILED, error=error[:255]):
+            logger.warning("Order job claim lost", job_id=job.id)
+        db.session.commit()
+    return job.id
+
+
+def process_order_jobs(max_jobs: int | None = None) -> int:
+    """
+    Run queued checkouts until the queue is empty (or ``max_jobs`` ran).
+
+    Returns
+    -------
+    int
+        Number of jobs processed.
+    """
+    processed = 0
+    while max_jobs is None or processed < max_jobs:
+        if process_next_order_job() is None:
+            break
+        processed += 1
+    return processed
+
+
+def get_order_job(job_id: int) -> dict | None:
+    """
+    Report the state of a queued checkout.
+
+    Returns
+    -------
+    dict or None
+        ``job_id``, ``user_id``, ``status``, ``order_id`` (the parent order
+        once done), ``error`` (once failed), timestamps and, once done, the
+        order summary under ``result``; None if the job does not exist.
+    """
+    job = db.session.get(OrderJob, job_id)
+    if job is None:
+        return None
+    return {
+        "job_id": job.id,
+        "user_id": job.user_id,
+        "status": job.status,
+        "order_id": job.parent_order_id,
+        "error": job.error,
+        "created_at": str(job.created_at),
+        "finished_at": str(job.finished_at) if job.finished_at else None,
+        "result": json.loads(job.result) if job.result else None,
+    }
+
+
+def _order_select(model=Order):
+    """
+    Column-projected order SELECT with the fruit attributes joined in.
+
+    ``model`` is ``Order`` or ``OrderArchive``, which share their columns.
+    """
+    return select(
+        model.order_id,
+        model.user_id,
+        model.fruit_id,
+        model.info_id,
+        Fruit.name.label("fruit_name"),
+        Fruit.size.label("fruit_size"),
+        model.is_seeded,
+        model.quantity,
+        model.order_date,
+        model.price_by_fruit,
+    ).outerjoin(Fruit, Fruit.fruit_id == model.fruit_id)
+
+
+def _order_row_to_dict(row) -> dict:
+    """
+    Serialize an order row mapping into the ``Order.as_dict`` shape.
+    """
+    item = dict(row)
+    item["order_date"] = str(row["order_date"])
+    item["total_price"] = row["quantity"] * row["price_by_fruit"]
+    return item
+
+
+def _keyset_page(stmt, limit: int | None, before: tuple | None, model=Order):
+    """
+    Apply newest-first keyset pagination on ``(order_date, order_id)``.
+
+    The row-value comparison lets the database seek straight to the cursor
+    in the ``(..., order_date DESC, order_id DESC)`` indexes.
+    """
+    stmt = stmt.order_by(model.order_date.desc(), model.order_id.desc())
+    if before is not None:
+        stmt = stmt.where(tuple_(model.order_date, model.order_id) < tuple(before))
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
 
 
-def get_order_history(user_id: int) -> list:
+def _read_orders(filters, limit: int | None, before: tuple | None) -> list:
     """
-    Retrieve all past orders for a user.
+    Read a newest-first page of orders across the hot and archived tables
+    in one query.
+
+    Each table contributes at most ``limit`` rows through its own keyset
+    index seek; the two pages are joined with ``UNION ALL`` and the outer
+    query keeps the newest ``limit`` of them. Every archived order is
+    older than every order in ``orders``, so a recent page's archive
+    branch stops at the index probe.
+
+    Parameters
+    ----------
+    filters : callable
+        Returns the WHERE criteria for a model (``Order`` or ``OrderArchive``).
+    """
+    pages = union_all(
+        *(
+            select(
+                _keyset_page(
+                    _order_select(model).where(*filters(model)), limit, before, model
+                ).subquery()
+            )
+            for model in (Order, OrderArchive)
+        )
+    ).subquery()
+    stmt = _keyset_page(select(pages), limit, None, pages.c)
+    rows = db.session.execute(stmt).mappings().all()
+    return [_order_row_to_dict(row) for row in rows]
+
+
+def get_order_history(
+    user_id: int, limit: int | None = None, before: tuple | None = None
+) -> list:
+    """
+    Retrieve past orders for a user, hot and archived, newest first.
+
+    Every page is one ``UNION ALL`` query (see ``_read_orders``): a seek on
+    ``ix_orders_user_history`` in ``orders`` and one on
+    ``ix_orders_archive_user_history`` in ``orders_archive`` each yield up
+    to ``limit`` rows, with fruit attributes joined in, and the newest
+    ``limit`` are kept. While the user's recent orders fill the page the
+    archive branch stops at its index probe; once they run out, the same
+    page continues into the archive.
 
     Parameters
     ----------
     user_id : int
+    limit : int, optional
+        Maximum number of orders to return.
+    before : tuple, optional
+        Keyset cursor ``(order_date, order_id)`` of the last order already
+        seen; only strictly older orders are returned, from both tables, so
+        paging crosses from hot into archived orders without gaps.
 
     Returns
     -------
     list
     """
-    orders = (
-        Order.query.filter_by(user_id=user_id).order_by(Order.order_date.desc()).all()
-    )
+    orders = _read_orders(lambda model: [model.user_id == user_id], limit, before)
     logger.info("Fetched order history", user_id=user_id, count=len(orders))
-    return [o.as_dict() for o in orders]
+    return orders
 
 
-def get_all_orders() -> list:
+def get_all_orders(limit: int | None = None, before: tuple | None = None) -> list:
     """
-    Retrieve all orders in the system.
+    Retrieve orders in the system, newest first, archived orders included.
+
+    Parameters
+    ----------
+    limit : int, optional
+        Maximum number of orders to return.
+    before : tuple, optional
+        Keyset cursor ``(order_date, order_id)`` of the last order already seen.
 
     Returns
     -------
     list
     """
-    orders = Order.query.order_by(Order.order_date.desc()).all()
+    orders = _read_orders(lambda model: [], limit, before)
     logger.info("Fetched all orders", count=len(orders))
-    return [o.as_dict() for o in orders]
+    return orders
+
+
+def iter_all_orders() -> Iterator[dict]:
+    """
+    Stream every order, newest first, then the archived ones.
+
+    Rows are read through a server-side cursor in ``STREAM_BATCH_SIZE``
+    batches, with fruit attributes joined in, so memory stays flat no
+    matter how many orders exist.
+
+    Yields
+    ------
+    dict
+        Orders in the ``Order.as_dict`` shape.
+    """
+    for model in (Order, OrderArchive):
+        stmt = (
+            _order_select(model)
+            .order_by(model.order_date.desc(), model.order_id.desc())
+            .execution_options(yield_per=current_app.config["STREAM_BATCH_SIZE"])
+        )
+        for row in db.session.execute(stmt).mappings():
+            yield _order_row_to_dict(row)
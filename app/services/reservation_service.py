@@ -0,0 +1,286 @@
+from datetime import datetime, timedelta
+from typing import Iterable
+
+from flask import current_app
+from sqlalchemy import case, delete, select, update
+
+from app.extensions import db
+from app.models.cart import CartReservation
+from app.models.fruit import FruitInfo
+from app.utils.dialect import dialect_insert
+from app.utils.log_config import get_logger
+
+logger = get_logger("reservation_service")
+
+
+class OutOfStockError(ValueError):
+    """
+    Raised when a lot does not have enough available stock to take.
+    """
+
+
+def _adjust_stock(deltas: dict[int, int]):
+    """
+    UPDATE ``available_quantity`` of every lot in ``deltas`` (by ``info_id``)
+    by its delta, in one statement.
+    """
+    delta = case(deltas, value=FruitInfo.info_id)
+    return (
+        update(FruitInfo)
+        .where(FruitInfo.info_id.in_(deltas))
+        .values(available_quantity=FruitInfo.available_quantity + delta)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def take_stock(requested: dict[int, int]) -> dict[int, float]:
+    """
+    Atomically take ``requested`` quantities (by ``info_id``) out of stock.
+
+    A single conditional UPDATE decrements every lot that still has enough
+    ``available_quantity``; the database re-checks the condition under its
+    row locks, so concurrent callers can neither oversell nor need
+    application-level locking. Negative quantities put stock back. If any
+    lot is short, nothing is kept: the caller's transaction must be rolled
+    back.
+
+    Returns
+    -------
+    dict
+        Unit price of each updated lot, by ``info_id``.
+
+    Raises
+    ------
+    OutOfStockError
+        If any lot does not have enough stock.
+    """
+    needed = case(requested, value=FruitInfo.info_id)
+    rows = db.session.execute(
+        _adjust_stock({info_id: -qty for info_id, qty in requested.items()})
+        .where(FruitInfo.available_quantity >= needed)
+        .returning(FruitInfo.info_id, FruitInfo.price)
+    ).all()
+
+    if len(rows) != len(requested):
+        short = sorted(requested.keys() - {row.info_id for row in rows})
+        logger.warning("Not enough quantity", info_ids=short)
+        raise OutOfStockError("Not enough stock for one or more fruits")
+    return {row.info_id: row.price for row in rows}
+
+
+def _return_stock(rows) -> int:
+    """
+    Put the quantities of released hold ``rows`` back into stock.
+
+    Lots deleted in the meantime are skipped.
+    """
+    returned = {}
+    for row in rows:
+        returned[row.info_id] = returned.get(row.info_id, 0) + row.quantity
+    if returned:
+        db.session.execute(_adjust_stock(returned))
+    return len(rows)
+
+
+def _expiry(now: datetime | None = None) -> datetime:
+    minutes = current_app.config["CART_HOLD_MINUTES"]
+    return (now or datetime.utcnow()) + timedelta(minutes=minutes)
+
+
+def hold_stock(holds: list[dict], now: datetime | None = None):
+    """
+    Take stock for cart lines and add it to their holds, in the caller's
+    transaction.
+
+    Each hold's expiry is pushed to ``CART_HOLD_MINUTES`` from ``now``. The
+    stock is taken with one conditional UPDATE and the holds are upserted
+    with one executemany INSERT, whatever the number of lines.
+
+    Parameters
+    ----------
+    holds : list[dict]
+        ``{"cart_id", "info_id", "quantity"}`` of the quantity added to
+        each cart line.
+    now : datetime, optional
+        Reference time (UTC); defaults to the current time.
+
+    Raises
+    ------
+    OutOfStockError
+        If any lot does not have enough stock; nothing is held.
+    """
+    requested = {}
+    for hold in holds:
+        requested[hold["info_id"]] = (
+            requested.get(hold["info_id"], 0) + hold["quantity"]
+        )
+    take_stock(requested)
+
+    expires_at = _expiry(now)
+    stmt = dialect_insert(CartReservation)
+    db.session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["cart_id"],
+            set_={
+                "quantity": CartReservation.quantity + stmt.excluded.quantity,
+                "expires_at": stmt.excluded.expires_at,
+            },
+        ),
+        [
+            {
+                "cart_id": hold["cart_id"],
+                "info_id": hold["info_id"],
+                "quantity": hold["quantity"],
+                "expires_at": expires_at,
+            }
+            for hold in holds
+        ],
+    )
+
+
+def set_hold(cart_id: int, info_id: int, quantity: int, now: datetime | None = None):
+    """
+    Make a cart line's hold cover exactly ``quantity``, in the caller's
+    transaction.
+
+    Only the difference to the current hold is taken from (or returned to)
+    stock. The hold row is locked first on PostgreSQL so the sweeper cannot
+    release it concurrently.
+
+    Raises
+    ------
+    OutOfStockError
+        If the lot does not have enough stock for the increase.
+    """
+    held = db.session.execute(
+        select(CartReservation.quantity)
+        .where(CartReservation.cart_id == cart_id)
+        .with_for_update()
+    ).scalar()
+    delta = quantity - (held or 0)
+    if delta:
+        take_stock({info_id: delta})
+
+    stmt = dialect_insert(CartReservation).values(
+        cart_id=cart_id, info_id=info_id, quantity=quantity, expires_at=_expiry(now)
+    )
+    db.session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["cart_id"],
+            set_={
+                "quantity": stmt.excluded.quantity,
+                "expires_at": stmt.excluded.expires_at,
+            },
+        )
+    )
+
+
+def release_holds(cart_ids: Iterable[int]) -> int:
+    """
+    Delete the holds of ``cart_ids`` and put their stock back, in the
+    caller's transaction.
+
+    Call this before deleting cart lines. ``cart_ids`` may be a list or a
+    SELECT of cart ids.
+
+    Returns
+    -------
+    int
+        Number of holds released.
+    """
+    rows = db.session.execute(
+        delete(CartReservation)
+        .where(CartReservation.cart_id.in_(cart_ids))
+        .returning(CartReservation.info_id, CartReservation.quantity)
+        .execution_options(synchronize_session=False)
+    ).all()
+    return _return_stock(rows)
+
+
+def convert_holds(cart_ids: Iterable[int]) -> dict[int, int]:
+    """
+    Delete the holds of ``cart_ids`` without returning their stock, in the
+    caller's transaction; checkout turns them into order lines.
+
+    Holds past ``expires_at`` that the sweeper has not released yet still
+    count: their stock has not been put back.
+
+    Returns
+    -------
+    dict
+        Quantity held per ``info_id``.
+    """
+    rows = db.session.execute(
+        delete(CartReservation)
+        .where(CartReservation.cart_id.in_(cart_ids))
+        .returning(CartReservation.info_id, CartReservation.quantity)
+        .execution_options(synchronize_session=False)
+    ).all()
+    held = {}
+    for row in rows:
+        held[row.info_id] = held.get(row.info_id, 0) + row.quantity
+    return held
+
+
+def sweep_expired_holds(
+    now: datetime | None = None, chunk_size: int | None = None
+) -> int:
+    """
+    Release holds past their ``expires_at`` and put their stock back.
+
+    Expired holds are walked through the ``expires_at`` index and released
+    in chunks, each in its own short transaction. A hold refreshed between
+    the read and the delete is left alone.
+
+    Parameters
+    ----------
+    now : datetime, optional
+        Reference time (UTC); defaults to the current time.
+    chunk_size : int, optional
+        Holds per chunk; defaults to ``CART_SWEEP_CHUNK_SIZE``.
+
+    Returns
+    -------
+    int
+        Number of holds released.
+    """
+    now = now or datetime.utcnow()
+    chunk_size = chunk_size or current_app.config["CART_SWEEP_CHUNK_SIZE"]
+
+    released = 0
+    try:
+        while True:
+            ids = (
+                db.session.execute(
+                    select(CartReservation.cart_id)
+                    .where(CartReservation.expires_at < now)
+                    .order_by(CartReservation.expires_at)
+                    .limit(chunk_size)
+                )
+                .scalars()
+                .all()
+            )
+            if not ids:
+                break
+
+            rows = db.session.execute(
+                delete(CartReservation)
+                .where(
+                    CartReservation.cart_id.in_(ids),
+                    CartReservation.expires_at < now,
+                )
+                .returning(CartReservation.info_id, CartReservation.quantity)
+                .execution_options(synchronize_session=False)
+            ).all()
+            released += _return_stock(rows)
+            db.session.commit()
+
+            if len(ids) < chunk_size:
+                break
+
+        logger.info("Expired cart holds released", released=released)
+        return released
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Cart hold sweep failed", released=released)
+        raise
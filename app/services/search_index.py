@@ -0,0 +1,137 @@
+from typing import Iterable, List
+
+from sqlalchemy import Float, Integer, func, literal, or_, select, text
+
+from app.extensions import db
+from app.models.fruit import Fruit
+from app.utils.log_config import get_logger
+
+logger = get_logger("search_index")
+
+#: SQLite FTS5 shadow table mirroring fruit name/color.
+FTS_TABLE = "fruit_search"
+
+#: Trigram indexes cannot serve terms shorter than one trigram.
+MIN_TRIGRAM_LENGTH = 3
+
+
+def _dialect() -> str:
+    return db.session.get_bind().dialect.name
+
+
+def ensure_search_index():
+    """
+    Create the fruit search index for the current database.
+
+    - PostgreSQL: ``pg_trgm`` GIN indexes on ``fruit.name`` and ``fruit.color``,
+      which serve ``ILIKE '%term%'`` and ``similarity()`` ranking.
+    - SQLite: an FTS5 trigram table, backfilled with any missing fruits.
+
+    Runs in the caller's transaction (see the schema migrations).
+    """
+    dialect = _dialect()
+    if dialect == "postgresql":
+        db.session.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        for column in ("name", "color"):
+            db.session.execute(
+                text(
+                    f"CREATE INDEX IF NOT EXISTS ix_fruit_{column}_trgm "
+                    f"ON fruit USING gin ({column} gin_trgm_ops)"
+                )
+            )
+    elif dialect == "sqlite":
+        db.session.execute(
+            text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                "USING fts5(name, color, tokenize='trigram')"
+            )
+        )
+        db.session.execute(
+            text(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, color) "
+                "SELECT fruit_id, name, color FROM fruit "
+                f"WHERE fruit_id NOT IN (SELECT rowid FROM {FTS_TABLE})"
+            )
+        )
+    logger.info("Search index ready", dialect=dialect)
+
+
+def index_fruits(fruits: Iterable[Fruit | dict]):
+    """
+    Add fruits to the SQLite shadow table within the caller's transaction.
+
+    PostgreSQL indexes are maintained by the database, so this is a no-op there.
+    """
+    if _dialect() != "sqlite":
+        return
+
+    rows = [
+        (
+            f
+            if isinstance(f, dict)
+            else {
+                "fruit_id": f.fruit_id,
+                "name": f.name,
+                "color": f.color,
+            }
+        )
+        for f in fruits
+    ]
+    if rows:
+        db.session.execute(
+            text(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, color) "
+                "VALUES (:fruit_id, :name, :color)"
+            ),
+            rows,
+        )
+
+
+def remove_fruits(ids: List[int]):
+    """
+    Remove fruits from the SQLite shadow table within the caller's transaction.
+    """
+    if _dialect() != "sqlite" or not ids:
+        return
+
+    params = {f"id_{i}": fruit_id for i, fruit_id in enumerate(ids)}
+    placeholders = ", ".join(f":{name}" for name in params)
+    db.session.execute(
+        text(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})"), params
+    )
+
+
+def ranked_matches(term: str):
+    """
+    Build a subquery of ``(fruit_id, score)`` for fruits matching ``term``.
+
+    Higher scores are more relevant. Terms too short for a trigram lookup,
+    and unsupported dialects, fall back to an unranked ``ILIKE`` scan.
+    """
+    dialect = _dialect()
+    pattern = f"%{term}%"
+
+    if dialect == "sqlite" and len(term) >= MIN_TRIGRAM_LENGTH:
+        phrase = '"' + term.replace('"', '""') + '"'
+        return (
+            text(
+                f"SELECT rowid AS fruit_id, -bm25({FTS_TABLE}) AS score "
+                f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :phrase"
+            )
+            .bindparams(phrase=phrase)
+            .columns(fruit_id=Integer, score=Float)
+            .subquery("ranked")
+        )
+
+    if dialect == "postgresql":
+        score = func.greatest(
+            func.similarity(Fruit.name, term), func.similarity(Fruit.color, term)
+        )
+    else:
+        score = literal(0.0, Float)
+
+    return (
+        select(Fruit.fruit_id, score.label("score"))
+        .where(or_(Fruit.name.ilike(pattern), Fruit.color.ilike(pattern)))
+        .subquery("ranked")
+    )
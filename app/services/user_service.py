@@ -1,3 +1,7 @@
+from typing import Iterator
+
+from flask import current_app
+from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 
 from app.extensions import db
@@ -37,20 +41,54 @@ def create_user(name: str, email: str, phone_number: str) -> User:
         raise
 
 
-def get_all_users() -> list:
+def get_all_users(limit: int | None = None, after_id: int | None = None) -> list:
     """
-    Retrieve all users from the database.
+    Retrieve users from the database, ordered by ``user_id``.
+
+    Parameters
+    ----------
+    limit : int, optional
+        Maximum number of users to return.
+    after_id : int, optional
+        Keyset cursor; only users with a greater ``user_id`` are returned.
 
     Returns
     -------
     list
         List of User objects.
     """
-    users = User.query.all()
+    query = User.query.order_by(User.user_id)
+    if after_id is not None:
+        query = query.filter(User.user_id > after_id)
+    if limit is not None:
+        query = query.limit(limit)
+
+    users = query.all()
     logger.info("Retrieved all users", count=len(users))
     return users
 
 
+def iter_all_users() -> Iterator[dict]:
+    """
+    Stream every user as a dict, ordered by ``user_id``.
+
+    Rows are read through a server-side cursor in ``STREAM_BATCH_SIZE``
+    batches without hydrating User objects.
+
+    Yields
+    ------
+    dict
+        Users in the ``User.to_dict`` shape.
+    """
+    stmt = (
+        select(User.user_id, User.name, User.email, User.phone_number)
+        .order_by(User.user_id)
+        .execution_options(yield_per=current_app.config["STREAM_BATCH_SIZE"])
+    )
+    for row in db.session.execute(stmt).mappings():
+        yield dict(row)
+
+
 def get_user_by_id(user_id: int) -> User | None:
     """
     Retrieve a user by ID.
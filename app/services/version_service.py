@@ -0,0 +1,62 @@
+from datetime import datetime
+
+from sqlalchemy import update
+
+from app.extensions import db
+from app.models.versions import DataVersion
+from app.utils.log_config import get_logger
+
+logger = get_logger("version_service")
+
+#: Catalog reads (fruit, lots, facets).
+CATALOG = "catalog"
+#: The order list (placed, deleted or archived orders).
+ORDERS = "orders"
+
+
+def bump(*names: str, now: datetime | None = None):
+    """
+    Increment the named versions in the caller's transaction.
+
+    The rows are seeded by the migrations; concurrent writers serialize on
+    the row, so every committed change gets its own version.
+    """
+    db.session.execute(
+        update(DataVersion)
+        .where(DataVersion.name.in_(names))
+        .values(version=DataVersion.version + 1, updated_at=now or datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def bump_committed(*names: str):
+    """
+    Increment the named versions in their own short transaction, after the
+    caller committed its change.
+
+    Hot writers (checkout) use this so the version row is not locked for
+    their whole transaction. Until it commits, readers may see the change
+    under the previous version. A failure is logged, not raised: the change
+    itself is already committed.
+    """
+    try:
+        bump(*names)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        logger.exception("Failed to bump data versions", names=names)
+
+
+def get_version(name: str) -> tuple[int, datetime | None]:
+    """
+    Read a version with a primary-key lookup.
+
+    Returns
+    -------
+    tuple
+        ``(version, updated_at)``; ``(0, None)`` if the row does not exist.
+    """
+    row = db.session.get(DataVersion, name, populate_existing=True)
+    if row is None:
+        return 0, None
+    return row.version, row.updated_at
@@ -0,0 +1,111 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import current_app, g, has_request_context, request
+
+from app.services import version_service
+
+_MISSING = object()
+
+
+class CatalogCache:
+    """
+    Bounded, in-process LRU cache for catalog reads.
+
+    Entries belong to one shared catalog ``version`` (see
+    ``version_service``), which catalog writes bump in the database. When
+    :meth:`sync` sees a newer version, every entry is dropped, and a load
+    that started before the drop is not stored, so readers never see data
+    older than the last write committed by any process.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.version = None
+        self.last_modified = None
+        self.hits = 0
+        self.misses = 0
+        self._generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key, loader):
+        """
+        Return the cached value for ``key``, calling ``loader`` on a miss.
+        """
+        if self.maxsize <= 0:
+            return loader()
+
+        with self._lock:
+            value = self._entries.get(key, _MISSING)
+            if value is not _MISSING:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+            generation = self._generation
+
+        value = loader()
+
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return value
+
+    def sync(self, version: int, last_modified: datetime | None):
+        """
+        Adopt the shared catalog version, dropping every entry if it changed.
+        """
+        with self._lock:
+            if version != self.version:
+                self.version = version
+                self.last_modified = last_modified
+                self._generation += 1
+                self._entries.clear()
+
+    def invalidate(self):
+        """
+        Drop every cached entry of this process.
+        """
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "version": self.version,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def init_catalog_cache(app):
+    """
+    Attach a fresh catalog cache to the Flask app.
+    """
+    app.extensions["catalog_cache"] = CatalogCache(app.config["CATALOG_CACHE_SIZE"])
+
+
+def get_catalog_cache() -> CatalogCache:
+    """
+    Get the catalog cache of the current Flask app, synced to the shared
+    catalog version.
+
+    The version is read with one primary-key lookup per request (and on
+    every call outside a request).
+    """
+    cache = current_app.extensions["catalog_cache"]
+    if has_request_context():
+        current = request._get_current_object()
+        if g.get("catalog_synced") is current:
+            return cache
+        g.catalog_synced = current
+    cache.sync(*version_service.get_version(version_service.CATALOG))
+    return cache
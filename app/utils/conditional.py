@@ -0,0 +1,57 @@
+import hashlib
+from datetime import datetime, timezone
+
+from flask import Response, request
+
+
+def make_etag(*parts) -> str:
+    """
+    Hash validator parts (versions, ids, timestamps) into a strong ETag.
+    """
+    raw = "|".join(str(p) for p in parts)
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def _as_utc(value: datetime | None) -> datetime | None:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
+
+
+def not_modified(etag: str, last_modified: datetime | None = None):
+    """
+    Return a 304 response if the client's cached copy is still current.
+
+    ``If-None-Match`` takes precedence over ``If-Modified-Since``. Call this
+    before loading or serializing the resource so a revalidation is cheap.
+
+    Returns
+    -------
+    Response or None
+        A 304 response, or None when the full response must be sent.
+    """
+    last_modified = _as_utc(last_modified)
+
+    if request.if_none_match:
+        fresh = request.if_none_match.contains(etag)
+    elif last_modified and request.if_modified_since:
+        fresh = last_modified <= request.if_modified_since
+    else:
+        fresh = False
+
+    if not fresh:
+        return None
+    return with_validators(Response(status=304), etag, last_modified)
+
+
+def with_validators(response, etag: str, last_modified: datetime | None = None):
+    """
+    Attach ``ETag``/``Last-Modified`` and ask caches to always revalidate.
+    """
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = _as_utc(last_modified)
+    response.cache_control.no_cache = True
+    return response
@@ -0,0 +1,26 @@
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.extensions import db
+
+_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def dialect_name() -> str:
+    """
+    Name of the database dialect bound to the session.
+    """
+    return db.session.get_bind().dialect.name
+
+
+def dialect_insert(model):
+    """
+    Build an INSERT for ``model`` that supports ``on_conflict_do_nothing``
+    and ``on_conflict_do_update`` on the bound dialect.
+    """
+    name = dialect_name()
+    if name not in _INSERTS:
+        raise NotImplementedError(f"ON CONFLICT inserts are not supported on {name}")
+    return _INSERTS[name](model)
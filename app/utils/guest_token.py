@@ -0,0 +1,27 @@
+import secrets
+
+from flask import request
+
+#: Request/response header carrying an anonymous shopper's cart token.
+GUEST_TOKEN_HEADER = "X-Guest-Token"
+
+_MAX_LENGTH = 64
+
+
+def get_guest_token() -> str | None:
+    """
+    Read the guest cart token from the current request, if any.
+
+    Malformed (empty or over-long) tokens are treated as absent.
+    """
+    token = request.headers.get(GUEST_TOKEN_HEADER, "").strip()
+    if not token or len(token) > _MAX_LENGTH:
+        return None
+    return token
+
+
+def new_guest_token() -> str:
+    """
+    Issue a new opaque, unguessable guest cart token.
+    """
+    return secrets.token_urlsafe(24)
@@ -0,0 +1,157 @@
+import hashlib
+import json
+from contextlib import suppress
+from functools import wraps
+
+from flask import Response, jsonify, make_response, request
+
+from app.services import idempotency_service
+from app.services.cart_service import GUEST_USER_ID
+from app.utils.guest_token import GUEST_TOKEN_HEADER, get_guest_token
+from app.utils.log_config import get_logger
+
+logger = get_logger("idempotency")
+
+#: Request header naming a retry-safe request.
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+
+#: Response header set on responses replayed from a stored key.
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+_MAX_KEY_LENGTH = 255
+
+#: Response headers stored with the body and sent again on replay.
+_REPLAY_HEADERS = ("Content-Type", "Location", GUEST_TOKEN_HEADER)
+
+
+def _client() -> str:
+    """
+    Identify who a key belongs to: the ``user_id`` from the path or JSON
+    body, plus the guest token for the guest user.
+
+    Keys are only looked up within that scope, so users picking the same
+    key never see each other's responses, while a retry still matches from
+    any address. A guest without a token yet shares one scope; its random
+    key is what keeps its first request, and the token issued to it, apart.
+    """
+    user_id = (request.view_args or {}).get("user_id")
+    if user_id is None:
+        body = request.get_json(silent=True)
+        user_id = body.get("user_id") if isinstance(body, dict) else None
+    caller = f"user:{user_id}"
+    if user_id == GUEST_USER_ID:
+        caller += f" guest:{get_guest_token() or ''}"
+    return hashlib.sha256(caller.encode()).hexdigest()[:16]
+
+
+def _fingerprint() -> str:
+    digest = hashlib.sha256()
+    for part in (
+        request.method,
+        request.path,
+        request.headers.get(GUEST_TOKEN_HEADER, ""),
+    ):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def _replay(stored: dict) -> Response:
+    response = Response(
+        stored["response_body"],
+        status=stored["status_code"],
+        headers=json.loads(stored["response_headers"] or "{}"),
+    )
+    response.headers[REPLAYED_HEADER] = "true"
+    return response
+
+
+def idempotent(view):
+    """
+    Make a POST view safe to retry with an ``Idempotency-Key`` header.
+
+    The first request with a key runs the view and stores its response;
+    retries with the same key within ``IDEMPOTENCY_TTL_HOURS`` get the
+    stored response back without running the view again. Requests without
+    the header are unaffected. Keys are scoped to the user (see
+    ``_client``), method and path.
+
+    - A key reused with a different request body answers 422.
+    - A retry arriving while the first request still runs answers 409,
+      until the claim is older than ``IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS``;
+      the retry then takes it over and runs the view.
+    - 5xx responses are not stored, so the next retry runs the view again.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_KEY_HEADER, "").strip()
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > _MAX_KEY_LENGTH:
+            return (
+                jsonify(
+                    {
+                        "error": f"{IDEMPOTENCY_KEY_HEADER} must be at most "
+                        f"{_MAX_KEY_LENGTH} characters"
+                    }
+                ),
+                400,
+            )
+
+        scope = f"{_client()} {request.method} {request.path}"[:255]
+        fingerprint = _fingerprint()
+        try:
+            claimed_at, stored = idempotency_service.claim(scope, key, fingerprint)
+        except Exception:
+            return jsonify({"error": "Internal Server Error"}), 500
+
+        if stored is not None:
+            if stored["fingerprint"] != fingerprint:
+                logger.warning("Idempotency key reused", scope=scope)
+                return (
+                    jsonify(
+                        {
+                            "error": f"{IDEMPOTENCY_KEY_HEADER} was already used "
+                            "with a different request"
+                        }
+                    ),
+                    422,
+                )
+            if stored["status_code"] is None:
+                return jsonify({"error": "A request with this key is in progress"}), 409
+            logger.info("Idempotent response replayed", scope=scope)
+            return _replay(stored)
+
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            idempotency_service.release(scope, key, claimed_at)
+            raise
+
+        try:
+            if response.status_code >= 500:
+                idempotency_service.release(scope, key, claimed_at)
+            else:
+                headers = {
+                    name: response.headers[name]
+                    for name in _REPLAY_HEADERS
+                    if name in response.headers
+                }
+                idempotency_service.complete(
+                    scope,
+                    key,
+                    claimed_at,
+                    response.status_code,
+                    response.get_data(as_text=True),
+                    json.dumps(headers),
+                )
+        except Exception:
+            # The response still goes out; drop the claim so a retry is not
+            # stuck answering 409 until the key expires.
+            with suppress(Exception):
+                idempotency_service.release(scope, key, claimed_at)
+        return response
+
+    return wrapper
@@ -0,0 +1,107 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from flask import current_app, request
+
+#: Response header carrying the cursor for the next page.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+_CURSOR_DECODERS = {
+    int: int,
+    float: float,
+    datetime: datetime.fromisoformat,
+}
+
+
+def encode_cursor(*values) -> str:
+    """
+    Encode keyset values into an opaque, URL-safe cursor token.
+    """
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, types: tuple) -> tuple:
+    """
+    Decode a cursor token produced by :func:`encode_cursor`.
+
+    Parameters
+    ----------
+    token : str
+        Opaque cursor from the client.
+    types : tuple
+        Expected type of each keyset value (``int``, ``float`` or ``datetime``).
+
+    Returns
+    -------
+    tuple
+        Decoded keyset values.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError
+        return tuple(_CURSOR_DECODERS[t](v) for t, v in zip(types, values))
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError("Invalid cursor")
+
+
+def get_page_args(cursor_types: tuple) -> tuple[int, tuple | None]:
+    """
+    Read ``limit`` and ``cursor`` from the current request's query string.
+
+    ``limit`` defaults to ``PAGE_SIZE_DEFAULT`` and is capped at
+    ``PAGE_SIZE_MAX``.
+
+    Returns
+    -------
+    tuple
+        The page size and the decoded cursor (or None for the first page).
+    """
+    raw_limit = request.args.get("limit")
+    try:
+        limit = int(raw_limit) if raw_limit else current_app.config["PAGE_SIZE_DEFAULT"]
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit < 1:
+        raise ValueError("limit must be a positive integer")
+    limit = min(limit, current_app.config["PAGE_SIZE_MAX"])
+
+    token = request.args.get("cursor")
+    cursor = decode_cursor(token, cursor_types) if token else None
+    return limit, cursor
+
+
+def split_page(rows: list, limit: int, key) -> tuple[list, str | None]:
+    """
+    Trim a ``limit + 1`` fetch down to one page and derive the next cursor.
+
+    Parameters
+    ----------
+    rows : list
+        Rows fetched with ``limit + 1``.
+    limit : int
+        Requested page size.
+    key : callable
+        Returns the keyset values (as a tuple) of a row.
+
+    Returns
+    -------
+    tuple
+        The page rows and the cursor for the next page (None on the last page).
+    """
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(*key(page[-1]))
+
+
+def page_headers(next_cursor: str | None) -> dict:
+    """
+    Build the response headers advertising the next page.
+    """
+    return {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
@@ -0,0 +1,45 @@
+import threading
+
+from app.extensions import db
+from app.utils.log_config import get_logger
+
+logger = get_logger("periodic")
+
+
+def start_periodic(app, name: str, interval: float, job) -> threading.Event:
+    """
+    Run ``job`` every ``interval`` seconds on a daemon thread.
+
+    Each run gets its own application context and database session; a
+    failing run is logged and the schedule continues.
+
+    Parameters
+    ----------
+    app : Flask
+    name : str
+        Thread name, also used in log events.
+    interval : float
+        Seconds between the end of one run and the start of the next.
+    job : callable
+        Called without arguments inside the app context.
+
+    Returns
+    -------
+    threading.Event
+        Set it to stop the thread after the current run.
+    """
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval):
+            with app.app_context():
+                try:
+                    job()
+                except Exception:
+                    logger.exception("Periodic job failed", job=name)
+                finally:
+                    db.session.remove()
+
+    threading.Thread(target=loop, name=name, daemon=True).start()
+    logger.info("Periodic job started", job=name, interval=interval)
+    return stop
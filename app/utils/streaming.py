@@ -0,0 +1,38 @@
+from typing import Any, Iterable
+
+from flask import Response, current_app, request, stream_with_context
+
+#: Serialized bytes buffered before each chunk is flushed to the client.
+_CHUNK_SIZE = 64 * 1024
+
+
+def wants_stream() -> bool:
+    """
+    Return True when the client asked for a streamed response (``?stream=true``).
+    """
+    return request.args.get("stream", "").lower() in ("1", "true", "yes")
+
+
+def stream_json_array(items: Iterable[Any]) -> Response:
+    """
+    Stream ``items`` to the client as a JSON array.
+
+    Items are serialized one at a time and flushed in ~64 KB chunks, so
+    memory use and time-to-first-byte do not depend on the collection size.
+    """
+
+    def generate():
+        dumps = current_app.json.dumps
+        buffer = ["["]
+        size = 1
+        for index, item in enumerate(items):
+            chunk = ("," if index else "") + dumps(item)
+            buffer.append(chunk)
+            size += len(chunk)
+            if size >= _CHUNK_SIZE:
+                yield "".join(buffer)
+                buffer, size = [], 0
+        buffer.append("]")
+        yield "".join(buffer)
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
@@ -0,0 +1,24 @@
+from datetime import date
+from typing import Literal, Optional
+
+from pydantic import BaseModel, conint, model_validator
+
+
+class DateRangeValidation(BaseModel):
+    start: Optional[date] = None
+    end: Optional[date] = None
+
+    @model_validator(mode="after")
+    def start_before_end(self):
+        if self.start and self.end and self.start > self.end:
+            raise ValueError("start must not be after end")
+        return self
+
+
+class RevenueQueryValidation(DateRangeValidation):
+    fruit_id: Optional[conint(ge=1)] = None
+
+
+class TopSellersQueryValidation(DateRangeValidation):
+    limit: conint(ge=1, le=100) = 10
+    by: Literal["revenue", "quantity"] = "revenue"
@@ -1,6 +1,6 @@
-from typing import Optional
+from typing import List, Optional
 
-from pydantic import BaseModel, conint
+from pydantic import BaseModel, Field, conint
 
 
 class CartAddValidation(BaseModel):
@@ -9,5 +9,15 @@ class CartAddValidation(BaseModel):
     quantity: conint(ge=1)
 
 
+class CartBatchItemValidation(BaseModel):
+    fruit_id: conint(ge=1)
+    quantity: conint(ge=1)
+
+
+class CartBatchAddValidation(BaseModel):
+    user_id: Optional[int] = -1
+    items: List[CartBatchItemValidation] = Field(min_length=1, max_length=100)
+
+
 class CartUpdateValidation(BaseModel):
     quantity: conint(ge=1)
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 
 from pydantic import (
@@ -30,3 +30,23 @@ class FruitValidation(BaseModel):
         if v <= datetime.utcnow():
             raise ValueError("sell_by_date must be a future date")
         return v
+
+
+class FruitImportValidation(BaseModel):
+    name: constr(strip_whitespace=True, min_length=1)
+    description: Optional[constr(strip_whitespace=True)] = None
+    color: constr(strip_whitespace=True, min_length=1)
+    size: constr(strip_whitespace=True, min_length=1)
+    image_url: Optional[constr(strip_whitespace=True)] = None
+    has_seeds: bool = False
+    weight: confloat(gt=0)
+    price: confloat(gt=0)
+    total_quantity: conint(ge=0)
+    available_quantity: Optional[conint(ge=0)] = None
+    sell_by_date: date
+
+    @field_validator("sell_by_date")
+    def must_be_future(cls, v):
+        if v <= datetime.utcnow().date():
+            raise ValueError("sell_by_date must be a future date")
+        return v
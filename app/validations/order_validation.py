@@ -1,7 +1,13 @@
-from typing import List
+from typing import List, Literal
 
 from pydantic import BaseModel, StrictInt, StrictStr
 
+from app.validations.analytics_validation import DateRangeValidation
+
 
 class OrderValidation(BaseModel):
     cart_ids: List[StrictInt]
+
+
+class OrderExportValidation(DateRangeValidation):
+    format: Literal["csv", "parquet"] = "csv"
@@ -2,11 +2,15 @@ import os
 
 from dotenv import load_dotenv
 from flask import send_from_directory
+from flask.helpers import get_debug_flag
 
 from app import create_app
 
 # Load environment variables from .env
 load_dotenv()
+# Serve with the debugger and reloader unless FLASK_DEBUG=0; create_app
+# reads the same flag to keep background jobs out of the reloader parent.
+os.environ.setdefault("FLASK_DEBUG", "1")
 
 # Initialize the Flask app
 app = create_app()
@@ -23,4 +27,4 @@ if __name__ == "__main__":
     port = int(os.getenv("FLASK_RUN_PORT", 5000))
 
     print(f"🚀 Starting app at http://{host}:{port}")
-    app.run(debug=True, host=host, port=port)
+    app.run(debug=get_debug_flag(), host=host, port=port)
@@ -0,0 +1,47 @@
+from datetime import datetime
+
+
+def test_revenue_reflects_placed_order(client, setup_order_data):
+    data = setup_order_data
+    client.post(f"/order/place/{data['user_id']}", json={"cart_ids": [data["cart_id"]]})
+
+    response = client.get(f"/analytics/revenue?fruit_id={data['fruit_id']}")
+
+    assert response.status_code == 200
+    assert response.get_json() == [
+        {
+            "day": datetime.utcnow().date().isoformat(),
+            "fruit_id": data["fruit_id"],
+            "fruit_name": response.get_json()[0]["fruit_name"],
+            "order_lines": 1,
+            "quantity": 3,
+            "revenue": 12.0,
+        }
+    ]
+
+
+def test_top_sellers_includes_placed_order(client, setup_order_data):
+    data = setup_order_data
+    client.post(f"/order/place/{data['user_id']}", json={"cart_ids": [data["cart_id"]]})
+
+    response = client.get("/analytics/top-sellers?by=quantity&limit=100")
+
+    assert response.status_code == 200
+    assert data["fruit_id"] in [row["fruit_id"] for row in response.get_json()]
+
+
+def test_analytics_single_query(client, count_queries):
+    with count_queries() as statements:
+        response = client.get("/analytics/top-sellers")
+    assert response.status_code == 200
+    assert len(statements) == 1
+
+
+def test_revenue_rejects_inverted_range(client):
+    response = client.get("/analytics/revenue?start=2025-02-01&end=2025-01-01")
+    assert response.status_code == 400
+
+
+def test_top_sellers_rejects_unknown_metric(client):
+    response = client.get("/analytics/top-sellers?by=weight")
+    assert response.status_code == 400
@@ -79,6 +79,32 @@ def test_add_to_cart_success(client):
     assert response.get_json()
 
 
+def test_add_to_cart_batch_success(client):
+    _, user_id = add_user(client)
+    _, apple_id = add_fruit(client)
+    _, pear_id = add_fruit(client)
+
+    response = client.post(
+        "/cart/add-batch",
+        json={
+            "user_id": user_id,
+            "items": [
+                {"fruit_id": apple_id, "quantity": 2},
+                {"fruit_id": pear_id, "quantity": 1},
+            ],
+        },
+    )
+    assert response.status_code == 201
+    items = response.get_json()
+    assert [(i["fruit_id"], i["quantity"]) for i in items] == [
+        (apple_id, 2),
+        (pear_id, 1),
+    ]
+    assert items[0]["item_price"] == 20.0
+    assert items[0]["fruit_name"].startswith("Fruit-")
+    assert Cart.query.filter_by(user_id=user_id).count() == 2
+
+
 def test_get_cart_by_user_id_success(client):
     _, user_id = add_user(client)
     _, fruit_id = add_fruit(client)
@@ -91,6 +117,24 @@ def test_get_cart_by_user_id_success(client):
     assert isinstance(response.get_json(), list)
 
 
+def test_get_cart_by_user_id_single_query(client, count_queries):
+    _, user_id = add_user(client)
+    for _ in range(3):
+        _, fruit_id = add_fruit(client)
+        client.post(
+            "/cart/add", json={"user_id": user_id, "fruit_id": fruit_id, "quantity": 1}
+        )
+
+    with count_queries() as statements:
+        response = client.get(f"/cart/{user_id}")
+
+    assert response.status_code == 200
+    items = response.get_json()
+    assert len(items) == 3
+    assert all(item["fruit_name"].startswith("Fruit-") for item in items)
+    assert len(statements) == 1
+
+
 def test_associate_cart_success(client, app):
     with app.app_context():
         _, old_user_id = add_user(client, name="Old")
@@ -114,6 +158,232 @@ def test_associate_cart_success(client, app):
         assert len(cart_items) > 0
 
 
+def test_add_to_cart_merges_same_lot(client):
+    _, user_id = add_user(client)
+    _, fruit_id = add_fruit(client)
+
+    for quantity in (2, 3):
+        response = client.post(
+            "/cart/add",
+            json={"user_id": user_id, "fruit_id": fruit_id, "quantity": quantity},
+        )
+        assert response.status_code == 201
+
+    line = response.get_json()
+    assert line["quantity"] == 5
+    assert line["item_price"] == 50.0
+    assert Cart.query.filter_by(user_id=user_id).count() == 1
+
+
+def test_associate_cart_merges_overlapping_lines(client, app):
+    with app.app_context():
+        _, old_user_id = add_user(client)
+        _, new_user_id = add_user(client)
+        _, shared_id = add_fruit(client)
+        _, other_id = add_fruit(client)
+
+        for user_id, fruit_id in (
+            (old_user_id, shared_id),
+            (old_user_id, other_id),
+            (new_user_id, shared_id),
+        ):
+            client.post(
+                "/cart/add",
+                json={"user_id": user_id, "fruit_id": fruit_id, "quantity": 1},
+            )
+
+        response = client.post(
+            "/cart/associate-cart",
+            json={"old_user_id": old_user_id, "new_user_id": new_user_id},
+        )
+
+        assert response.status_code == 200
+        assert b"2 cart items" in response.data
+        lines = {
+            c.fruit_id: c.quantity
+            for c in Cart.query.filter_by(user_id=new_user_id).all()
+        }
+        assert lines == {shared_id: 2, other_id: 1}
+        assert Cart.query.filter_by(user_id=old_user_id).count() == 0
+
+
+def test_guest_carts_are_isolated_by_token(client):
+    _, fruit_id = add_fruit(client)
+
+    first = client.post(
+        "/cart/add", json={"user_id": -1, "fruit_id": fruit_id, "quantity": 1}
+    )
+    token = first.headers["X-Guest-Token"]
+    other = client.post(
+        "/cart/add",
+        json={"user_id": -1, "fruit_id": fruit_id, "quantity": 5},
+        headers={"X-Guest-Token": "another-visitor"},
+    )
+    assert other.headers["X-Guest-Token"] == "another-visitor"
+
+    response = client.get("/cart/-1", headers={"X-Guest-Token": token})
+    assert response.status_code == 200
+    assert [line["quantity"] for line in response.get_json()] == [1]
+
+    client.delete("/cart/clear/-1", headers={"X-Guest-Token": "another-visitor"})
+    response = client.get("/cart/-1", headers={"X-Guest-Token": token})
+    assert [line["quantity"] for line in response.get_json()] == [1]
+    client.delete("/cart/clear/-1", headers={"X-Guest-Token": token})
+
+
+def test_guest_cart_requires_token(client, app):
+    from app import db
+
+    _, fruit_id = add_fruit(client)
+    token = client.post(
+        "/cart/add", json={"user_id": -1, "fruit_id": fruit_id, "quantity": 1}
+    ).headers["X-Guest-Token"]
+    with app.app_context():
+        # A legacy guest line from before carts were split by token.
+        line = Cart.query.filter_by(user_id=-1, guest_token=token).one()
+        db.session.add(
+            Cart(
+                user_id=-1,
+                fruit_id=fruit_id,
+                info_id=line.info_id,
+                quantity=7,
+                guest_token="",
+            )
+        )
+        db.session.commit()
+
+    assert client.get("/cart/-1").status_code == 401
+    assert client.delete("/cart/clear/-1").status_code == 401
+    response = client.get("/cart/-1", headers={"X-Guest-Token": token})
+    assert [line["quantity"] for line in response.get_json()] == [1]
+    with app.app_context():
+        assert Cart.query.filter_by(user_id=-1, guest_token="").count() == 1
+        Cart.query.filter_by(user_id=-1, guest_token="").delete()
+        db.session.commit()
+    client.delete("/cart/clear/-1", headers={"X-Guest-Token": token})
+
+
+def test_associate_guest_cart_moves_only_that_visitor(client, app):
+    with app.app_context():
+        _, user_id = add_user(client)
+        _, fruit_id = add_fruit(client)
+        for token, quantity in (("visitor-a", 2), ("visitor-b", 3)):
+            client.post(
+                "/cart/add",
+                json={"user_id": -1, "fruit_id": fruit_id, "quantity": quantity},
+                headers={"X-Guest-Token": token},
+            )
+
+        response = client.post(
+            "/cart/associate-cart",
+            json={"old_user_id": -1, "new_user_id": user_id},
+            headers={"X-Guest-Token": "visitor-a"},
+        )
+
+        assert response.status_code == 200
+        assert b"1 cart items" in response.data
+        lines = Cart.query.filter_by(user_id=user_id).all()
+        assert [(c.quantity, c.guest_token) for c in lines] == [(2, "")]
+        assert Cart.query.filter_by(user_id=-1, guest_token="visitor-b").count() == 1
+        client.delete("/cart/clear/-1", headers={"X-Guest-Token": "visitor-b"})
+
+
+def test_add_to_cart_idempotent_retry(client):
+    _, user_id = add_user(client)
+    _, fruit_id = add_fruit(client)
+    body = {"user_id": user_id, "fruit_id": fruit_id, "quantity": 2}
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+
+    first = client.post("/cart/add", json=body, headers=headers)
+    retry = client.post("/cart/add", json=body, headers=headers)
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.get_json() == first.get_json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert [c.quantity for c in Cart.query.filter_by(user_id=user_id)] == [2]
+
+
+def test_add_to_cart_idempotent_retry_keeps_guest_token(client):
+    _, fruit_id = add_fruit(client)
+    body = {"user_id": -1, "fruit_id": fruit_id, "quantity": 1}
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+
+    first = client.post("/cart/add", json=body, headers=headers)
+    retry = client.post("/cart/add", json=body, headers=headers)
+
+    token = first.headers["X-Guest-Token"]
+    assert retry.headers["X-Guest-Token"] == token
+    response = client.get("/cart/-1", headers={"X-Guest-Token": token})
+    assert [line["quantity"] for line in response.get_json()] == [1]
+    client.delete("/cart/clear/-1", headers={"X-Guest-Token": token})
+
+
+def test_add_to_cart_idempotency_key_scoped_to_caller(client):
+    _, fruit_id = add_fruit(client)
+    body = {"user_id": -1, "fruit_id": fruit_id, "quantity": 1}
+    key = str(uuid.uuid4())
+
+    responses = [
+        client.post(
+            "/cart/add",
+            json=body,
+            headers={"Idempotency-Key": key, "X-Guest-Token": token},
+        )
+        for token in ("caller-a", "caller-b")
+    ]
+
+    assert [r.status_code for r in responses] == [201, 201]
+    assert all("Idempotent-Replayed" not in r.headers for r in responses)
+    assert [r.headers["X-Guest-Token"] for r in responses] == ["caller-a", "caller-b"]
+    for token in ("caller-a", "caller-b"):
+        client.delete("/cart/clear/-1", headers={"X-Guest-Token": token})
+
+
+def test_add_to_cart_idempotency_key_scoped_to_user(client):
+    _, fruit_id = add_fruit(client)
+    user_ids = [add_user(client)[1] for _ in range(2)]
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+
+    # Behind a proxy both users share one address.
+    responses = [
+        client.post(
+            "/cart/add",
+            json={"user_id": user_id, "fruit_id": fruit_id, "quantity": 1},
+            headers=headers,
+            environ_base={"REMOTE_ADDR": "10.0.0.1"},
+        )
+        for user_id in user_ids
+    ]
+
+    assert [r.status_code for r in responses] == [201, 201]
+    assert all("Idempotent-Replayed" not in r.headers for r in responses)
+    assert [r.get_json()["user_id"] for r in responses] == user_ids
+
+
+def test_add_to_cart_retry_from_other_address_is_replayed(client):
+    _, user_id = add_user(client)
+    _, fruit_id = add_fruit(client)
+    body = {"user_id": user_id, "fruit_id": fruit_id, "quantity": 1}
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+
+    first = client.post(
+        "/cart/add",
+        json=body,
+        headers=headers,
+        environ_base={"REMOTE_ADDR": "10.0.0.1"},
+    )
+    retry = client.post(
+        "/cart/add",
+        json=body,
+        headers=headers,
+        environ_base={"REMOTE_ADDR": "10.0.0.2"},
+    )
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert [c.quantity for c in Cart.query.filter_by(user_id=user_id)] == [1]
+
+
 # -----------------------------
 # ❌ Negative Test Cases
 # -----------------------------
@@ -134,12 +404,45 @@ def test_add_to_cart_invalid_fruit(client):
     assert b"Fruit not found" in response.data
 
 
+def test_add_to_cart_batch_missing_fruit_adds_nothing(client):
+    _, user_id = add_user(client)
+    _, fruit_id = add_fruit(client)
+
+    response = client.post(
+        "/cart/add-batch",
+        json={
+            "user_id": user_id,
+            "items": [
+                {"fruit_id": fruit_id, "quantity": 1},
+                {"fruit_id": 999999, "quantity": 1},
+            ],
+        },
+    )
+    assert response.status_code == 404
+    assert b"999999" in response.data
+    assert Cart.query.filter_by(user_id=user_id).count() == 0
+
+
+def test_add_to_cart_batch_empty_items(client):
+    response = client.post("/cart/add-batch", json={"user_id": 1, "items": []})
+    assert response.status_code == 400
+
+
 def test_associate_cart_missing_fields(client):
     response = client.post("/cart/associate-cart", json={})
     assert response.status_code == 400
     assert b"Both old_user_id and new_user_id are required" in response.data
 
 
+def test_associate_guest_cart_requires_token(client):
+    _, user_id = add_user(client)
+    response = client.post(
+        "/cart/associate-cart", json={"old_user_id": -1, "new_user_id": user_id}
+    )
+    assert response.status_code == 400
+    assert b"guest_token" in response.data
+
+
 def test_delete_cart_invalid_id(client):
     response = client.delete("/cart/delete/9999")
     assert response.status_code == 404
@@ -204,3 +507,19 @@ def test_delete_cart_item_exception(mock_commit, client):
     response = client.delete("/cart/delete/1")
     assert response.status_code == 500
     assert b"Internal Server Error" in response.data
+
+
+def test_add_cart_item_out_of_stock(client, setup_order_data):
+    data = setup_order_data
+    response = client.post(
+        "/cart/add",
+        json={"user_id": data["user_id"], "fruit_id": data["fruit_id"], "quantity": 51},
+    )
+    assert response.status_code == 409
+    assert b"Not enough stock" in response.data
+
+
+def test_update_cart_item_out_of_stock(client, setup_order_data):
+    data = setup_order_data
+    response = client.put(f"/cart/update/{data['cart_id']}", json={"quantity": 60})
+    assert response.status_code == 409
@@ -1,3 +1,4 @@
+import uuid
 from io import BytesIO
 from unittest.mock import patch
 
@@ -31,6 +32,136 @@ def test_get_all_fruits_success(client, add_fruit):
     assert isinstance(response.get_json(), list)
 
 
+def test_get_all_fruits_payload_shape(client, add_fruit):
+    fruit_id = add_fruit(client).get_json()["fruit"]["fruit_id"]
+    response = client.get("/fruit/all")
+    assert response.status_code == 200
+
+    matches = [f for f in response.get_json() if f["fruit_id"] == fruit_id]
+    assert len(matches) == 1
+    assert set(matches[0]) == {
+        "fruit_id",
+        "name",
+        "color",
+        "description",
+        "has_seeds",
+        "size",
+        "image_url",
+        "info_id",
+        "weight",
+        "price",
+        "total_quantity",
+        "available_quantity",
+        "sell_by_date",
+    }
+    assert matches[0]["sell_by_date"].startswith("2030-01-01")
+
+
+def test_get_all_fruits_single_query(client, add_fruit, count_queries):
+    for _ in range(3):
+        add_fruit(client)
+
+    with count_queries() as statements:
+        response = client.get("/fruit/all")
+
+    assert response.status_code == 200
+    # The shared catalog version lookup, then the page itself.
+    assert len(statements) == 2
+    assert "data_versions" in statements[0]
+
+
+def test_get_all_fruits_keyset_pages(client, add_fruit):
+    add_fruit(client)
+    add_fruit(client)
+
+    first = client.get("/fruit/all?limit=1")
+    assert first.status_code == 200
+    assert len(first.get_json()) == 1
+    cursor = first.headers["X-Next-Cursor"]
+
+    second = client.get(f"/fruit/all?limit=1&cursor={cursor}")
+    assert second.status_code == 200
+    assert second.get_json()[0]["fruit_id"] > first.get_json()[0]["fruit_id"]
+
+
+def test_get_all_fruits_last_page_has_no_cursor(client, add_fruit):
+    add_fruit(client)
+    response = client.get("/fruit/all?limit=500")
+    assert response.status_code == 200
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_get_fruit_by_id_sees_update_after_cache_hit(client, add_fruit):
+    fruit_id = add_fruit(client).get_json()["fruit"]["fruit_id"]
+    client.get(f"/fruit/{fruit_id}")
+    hits_before = client.get("/fruit/cache/stats").get_json()["hits"]
+
+    assert client.get(f"/fruit/{fruit_id}").get_json()["price"] == 10.0
+    assert client.get("/fruit/cache/stats").get_json()["hits"] == hits_before + 1
+
+    client.put(f"/fruit/update/{fruit_id}", json={"price": 7.5})
+    assert client.get(f"/fruit/{fruit_id}").get_json()["price"] == 7.5
+
+
+def test_get_all_fruits_not_modified(client, add_fruit, count_queries):
+    add_fruit(client)
+    first = client.get("/fruit/all")
+    etag = first.headers["ETag"]
+
+    with count_queries() as statements:
+        revalidated = client.get("/fruit/all", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b""
+    # The catalog version and the live stock of the cached page's lots.
+    assert len(statements) == 2
+
+    add_fruit(client)
+    changed = client.get("/fruit/all", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_get_fruit_by_id_not_modified(client, add_fruit):
+    fruit_id = add_fruit(client).get_json()["fruit"]["fruit_id"]
+    first = client.get(f"/fruit/{fruit_id}")
+
+    response = client.get(
+        f"/fruit/{fruit_id}", headers={"If-None-Match": first.headers["ETag"]}
+    )
+    assert response.status_code == 304
+
+
+def test_stock_change_keeps_catalog_cache(client, add_fruit, add_user):
+    fruit_id = add_fruit(client).get_json()["fruit"]["fruit_id"]
+    first = client.get(f"/fruit/{fruit_id}")
+    version = client.get("/fruit/cache/stats").get_json()["version"]
+
+    _, user_id = add_user(client, email=f"stock-{uuid.uuid4().hex[:8]}@example.com")
+    client.post(
+        "/cart/add", json={"user_id": user_id, "fruit_id": fruit_id, "quantity": 2}
+    )
+
+    response = client.get(
+        f"/fruit/{fruit_id}", headers={"If-None-Match": first.headers["ETag"]}
+    )
+    assert response.status_code == 200
+    assert (
+        response.get_json()["available_quantity"]
+        == first.get_json()["available_quantity"] - 2
+    )
+    assert client.get("/fruit/cache/stats").get_json()["version"] == version
+
+
+def test_get_all_fruits_streamed(client, add_fruit):
+    add_fruit(client)
+    paged = client.get("/fruit/all?limit=500").get_json()
+
+    response = client.get("/fruit/all?stream=true")
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.get_json() == paged
+
+
 def test_get_fruit_by_id_success(client, add_fruit):
     fruit_resp = add_fruit(client)
     fruit_data = fruit_resp.get_json()["fruit"]
@@ -63,6 +194,40 @@ def test_delete_fruit_success(client, add_fruit):
     assert response.status_code == 200
     data = response.get_json()
     assert data["message"] == "Deleted 1 fruit successfully"
+    assert data["deleted"]["fruit"] == 1
+    assert data["deleted"]["fruit_info"] == 1
+
+
+def test_import_fruits_csv_upload(client):
+    csv_body = (
+        "name,color,size,weight,price,total_quantity,sell_by_date\n"
+        "Uploadpear,Green,M,0.3,1.2,60,2099-01-01\n"
+        "Uploadpear,Green,M,0.3,1.2,60,not-a-date\n"
+    )
+    response = client.post(
+        "/fruit/import",
+        data={"file": (BytesIO(csv_body.encode()), "lots.csv")},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 200
+    report = response.get_json()
+    assert report["lots_created"] == 1
+    assert report["errors"][0]["row"] == 2
+
+    search = client.get("/fruit/search?search=uploadpear").get_json()
+    assert [f["name"] for f in search] == ["Uploadpear"]
+
+
+def test_import_fruits_ndjson_body(client):
+    body = (
+        '{"name": "Bodykiwi", "color": "Brown", "size": "S", "weight": 0.1,'
+        ' "price": 0.4, "total_quantity": 9, "sell_by_date": "2099-01-01"}\n'
+    )
+    response = client.post(
+        "/fruit/import", data=body, content_type="application/x-ndjson"
+    )
+    assert response.status_code == 200
+    assert response.get_json()["lots_created"] == 1
 
 
 # --------------------------------------
@@ -168,6 +333,46 @@ def test_update_fruit_invalid_id(client):
         assert b"Fruit not found" in response.data
 
 
+def test_update_fruit_info_duplicate_lot(client, add_fruit, app):
+    from datetime import datetime
+
+    from app import db
+    from app.models.fruit import FruitInfo
+
+    fruit_id = add_fruit(client).get_json()["fruit"]["fruit_id"]
+    with app.app_context():
+        db.session.add(
+            FruitInfo(
+                fruit_id=fruit_id,
+                weight=1.0,
+                price=12.5,
+                total_quantity=50,
+                available_quantity=50,
+                sell_by_date=datetime(2030, 1, 1),
+            )
+        )
+        db.session.commit()
+
+    response = client.put(f"/fruit/update/{fruit_id}", json={"price": 12.5})
+
+    assert response.status_code == 409
+    assert response.get_json() == {
+        "error": "Fruit info with these details already exists"
+    }
+    assert client.get(f"/fruit/{fruit_id}").get_json()["price"] == 10.0
+
+
+def test_update_fruit_info_bad_date(client, add_fruit):
+    fruit_id = add_fruit(client).get_json()["fruit"]["fruit_id"]
+
+    response = client.put(
+        f"/fruit/update/{fruit_id}", json={"sell_by_date": "next tuesday"}
+    )
+
+    assert response.status_code == 400
+    assert "next tuesday" in response.get_json()["error"]
+
+
 def test_update_fruit_invalid_data(client, add_fruit):
     fruit_resp = add_fruit(client)
     fruit_data = fruit_resp.get_json()["fruit"]
@@ -188,7 +393,11 @@ def test_update_fruit_invalid_data(client, add_fruit):
 
 
 def test_delete_fruit_not_found(client):
-    with patch.object(fruit_service, "delete_fruits", return_value=0):
+    with patch.object(
+        fruit_service,
+        "delete_fruits",
+        return_value={"cart": 0, "orders": 0, "fruit_info": 0, "fruit": 0},
+    ):
         response = client.delete("/fruit/delete/9999")
         assert response.status_code == 404
         assert b"No fruits found to delete" in response.data
@@ -227,6 +436,11 @@ def test_search_fruits_value_error(client):
         assert b"invalid filter" in response.data
 
 
+def test_search_facets_value_error(client):
+    response = client.get("/fruit/facets?value=abc")
+    assert response.status_code == 400
+
+
 def test_search_fruits_exception(client):
     with patch.object(
         fruit_service, "search_fruits", side_effect=Exception("search fail")
@@ -236,6 +450,83 @@ def test_search_fruits_exception(client):
         assert b"search fail" in response.data
 
 
+def test_search_fruits_uses_index_ranking(client, add_fruit):
+    add_fruit(client, name="Zebrafruit Deluxe")
+    add_fruit(client, name="Zebrafruit")
+
+    response = client.get("/fruit/search?search=zebrafru")
+    assert response.status_code == 200
+    results = response.get_json()
+    assert {r["name"] for r in results} == {"Zebrafruit Deluxe", "Zebrafruit"}
+    assert all("score" in r for r in results)
+    assert results == sorted(results, key=lambda r: r["score"], reverse=True)
+
+
+def test_search_fruits_ranked_pages(client, add_fruit):
+    add_fruit(client, name="Quincepage One")
+    add_fruit(client, name="Quincepage Two")
+
+    first = client.get("/fruit/search?search=quincepage&limit=1")
+    cursor = first.headers["X-Next-Cursor"]
+    second = client.get(f"/fruit/search?search=quincepage&limit=1&cursor={cursor}")
+
+    names = {first.get_json()[0]["name"], second.get_json()[0]["name"]}
+    assert names == {"Quincepage One", "Quincepage Two"}
+
+
+def test_search_fruits_short_term_falls_back(client, add_fruit):
+    add_fruit(client, name="Qx")
+    response = client.get("/fruit/search?search=qx")
+    assert response.status_code == 200
+    assert any(r["name"] == "Qx" for r in response.get_json())
+
+
+def test_search_facets_counts_matching_lots(client, add_fruit):
+    add_fruit(client, name="Facetfruit One")
+    add_fruit(client, name="Facetfruit Two")
+
+    response = client.get("/fruit/facets?search=facetfruit&price_max=20")
+    assert response.status_code == 200
+    facets = response.get_json()
+    assert facets["total"] == 2
+    assert facets["color"] == [{"value": "Red", "count": 2}]
+    assert facets["has_seeds"] == [{"value": True, "count": 2}]
+    assert {b["bucket"]: b["count"] for b in facets["price"]}["10+"] == 2
+
+    again = client.get(
+        "/fruit/facets?search=facetfruit&price_max=20",
+        headers={"If-None-Match": response.headers["ETag"]},
+    )
+    assert again.status_code == 304
+
+
+def test_search_index_drops_deleted_fruit(client, add_fruit):
+    fruit_id = add_fruit(client, name="Vanishberry").get_json()["fruit"]["fruit_id"]
+    client.delete(f"/fruit/delete/{fruit_id}")
+
+    response = client.get("/fruit/search?search=vanishberry")
+    assert response.status_code == 200
+    assert response.get_json() == []
+
+
+def test_get_all_fruits_invalid_cursor(client):
+    response = client.get("/fruit/all?cursor=not-a-cursor")
+    assert response.status_code == 400
+    assert b"Invalid cursor" in response.data
+
+
+def test_search_fruits_invalid_limit(client):
+    response = client.get("/fruit/search?limit=0")
+    assert response.status_code == 400
+    assert b"limit" in response.data
+
+
+def test_import_fruits_unknown_format(client):
+    response = client.post("/fruit/import", data="x", content_type="text/plain")
+    assert response.status_code == 400
+    assert b"csv or ndjson" in response.data
+
+
 def test_delete_fruit_no_ids(client):
     response = client.delete("/fruit/delete", json={})
     assert response.status_code == 400
@@ -243,7 +534,11 @@ def test_delete_fruit_no_ids(client):
 
 
 def test_delete_fruit_not_found_ids(client):
-    with patch.object(fruit_service, "delete_fruits", return_value=0):
+    with patch.object(
+        fruit_service,
+        "delete_fruits",
+        return_value={"cart": 0, "orders": 0, "fruit_info": 0, "fruit": 0},
+    ):
         response = client.delete("/fruit/delete", json={"ids": [9999]})
         assert response.status_code == 404
         assert b"No fruits found to delete" in response.data
@@ -1,3 +1,5 @@
+import sys
+from datetime import datetime
 from unittest.mock import patch
 
 import pytest
@@ -19,6 +21,141 @@ def test_add_order_success(client, setup_order_data):
     assert b"Order placed" in response.data
 
 
+def test_place_order_never_oversells(client, setup_order_data, app):
+    from app import db
+    from app.models.cart import Cart
+    from app.models.fruit import FruitInfo
+    from app.models.users import User
+
+    data = setup_order_data
+    with app.app_context():
+        rival = User(
+            name="Rival",
+            email=f"rival-{data['cart_id']}@example.com",
+            phone_number="5550001111",
+        )
+        db.session.add(rival)
+        db.session.flush()
+        db.session.add(
+            Cart(
+                user_id=rival.user_id,
+                fruit_id=data["fruit_id"],
+                info_id=data["info_id"],
+                quantity=3,
+                item_price=12.0,
+            )
+        )
+        db.session.get(FruitInfo, data["info_id"]).available_quantity = 4
+        db.session.commit()
+        rival_id = rival.user_id
+        rival_cart = Cart.query.filter_by(user_id=rival_id).one().cart_id
+
+    first = client.post(
+        f"/order/place/{data['user_id']}", json={"cart_ids": [data["cart_id"]]}
+    )
+    second = client.post(f"/order/place/{rival_id}", json={"cart_ids": [rival_cart]})
+
+    assert first.status_code == 201
+    assert second.status_code == 400
+    assert b"Not enough stock" in second.data
+    with app.app_context():
+        db.session.expire_all()
+        assert db.session.get(FruitInfo, data["info_id"]).available_quantity == 1
+        assert Cart.query.filter_by(user_id=rival_id).count() == 1
+
+
+def test_place_order_idempotent_retry(client, setup_order_data, app):
+    from app import db
+    from app.models.fruit import FruitInfo
+    from app.models.orders import ParentOrder
+
+    data = setup_order_data
+    url = f"/order/place/{data['user_id']}"
+    body = {"cart_ids": [data["cart_id"]]}
+    headers = {"Idempotency-Key": f"order-{data['cart_id']}"}
+
+    first = client.post(url, json=body, headers=headers)
+    with patch.object(order_service, "place_order") as mock_place:
+        retry = client.post(url, json=body, headers=headers)
+        mock_place.assert_not_called()
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.get_json() == first.get_json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+    with app.app_context():
+        db.session.expire_all()
+        assert db.session.get(FruitInfo, data["info_id"]).available_quantity == 47
+        assert ParentOrder.query.filter_by(user_id=data["user_id"]).count() == 1
+
+
+def test_place_order_idempotency_key_reused_for_other_body(client, setup_order_data):
+    data = setup_order_data
+    url = f"/order/place/{data['user_id']}"
+    headers = {"Idempotency-Key": f"reuse-{data['cart_id']}"}
+
+    client.post(url, json={"cart_ids": [data["cart_id"]]}, headers=headers)
+    response = client.post(url, json={"cart_ids": [999999]}, headers=headers)
+
+    assert response.status_code == 422
+
+
+def test_place_order_server_error_not_stored(client, setup_order_data):
+    data = setup_order_data
+    url = f"/order/place/{data['user_id']}"
+    body = {"cart_ids": [data["cart_id"]]}
+    headers = {"Idempotency-Key": f"error-{data['cart_id']}"}
+
+    with patch.object(order_service, "place_order", side_effect=Exception("DB down")):
+        assert client.post(url, json=body, headers=headers).status_code == 500
+
+    retry = client.post(url, json=body, headers=headers)
+    assert retry.status_code == 201
+    assert "Idempotent-Replayed" not in retry.headers
+
+
+def test_place_order_async_then_poll_status(client, setup_order_data, app):
+    from app.models.cart import Cart
+
+    data = setup_order_data
+    response = client.post(
+        f"/order/place/{data['user_id']}?async=true",
+        json={"cart_ids": [data["cart_id"]]},
+    )
+    assert response.status_code == 202
+    job = response.get_json()
+    assert job["status"] == "queued"
+    assert response.headers["Location"].endswith(f"/order/status/{job['job_id']}")
+
+    status = client.get(f"/order/status/{job['job_id']}").get_json()
+    assert status["status"] == "queued"
+    assert status["order_id"] is None
+
+    with app.app_context():
+        assert order_service.process_order_jobs() >= 1
+        assert Cart.query.filter_by(cart_id=data["cart_id"]).count() == 0
+
+    status = client.get(f"/order/status/{job['job_id']}").get_json()
+    assert status["status"] == "done"
+    assert status["order_id"] == status["result"]["order_id"]
+    assert status["result"]["order_total"] == 12.0
+
+
+def test_place_order_async_rejected_job_reports_error(client, setup_order_data, app):
+    data = setup_order_data
+    response = client.post(
+        f"/order/place/{data['user_id']}?async=true", json={"cart_ids": [999999]}
+    )
+    assert response.status_code == 202
+
+    with app.app_context():
+        order_service.process_order_jobs()
+
+    status = client.get(f"/order/status/{response.get_json()['job_id']}").get_json()
+    assert status["status"] == "failed"
+    assert status["error"] == "Cart is empty"
+
+
 def test_get_order_by_user_id_success(client, setup_order_data):
     data = setup_order_data
     client.post(f"/order/place/{data['user_id']}", json={"cart_ids": [data["cart_id"]]})
@@ -35,6 +172,115 @@ def test_get_all_orders_success(client, setup_order_data):
     assert isinstance(response.get_json(), list)
 
 
+def test_get_all_orders_keyset_pages(client, setup_order_data):
+    data = setup_order_data
+    client.post(f"/order/place/{data['user_id']}", json={"cart_ids": [data["cart_id"]]})
+    for _ in range(2):
+        cart = client.post(
+            "/cart/add",
+            json={
+                "user_id": data["user_id"],
+                "fruit_id": data["fruit_id"],
+                "quantity": 1,
+            },
+        ).get_json()
+        client.post(
+            f"/order/place/{data['user_id']}", json={"cart_ids": [cart["cart_id"]]}
+        )
+
+    first = client.get("/order/all?limit=2")
+    assert first.status_code == 200
+    page1 = first.get_json()
+    assert len(page1) == 2
+
+    cursor = first.headers.get("X-Next-Cursor")
+    assert cursor
+    second = client.get(f"/order/all?limit=2&cursor={cursor}")
+    assert second.status_code == 200
+    page2 = second.get_json()
+    assert page2
+
+    keys = [
+        (datetime.fromisoformat(o["order_date"]), o["order_id"]) for o in page1 + page2
+    ]
+    assert keys == sorted(keys, reverse=True)
+    assert not {o["order_id"] for o in page1} & {o["order_id"] for o in page2}
+
+
+def test_get_all_orders_streamed(client, setup_order_data):
+    data = setup_order_data
+    client.post(f"/order/place/{data['user_id']}", json={"cart_ids": [data["cart_id"]]})
+    paged = client.get("/order/all?limit=500").get_json()
+
+    response = client.get("/order/all?stream=true")
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.get_json() == paged
+
+
+def test_get_order_history_not_modified(client, setup_order_data, count_queries):
+    data = setup_order_data
+    client.post(f"/order/place/{data['user_id']}", json={"cart_ids": [data["cart_id"]]})
+    first = client.get(f"/order/history/{data['user_id']}")
+    assert first.status_code == 200
+
+    with count_queries() as statements:
+        response = client.get(
+            f"/order/history/{data['user_id']}",
+            headers={"If-None-Match": first.headers["ETag"]},
+        )
+    assert response.status_code == 304
+    # Only the version counter is read; the page is neither queried nor built.
+    assert len(statements) == 1
+    assert "data_versions" in statements[0]
+
+    cart = client.post(
+        "/cart/add",
+        json={"user_id": data["user_id"], "fruit_id": data["fruit_id"], "quantity": 1},
+    ).get_json()
+    client.post(f"/order/place/{data['user_id']}", json={"cart_ids": [cart["cart_id"]]})
+    response = client.get(
+        f"/order/history/{data['user_id']}",
+        headers={"If-None-Match": first.headers["ETag"]},
+    )
+    assert response.status_code == 200
+    assert len(response.get_json()) == len(first.get_json()) + 1
+
+
+def test_get_all_orders_if_modified_since(client, setup_order_data):
+    data = setup_order_data
+    client.post(f"/order/place/{data['user_id']}", json={"cart_ids": [data["cart_id"]]})
+    first = client.get("/order/all")
+
+    response = client.get(
+        "/order/all", headers={"If-Modified-Since": first.headers["Last-Modified"]}
+    )
+    assert response.status_code == 304
+
+
+def test_get_all_orders_revalidates_on_order_version(
+    client, setup_order_data, count_queries
+):
+    data = setup_order_data
+    first = client.get("/order/all")
+
+    with count_queries() as statements:
+        response = client.get(
+            "/order/all", headers={"If-None-Match": first.headers["ETag"]}
+        )
+    assert response.status_code == 304
+    # Only the version counter is read; the orders table is not scanned.
+    assert len(statements) == 1
+    assert "data_versions" in statements[0]
+
+    client.post(f"/order/place/{data['user_id']}", json={"cart_ids": [data["cart_id"]]})
+    response = client.get(
+        "/order/all", headers={"If-None-Match": first.headers["ETag"]}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] != first.headers["ETag"]
+
+
 # --------------------------------------
 # Negative Test Cases
 # --------------------------------------
@@ -70,6 +316,12 @@ def test_add_order_empty_cart_ids(client, setup_order_data):
     assert b"Cart is empty" in response.data
 
 
+def test_get_order_history_invalid_cursor(client):
+    response = client.get("/order/history/1?cursor=abc")
+    assert response.status_code == 400
+    assert b"Invalid cursor" in response.data
+
+
 def test_get_order_by_invalid_user_id(client):
     response = client.get("/order/history/9999")
     assert response.status_code == 404
@@ -109,3 +361,47 @@ def test_get_all_orders_not_found(client):
         response = client.get("/order/all")
         assert response.status_code == 404
         assert b"No orders found" in response.data
+
+
+def test_get_order_status_not_found(client):
+    response = client.get("/order/status/999999")
+    assert response.status_code == 404
+
+
+def test_export_orders_csv(client, setup_order_data):
+    data = setup_order_data
+    client.post(f"/order/place/{data['user_id']}", json={"cart_ids": [data["cart_id"]]})
+    today = datetime.utcnow().date().isoformat()
+
+    response = client.get(f"/order/export?start={today}&end={today}")
+
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == "text/csv"
+    assert (
+        f'filename="orders-{today}-{today}.csv"'
+        in response.headers["Content-Disposition"]
+    )
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0].startswith("order_id,parent_order_id,user_id")
+    assert any(line.split(",")[2] == str(data["user_id"]) for line in lines[1:])
+
+
+def test_export_orders_invalid_format(client):
+    response = client.get("/order/export?format=xlsx")
+    assert response.status_code == 400
+
+
+def test_export_orders_parquet_without_pyarrow(client):
+    with patch.dict(sys.modules, {"pyarrow": None, "pyarrow.parquet": None}):
+        response = client.get("/order/export?format=parquet")
+    assert response.status_code == 501
+
+
+def test_export_orders_other_runtime_error_is_500(client):
+    with patch(
+        "app.services.export_service.write_parquet",
+        side_effect=RuntimeError("boom"),
+    ):
+        response = client.get("/order/export?format=parquet")
+    assert response.status_code == 500
@@ -20,6 +20,25 @@ def test_get_all_users(client, add_user):
     assert isinstance(response.get_json(), list)
 
 
+def test_get_all_users_page_size(client, add_user):
+    add_user(client, name="Page1", email="page1@example.com", phone="6667778881")
+    add_user(client, name="Page2", email="page2@example.com", phone="6667778882")
+    response = client.get("/user/all?limit=1")
+    assert response.status_code == 200
+    assert len(response.get_json()) == 1
+    assert response.headers["X-Next-Cursor"]
+
+
+def test_get_all_users_streamed(client, add_user):
+    add_user(client, name="Stream", email="stream@example.com", phone="6667778883")
+    response = client.get("/user/all?stream=true")
+    assert response.status_code == 200
+    assert response.is_streamed
+    users = response.get_json()
+    assert any(u["email"] == "stream@example.com" for u in users)
+    assert users == sorted(users, key=lambda u: u["user_id"])
+
+
 def test_get_single_user_success(client, add_user):
     _, user_id = add_user(
         client, name="Charlie", email="charlie@example.com", phone="3334445555"
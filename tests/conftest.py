@@ -3,9 +3,11 @@ import os
 import random
 import sys
 import uuid
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 
 import pytest
+from sqlalchemy import event
 
 from aws_utils import s3_utils
 from aws_utils.s3_utils import upload_to_s3
@@ -191,3 +193,22 @@ def mock_s3_upload(monkeypatch):
         return "https://example.com/mock-image.jpg"
 
     monkeypatch.setattr(s3_utils, "upload_to_s3", fake_upload_to_s3)
+
+
+# ✅ Count SQL statements to cap queries per request
+@pytest.fixture
+def count_queries(app):
+    @contextmanager
+    def _count_queries():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+
+    return _count_queries
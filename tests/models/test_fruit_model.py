@@ -39,3 +39,30 @@ def test_fruitinfo_exists(app):
         db.session.commit()
 
         assert info.exists() == True
+
+
+def test_fruit_exists_ignores_formatting(app):
+    with app.app_context():
+        fruit = Fruit(name="Quince", color="Yellow", size="M", has_seeds=True)
+        db.session.add(fruit)
+        db.session.commit()
+
+        variant = Fruit(name="  quince ", color="YELLOW", size="m", has_seeds=True)
+        assert variant.exists()
+        assert variant.compute_content_hash() == fruit.content_hash
+        assert not Fruit(name="Quince", color="Green", size="M").exists()
+
+
+def test_fruitinfo_hash_normalizes_numbers_and_dates():
+    sell_by = datetime(2099, 1, 1)
+    a = FruitInfo(
+        fruit_id=1, weight=1, price=2.5, total_quantity=10, sell_by_date=sell_by
+    )
+    b = FruitInfo(
+        fruit_id=1,
+        weight=1.0,
+        price=2.5000000001,
+        total_quantity=10,
+        sell_by_date=sell_by.date(),
+    )
+    assert a.compute_content_hash() == b.compute_content_hash()
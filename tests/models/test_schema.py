@@ -0,0 +1,119 @@
+from unittest.mock import patch
+
+from sqlalchemy import text
+
+from app import db
+from app.migrations import MIGRATIONS, applied_versions, run_migrations
+from app.migrations.query_plans import check_query_plans
+
+
+def test_migrations_applied_once(app):
+    with app.app_context():
+        assert applied_versions() == {m.revision for m in MIGRATIONS}
+        assert run_migrations() == []
+
+
+def test_hot_queries_use_indexes(app):
+    with app.app_context():
+        assert check_query_plans() == []
+
+
+def test_query_plan_check_detects_missing_index(app):
+    with app.app_context():
+        db.session.execute(text("DROP INDEX ix_cart_user_id"))
+        db.session.commit()
+        try:
+            failures = check_query_plans()
+            assert len(failures) == 1
+            assert failures[0].startswith("cart_by_user")
+        finally:
+            db.session.execute(
+                text("CREATE INDEX IF NOT EXISTS ix_cart_user_id ON cart (user_id)")
+            )
+            db.session.commit()
+
+
+def test_db_cli_commands(app):
+    runner = app.test_cli_runner()
+
+    upgrade = runner.invoke(args=["db", "upgrade"])
+    assert upgrade.exit_code == 0
+    assert "Schema up to date" in upgrade.output
+
+    check = runner.invoke(args=["db", "check-plans"])
+    assert check.exit_code == 0
+    assert "All hot queries use their indexes" in check.output
+
+
+def test_content_hash_backfill_leaves_duplicates_null(app):
+    from app.migrations import m0004_content_hash
+    from app.models.fruit import Fruit
+
+    with app.app_context():
+        db.session.add_all(
+            [
+                Fruit(name="Backfill A", color="Red", size="S"),
+                Fruit(name="Backfill B", color="Red", size="S"),
+            ]
+        )
+        db.session.commit()
+        a = Fruit.query.filter_by(name="Backfill A").one()
+        b = Fruit.query.filter_by(name="Backfill B").one()
+        expected = a.content_hash
+
+        # Simulate pre-migration rows, the second a duplicate of the first.
+        db.session.execute(text("DROP INDEX ix_fruit_content_hash"))
+        db.session.execute(
+            text(
+                "UPDATE fruit SET content_hash = NULL, name = 'Backfill A' "
+                "WHERE fruit_id IN (:a, :b)"
+            ),
+            {"a": a.fruit_id, "b": b.fruit_id},
+        )
+        # The migration hashes with its frozen copy, not the live model.
+        with patch.object(Fruit, "HASH_FIELDS", ("name",)):
+            m0004_content_hash.upgrade()
+        db.session.commit()
+
+        hashes = dict(
+            db.session.execute(
+                text(
+                    "SELECT fruit_id, content_hash FROM fruit WHERE fruit_id IN (:a, :b)"
+                ),
+                {"a": a.fruit_id, "b": b.fruit_id},
+            ).all()
+        )
+        assert hashes == {a.fruit_id: expected, b.fruit_id: None}
+        assert check_query_plans() == []
+
+
+def test_cart_line_key_migration_merges_duplicates(app):
+    from app.migrations import m0005_cart_line_key, m0007_cart_guest_token
+    from app.models.cart import Cart
+
+    with app.app_context():
+        db.session.execute(text("DROP INDEX ix_cart_owner_info"))
+        db.session.add_all(
+            [
+                Cart(
+                    user_id=-1,
+                    fruit_id=1,
+                    info_id=424242,
+                    quantity=q,
+                    item_price=q * 2.0,
+                )
+                for q in (1, 2)
+            ]
+        )
+        db.session.flush()
+
+        m0005_cart_line_key.upgrade()
+        m0007_cart_guest_token.upgrade()
+        db.session.commit()
+
+        lines = Cart.query.filter_by(info_id=424242).all()
+        assert [(c.quantity, c.item_price) for c in lines] == [(3, 6.0)]
+        assert check_query_plans() == []
+
+        db.session.delete(lines[0])
+        db.session.commit()
@@ -0,0 +1,132 @@
+import uuid
+from datetime import date, datetime
+
+import pytest
+
+from app.extensions import db
+from app.models.cart import Cart
+from app.models.fruit import Fruit, FruitInfo
+from app.models.sales import SalesDaily
+from app.models.users import User
+from app.services import analytics_service, order_service
+
+
+@pytest.fixture(scope="module")
+def app_context():
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        yield
+
+
+def _fruit_in_cart(price=2.0, quantity=3):
+    """
+    Create a user with one cart line of a fresh fruit.
+    """
+    uid = uuid.uuid4().hex[:8]
+    user = User(name=f"Buyer {uid}", email=f"sales-{uid}@example.com", phone_number=uid)
+    fruit = Fruit(name=f"Sold {uid}", color="Red", size="M")
+    db.session.add_all([user, fruit])
+    db.session.flush()
+    info = FruitInfo(
+        fruit_id=fruit.fruit_id,
+        weight=1.0,
+        price=price,
+        total_quantity=50,
+        available_quantity=50,
+        sell_by_date=datetime(2099, 1, 1),
+    )
+    db.session.add(info)
+    db.session.flush()
+    cart = Cart(
+        user_id=user.user_id,
+        fruit_id=fruit.fruit_id,
+        info_id=info.info_id,
+        quantity=quantity,
+        item_price=quantity * price,
+    )
+    db.session.add(cart)
+    db.session.commit()
+    return user.user_id, fruit.fruit_id, cart.cart_id
+
+
+def _rollup(fruit_id):
+    return [
+        (r.day, r.order_lines, r.quantity, r.revenue)
+        for r in SalesDaily.query.filter_by(fruit_id=fruit_id).order_by(SalesDaily.day)
+    ]
+
+
+def test_place_order_updates_rollup(app_context):
+    user_id, fruit_id, cart_id = _fruit_in_cart(price=2.0, quantity=3)
+    order_service.place_order(user_id, [cart_id])
+
+    other_user, _, _ = _fruit_in_cart()
+    info_id = FruitInfo.query.filter_by(fruit_id=fruit_id).one().info_id
+    db.session.add(
+        Cart(user_id=other_user, fruit_id=fruit_id, info_id=info_id, quantity=2)
+    )
+    db.session.commit()
+    line = Cart.query.filter_by(user_id=other_user, fruit_id=fruit_id).one()
+    order_service.place_order(other_user, [line.cart_id])
+
+    today = datetime.utcnow().date()
+    assert _rollup(fruit_id) == [(today, 2, 5, 10.0)]
+
+
+def test_rebuild_matches_incremental_rollup(app_context):
+    user_id, fruit_id, cart_id = _fruit_in_cart(price=1.5, quantity=4)
+    order_service.place_order(user_id, [cart_id])
+    incremental = _rollup(fruit_id)
+
+    SalesDaily.query.filter_by(fruit_id=fruit_id).delete()
+    db.session.commit()
+    assert analytics_service.rebuild_sales_daily() >= 1
+
+    assert _rollup(fruit_id) == incremental
+
+
+def test_rebuild_range_keeps_other_days(app_context):
+    db.session.add(
+        SalesDaily(
+            day=date(2001, 1, 1), fruit_id=424242, order_lines=1, quantity=1, revenue=1
+        )
+    )
+    db.session.commit()
+
+    analytics_service.rebuild_sales_daily(date(2001, 2, 1), date(2001, 2, 28))
+
+    assert _rollup(424242) == [(date(2001, 1, 1), 1, 1, 1.0)]
+
+
+def test_revenue_by_day_and_top_sellers(app_context):
+    rows = [
+        (date(2002, 3, 1), 900001, 5, 50.0),
+        (date(2002, 3, 2), 900001, 1, 10.0),
+        (date(2002, 3, 2), 900002, 20, 40.0),
+        (date(2002, 3, 9), 900002, 99, 99.0),
+    ]
+    db.session.add_all(
+        SalesDaily(day=d, fruit_id=f, order_lines=1, quantity=q, revenue=r)
+        for d, f, q, r in rows
+    )
+    db.session.commit()
+    start, end = date(2002, 3, 1), date(2002, 3, 7)
+
+    revenue = analytics_service.get_revenue_by_day(start, end)
+    assert [(r["day"], r["fruit_id"], r["revenue"]) for r in revenue] == [
+        ("2002-03-01", 900001, 50.0),
+        ("2002-03-02", 900001, 10.0),
+        ("2002-03-02", 900002, 40.0),
+    ]
+    only = analytics_service.get_revenue_by_day(start, end, fruit_id=900002)
+    assert [r["quantity"] for r in only] == [20]
+
+    by_revenue = analytics_service.get_top_sellers(start, end)
+    assert [(r["fruit_id"], r["revenue"]) for r in by_revenue] == [
+        (900001, 60.0),
+        (900002, 40.0),
+    ]
+    by_quantity = analytics_service.get_top_sellers(start, end, limit=1, by="quantity")
+    assert [(r["fruit_id"], r["quantity"]) for r in by_quantity] == [(900002, 20)]
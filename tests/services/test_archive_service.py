@@ -0,0 +1,140 @@
+import gzip
+import json
+import uuid
+from datetime import date, datetime
+
+import pytest
+
+from app.extensions import db
+from app.models.fruit import Fruit
+from app.models.orders import Order, OrderArchive
+from app.models.sales import SalesDaily
+from app.models.users import User
+from app.services import (
+    analytics_service,
+    archive_service,
+    order_service,
+    version_service,
+)
+
+NOW = datetime(2030, 7, 15)
+
+
+@pytest.fixture(scope="module")
+def app_context():
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        yield app
+
+
+def _orders(*dates):
+    """
+    Create a user with one order per date of a fresh fruit.
+    """
+    uid = uuid.uuid4().hex[:8]
+    user = User(name=f"Old {uid}", email=f"archive-{uid}@example.com", phone_number=uid)
+    fruit = Fruit(name=f"Archived {uid}", color="Red", size="M")
+    db.session.add_all([user, fruit])
+    db.session.flush()
+    db.session.add_all(
+        Order(
+            user_id=user.user_id,
+            fruit_id=fruit.fruit_id,
+            quantity=2,
+            price_by_fruit=1.5,
+            order_date=order_date,
+        )
+        for order_date in dates
+    )
+    db.session.commit()
+    return user.user_id, fruit.fruit_id
+
+
+def test_cutoffs_are_month_starts(app_context):
+    app_context.config.update(ORDER_HOT_MONTHS=6, ORDER_COLD_MONTHS=24)
+    assert archive_service.hot_cutoff(NOW) == datetime(2030, 1, 1)
+    assert archive_service.cold_cutoff(NOW) == datetime(2028, 7, 1)
+
+
+def test_archive_moves_old_months_and_history_spans_both(app_context):
+    user_id, _ = _orders(
+        datetime(2030, 7, 1),
+        datetime(2030, 2, 3),
+        datetime(2029, 12, 31, 23, 59),
+        datetime(2029, 11, 5),
+    )
+    before = order_service.get_order_history(user_id)
+
+    assert archive_service.archive_orders(NOW) >= 2
+
+    assert Order.query.filter_by(user_id=user_id).count() == 2
+    assert OrderArchive.query.filter_by(user_id=user_id).count() == 2
+    assert order_service.get_order_history(user_id) == before
+
+    first = order_service.get_order_history(user_id, limit=3)
+    last = first[-1]
+    cursor = (datetime.fromisoformat(last["order_date"]), last["order_id"])
+    rest = order_service.get_order_history(user_id, limit=3, before=cursor)
+    assert first + rest == before
+
+
+def test_export_cold_orders_writes_ndjson_and_drops_month(app_context, tmp_path):
+    user_id, fruit_id = _orders(datetime(2027, 3, 9), datetime(2027, 3, 20))
+    archive_service.archive_orders(NOW)
+
+    paths = archive_service.export_cold_orders(NOW, directory=str(tmp_path))
+
+    month_file = tmp_path / "orders-2027-03.ndjson.gz"
+    assert str(month_file) in paths
+    with gzip.open(month_file, "rt", encoding="utf-8") as stream:
+        rows = [json.loads(line) for line in stream]
+    mine = [r for r in rows if r["user_id"] == user_id]
+    assert [r["order_date"] for r in mine] == [
+        "2027-03-09T00:00:00",
+        "2027-03-20T00:00:00",
+    ]
+    assert mine[0]["fruit_id"] == fruit_id
+    assert OrderArchive.query.filter_by(user_id=user_id).count() == 0
+    assert not list(tmp_path.glob("*.partial"))
+
+
+def test_rollup_rebuild_includes_archived_orders(app_context):
+    _, fruit_id = _orders(datetime(2029, 5, 1), datetime(2030, 6, 1))
+    archive_service.archive_orders(NOW)
+
+    analytics_service.rebuild_sales_daily()
+
+    rows = SalesDaily.query.filter_by(fruit_id=fruit_id).order_by(SalesDaily.day)
+    assert [(r.day, r.quantity, r.revenue) for r in rows] == [
+        (date(2029, 5, 1), 2, 3.0),
+        (date(2030, 6, 1), 2, 3.0),
+    ]
+
+
+def test_rollup_rebuild_keeps_exported_months(app_context, tmp_path):
+    _, fruit_id = _orders(datetime(2026, 4, 2), datetime(2026, 4, 2))
+    analytics_service.rebuild_sales_daily()
+    archive_service.archive_orders(NOW)
+    archive_service.export_cold_orders(NOW, directory=str(tmp_path))
+    assert not OrderArchive.query.filter_by(fruit_id=fruit_id).count()
+
+    analytics_service.rebuild_sales_daily()
+
+    rows = SalesDaily.query.filter_by(fruit_id=fruit_id).all()
+    assert [(r.day, r.order_lines, r.quantity, r.revenue) for r in rows] == [
+        (date(2026, 4, 2), 2, 4, 6.0)
+    ]
+
+
+def test_archive_and_export_bump_order_version(app_context, tmp_path):
+    _orders(datetime(2026, 9, 1))
+    before, _ = version_service.get_version(version_service.ORDERS)
+
+    archive_service.archive_orders(NOW)
+    archived, _ = version_service.get_version(version_service.ORDERS)
+    archive_service.export_cold_orders(NOW, directory=str(tmp_path))
+    exported, _ = version_service.get_version(version_service.ORDERS)
+
+    assert before < archived < exported
@@ -1,3 +1,4 @@
+from datetime import datetime, timedelta
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -45,11 +46,12 @@ def test_add_to_cart_user_not_found(mock_fruit_query, mock_user_query, app_conte
 @patch(
     "app.services.cart_service.db.session.commit", side_effect=Exception("DB failure")
 )
+@patch("app.services.cart_service.reservation_service.hold_stock")
 @patch("app.services.cart_service.db.session.add")
 @patch("app.services.cart_service.User.query")
 @patch("app.services.cart_service.FruitInfo.query")
 def test_add_to_cart_db_failure(
-    mock_fruit_query, mock_user_query, mock_add, mock_commit, app_context
+    mock_fruit_query, mock_user_query, mock_add, mock_hold, mock_commit, app_context
 ):
     fruit = MagicMock()
     fruit.price = 1.5
@@ -61,20 +63,117 @@ def test_add_to_cart_db_failure(
         cart_service.add_to_cart(user_id=1, fruit_id=1, quantity=3)
 
 
+@patch("app.services.cart_service.User.query")
+def test_add_to_cart_batch_resolves_lots_in_one_query(mock_user_query, app_context):
+    mock_user_query.get.return_value = User(user_id=7)
+    lots = [
+        MagicMock(fruit_id=1, info_id=10, price=2.0),
+        MagicMock(fruit_id=2, info_id=20, price=1.0),
+        MagicMock(fruit_id=1, info_id=11, price=9.0),
+    ]
+    lines = [
+        {"cart_id": 100, "fruit_id": 1, "quantity": 4, "added_date": None},
+        {"cart_id": 200, "fruit_id": 2, "quantity": 1, "added_date": None},
+    ]
+
+    with patch("app.services.cart_service.db.session") as mock_session, patch(
+        "app.services.cart_service.reservation_service.hold_stock"
+    ) as mock_hold:
+        mock_session.get_bind.return_value.dialect.name = "sqlite"
+        lookup, upsert, read = MagicMock(), MagicMock(), MagicMock()
+        lookup.all.return_value = lots
+        read.mappings.return_value = lines
+        mock_session.execute.side_effect = [lookup, upsert, read]
+
+        result = cart_service.add_to_cart_batch(
+            7,
+            [
+                {"fruit_id": 1, "quantity": 3},
+                {"fruit_id": 2, "quantity": 1},
+                {"fruit_id": 1, "quantity": 1},
+            ],
+        )
+
+    assert [r["fruit_id"] for r in result] == [1, 2]
+    assert mock_session.execute.call_count == 3
+    assert "IN" in str(mock_session.execute.call_args_list[0].args[0])
+    upsert_stmt, params = mock_session.execute.call_args_list[1].args
+    assert "ON CONFLICT" in str(upsert_stmt)
+    assert [(p["info_id"], p["quantity"], p["item_price"]) for p in params] == [
+        (10, 4, 8.0),
+        (20, 1, 1.0),
+    ]
+    mock_hold.assert_called_once_with(
+        [
+            {"cart_id": 100, "info_id": 10, "quantity": 4},
+            {"cart_id": 200, "info_id": 20, "quantity": 1},
+        ]
+    )
+    mock_user_query.get.assert_called_once_with(7)
+    mock_session.commit.assert_called_once()
+
+
+def test_add_to_cart_again_refreshes_added_date(app_context):
+    from app.extensions import db
+    from app.models.fruit import Fruit
+
+    fruit = Fruit(name="Refresh Kiwi", color="Green", size="S")
+    db.session.add(fruit)
+    db.session.flush()
+    db.session.add(
+        FruitInfo(
+            fruit_id=fruit.fruit_id,
+            weight=0.1,
+            price=1.0,
+            total_quantity=10,
+            available_quantity=10,
+            sell_by_date=datetime(2099, 1, 1),
+        )
+    )
+    db.session.commit()
+    token = "refresh-visitor"
+
+    line = cart_service.add_to_cart(-1, fruit.fruit_id, 1, guest_token=token)
+    line.added_date = datetime.utcnow() - timedelta(days=2)
+    db.session.commit()
+    line = cart_service.add_to_cart(-1, fruit.fruit_id, 2, guest_token=token)
+
+    assert line.quantity == 3
+    assert line.added_date > datetime.utcnow() - timedelta(hours=1)
+    cart_service.sweep_abandoned_carts()
+    assert db.session.get(Cart, line.cart_id) is not None
+    cart_service.clear_cart_for_user(-1, guest_token=token)
+
+
+def test_add_to_cart_batch_fruit_not_found(app_context):
+    with patch("app.services.cart_service.db.session") as mock_session:
+        mock_session.execute.return_value.all.return_value = []
+        with pytest.raises(ValueError, match="Fruit not found: 5"):
+            cart_service.add_to_cart_batch(1, [{"fruit_id": 5, "quantity": 1}])
+    mock_session.execute.assert_called_once()
+    mock_session.commit.assert_not_called()
+
+
 # --------------------------------------
 # ✅ get_cart_items_by_user tests
 # --------------------------------------
 
 
-@patch("app.services.cart_service.Cart.query")
-def test_get_cart_items_by_user_returns_list(mock_cart_query, app_context):
-    mock_cart1 = MagicMock()
-    mock_cart2 = MagicMock()
-    mock_cart_query.filter_by.return_value.all.return_value = [mock_cart1, mock_cart2]
+@patch("app.services.cart_service.db.session.execute")
+def test_get_cart_items_by_user_returns_list(mock_execute, app_context):
+    added = datetime(2030, 1, 1, 12, 0)
+    mock_execute.return_value.mappings.return_value = [
+        {"cart_id": 1, "fruit_name": "Kiwi", "added_date": added},
+        {"cart_id": 2, "fruit_name": None, "added_date": None},
+    ]
 
     result = cart_service.get_cart_items_by_user(user_id=1)
-    assert isinstance(result, list)
-    assert len(result) == 2
+    assert result == [
+        {"cart_id": 1, "fruit_name": "Kiwi", "added_date": "2030-01-01T12:00:00"},
+        {"cart_id": 2, "fruit_name": None, "added_date": None},
+    ]
+    mock_execute.assert_called_once()
+    assert "LEFT OUTER JOIN fruit" in str(mock_execute.call_args.args[0])
 
 
 # --------------------------------------
@@ -82,9 +181,19 @@ def test_get_cart_items_by_user_returns_list(mock_cart_query, app_context):
 # --------------------------------------
 
 
+def test_guest_cart_without_token_is_rejected(app_context):
+    with pytest.raises(ValueError, match="guest_token is required"):
+        cart_service.get_cart_items_by_user(cart_service.GUEST_USER_ID)
+    with pytest.raises(ValueError, match="guest_token is required"):
+        cart_service.clear_cart_for_user(cart_service.GUEST_USER_ID, guest_token="")
+
+
+@patch("app.services.cart_service.reservation_service.set_hold")
 @patch("app.services.cart_service.Cart.query")
 @patch("app.services.cart_service.db.session")
-def test_update_cart_item_success(mock_session, mock_cart_query, app_context):
+def test_update_cart_item_success(
+    mock_session, mock_cart_query, mock_set_hold, app_context
+):
     fruit_mock = MagicMock()
     fruit_mock.price = 5.0
 
@@ -98,6 +207,7 @@ def test_update_cart_item_success(mock_session, mock_cart_query, app_context):
     assert result == cart_item
     assert cart_item.quantity == 3
     assert cart_item.item_price == 15.0
+    mock_set_hold.assert_called_once_with(1, cart_item.info_id, 3)
     mock_session.commit.assert_called_once()
 
 
@@ -138,23 +248,74 @@ def test_delete_cart_item_success(mock_session, mock_cart_query):
 # --------------------------------------
 
 
-@patch("app.services.cart_service.Cart.query")
+@patch("app.services.cart_service.reservation_service.release_holds")
 @patch("app.services.cart_service.db.session")
-def test_clear_cart_for_user_with_items(mock_session, mock_cart_query):
-    mock_item1 = MagicMock()
-    mock_item2 = MagicMock()
-    mock_cart_query.filter_by.return_value.all.return_value = [mock_item1, mock_item2]
+def test_clear_cart_for_user_with_items(mock_session, mock_release):
+    mock_session.execute.return_value.rowcount = 2
 
     result = cart_service.clear_cart_for_user(user_id=1)
     assert result == 2
-    assert mock_session.delete.call_count == 2
+    mock_session.execute.assert_called_once()
+    assert str(mock_session.execute.call_args.args[0]).startswith("DELETE FROM cart")
+    mock_session.delete.assert_not_called()
+    mock_release.assert_called_once()
     mock_session.commit.assert_called_once()
 
 
-@patch("app.services.cart_service.Cart.query")
 @patch("app.services.cart_service.db.session")
-def test_clear_cart_for_user_empty(mock_session, mock_cart_query):
-    mock_cart_query.filter_by.return_value.all.return_value = []
+def test_clear_cart_for_user_empty(mock_session):
+    mock_session.execute.return_value.rowcount = 0
     result = cart_service.clear_cart_for_user(user_id=1)
     assert result == 0
     mock_session.commit.assert_called_once()
+
+
+# --------------------------------------
+# ✅ sweep_abandoned_carts tests
+# --------------------------------------
+
+
+def test_sweep_abandoned_carts_deletes_expired_lines_in_chunks(app_context):
+    from app.extensions import db
+
+    now = datetime(2030, 6, 1)
+    ages = {
+        1: (-1, timedelta(hours=30)),  # abandoned guest cart
+        2: (-1, timedelta(hours=1)),  # active guest cart
+        3: (-1, timedelta(days=40)),  # abandoned guest cart
+        4: (7, timedelta(days=2)),  # registered user, still kept
+        5: (7, timedelta(days=31)),  # stale
+    }
+    db.session.add_all(
+        Cart(
+            user_id=user_id,
+            fruit_id=1,
+            info_id=880000 + n,
+            quantity=1,
+            item_price=1.0,
+            added_date=now - age,
+        )
+        for n, (user_id, age) in ages.items()
+    )
+    db.session.commit()
+
+    with patch(
+        "app.services.cart_service.db.session.commit", wraps=db.session.commit
+    ) as commit:
+        deleted = cart_service.sweep_abandoned_carts(now=now, chunk_size=2)
+
+    assert deleted == 3
+    assert commit.call_count == 2
+    left = Cart.query.filter(Cart.info_id.between(880000, 880010)).all()
+    assert sorted(c.info_id - 880000 for c in left) == [2, 4]
+    Cart.query.filter(Cart.info_id.between(880000, 880010)).delete()
+    db.session.commit()
+
+
+def test_cart_sweep_cli(app_context):
+    from flask import current_app
+
+    result = current_app.test_cli_runner().invoke(args=["cart", "sweep"])
+
+    assert result.exit_code == 0
+    assert "Deleted" in result.output
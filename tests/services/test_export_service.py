@@ -0,0 +1,109 @@
+import csv
+import io
+import sys
+import uuid
+from datetime import date, datetime
+from unittest.mock import patch
+
+import pytest
+
+from app.extensions import db
+from app.models.fruit import Fruit
+from app.models.orders import Order, OrderArchive
+from app.models.users import User
+from app.services import export_service
+
+
+@pytest.fixture(scope="module")
+def app_context():
+    from app import create_app
+
+    app = create_app()
+    app.config["STREAM_BATCH_SIZE"] = 2
+    with app.app_context():
+        yield
+
+
+def _orders(*dates, archived=()):
+    """
+    Create a user with orders of a fresh fruit on ``dates`` (hot table) and
+    ``archived`` (archive table).
+    """
+    uid = uuid.uuid4().hex[:8]
+    user = User(name=f"Exp {uid}", email=f"export-{uid}@example.com", phone_number=uid)
+    fruit = Fruit(name=f"Exported {uid}", color="Red", size="M")
+    db.session.add_all([user, fruit])
+    db.session.flush()
+    common = dict(user_id=user.user_id, fruit_id=fruit.fruit_id, quantity=3)
+    db.session.add_all(Order(price_by_fruit=2.0, order_date=d, **common) for d in dates)
+    db.session.add_all(
+        OrderArchive(order_id=900000 + n, price_by_fruit=1.0, order_date=d, **common)
+        for n, d in enumerate(archived)
+    )
+    db.session.commit()
+    return user.user_id
+
+
+def _csv_rows(start=None, end=None):
+    text = "".join(export_service.iter_csv(start, end))
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+def test_csv_export_spans_archive_and_hot_in_date_order(app_context):
+    user_id = _orders(
+        datetime(2031, 5, 3, 12),
+        datetime(2031, 5, 1, 9),
+        datetime(2031, 5, 9),
+        archived=[datetime(2031, 4, 30, 23)],
+    )
+
+    rows = [r for r in _csv_rows() if r["user_id"] == str(user_id)]
+
+    assert [r["order_date"] for r in rows] == [
+        "2031-04-30 23:00:00",
+        "2031-05-01 09:00:00",
+        "2031-05-03 12:00:00",
+        "2031-05-09 00:00:00",
+    ]
+    assert rows[0]["total_price"] == "3.0"
+    assert rows[1]["total_price"] == "6.0"
+    assert rows[1]["fruit_name"].startswith("Exported")
+
+
+def test_csv_export_date_range_is_inclusive(app_context):
+    user_id = _orders(
+        datetime(2032, 1, 1), datetime(2032, 1, 31, 23, 59), datetime(2032, 2, 1)
+    )
+
+    rows = _csv_rows(date(2032, 1, 1), date(2032, 1, 31))
+
+    assert [r["user_id"] for r in rows] == [str(user_id), str(user_id)]
+
+
+def test_write_csv_counts_rows(app_context):
+    _orders(datetime(2033, 3, 1), datetime(2033, 3, 2), datetime(2033, 3, 3))
+    out = io.StringIO()
+
+    count = export_service.write_csv(out, date(2033, 3, 1), date(2033, 3, 31))
+
+    assert count == 3
+    assert out.getvalue().splitlines()[0] == ",".join(export_service.EXPORT_COLUMNS)
+
+
+def test_parquet_export(app_context, tmp_path):
+    import pyarrow.parquet as pq
+
+    _orders(datetime(2034, 6, 1), datetime(2034, 6, 2), datetime(2034, 6, 3))
+    path = tmp_path / "orders.parquet"
+
+    count = export_service.write_parquet(str(path), date(2034, 6, 1), date(2034, 6, 30))
+
+    table = pq.read_table(path)
+    assert count == table.num_rows == 3
+    assert table.column_names == list(export_service.EXPORT_COLUMNS)
+
+
+def test_parquet_export_without_pyarrow(app_context, tmp_path):
+    with patch.dict(sys.modules, {"pyarrow": None, "pyarrow.parquet": None}):
+        with pytest.raises(export_service.ParquetUnavailableError, match="pyarrow"):
+            export_service.write_parquet(str(tmp_path / "orders.parquet"))
@@ -5,6 +5,7 @@ import pytest
 
 from app.models.fruit import Fruit, FruitInfo
 from app.services import fruit_service
+from app.utils.catalog_cache import CatalogCache, get_catalog_cache
 
 
 @pytest.fixture(scope="module")
@@ -16,18 +17,30 @@ def app_context():
         yield
 
 
+@pytest.fixture(autouse=True)
+def fresh_catalog_cache(app_context):
+    get_catalog_cache().invalidate()
+
+
 # -------------------------------
 # ✅ add_fruit_with_info
 # -------------------------------
 
 
+@patch("app.services.fruit_service.search_index.index_fruits")
 @patch("app.services.fruit_service.db.session.commit")
 @patch("app.services.fruit_service.db.session.flush")
 @patch("app.services.fruit_service.db.session.add")
 @patch("app.services.fruit_service.FruitInfo")
 @patch("app.services.fruit_service.Fruit")
 def test_add_fruit_with_info_success(
-    mock_fruit, mock_fruit_info, mock_add, mock_flush, mock_commit, app_context
+    mock_fruit,
+    mock_fruit_info,
+    mock_add,
+    mock_flush,
+    mock_commit,
+    mock_index,
+    app_context,
 ):
     mock_fruit_instance = MagicMock()
     mock_fruit_instance.fruit_id = 1
@@ -53,6 +66,7 @@ def test_add_fruit_with_info_success(
     fruit, info = fruit_service.add_fruit_with_info(data, "http://image.jpg")
     assert fruit == mock_fruit_instance
     assert info == mock_fruit_info_instance
+    mock_index.assert_called_once_with([mock_fruit_instance])
 
 
 @patch("app.services.fruit_service.db.session.rollback")
@@ -110,29 +124,109 @@ def test_add_fruit_with_info_db_failure(
 # -------------------------------
 
 
-@patch("app.services.fruit_service.FruitInfo.query")
-@patch("app.services.fruit_service.Fruit.query")
-def test_get_all_fruits_returns_list(mock_fruit_query, mock_info_query, app_context):
-    mock_fruit = MagicMock()
-    mock_fruit.fruit_id = 1
-    mock_fruit.to_dict.return_value = {"name": "Apple"}
+def _catalog_row(**overrides):
+    row = {
+        "fruit_id": 1,
+        "name": "Apple",
+        "color": "Red",
+        "description": None,
+        "has_seeds": True,
+        "size": "M",
+        "image_url": None,
+        "info_id": 10,
+        "weight": 1.0,
+        "price": 2.0,
+        "total_quantity": 50,
+        "available_quantity": 25,
+        "sell_by_date": datetime(2030, 1, 1),
+    }
+    row.update(overrides)
+    return row
 
-    mock_info = MagicMock()
-    mock_info.fruit_id = 1
-    mock_info.info_id = 10
-    mock_info.weight = 1.0
-    mock_info.price = 2.0
-    mock_info.total_quantity = 50
-    mock_info.available_quantity = 25
-    mock_info.sell_by_date.isoformat.return_value = "2030-01-01"
 
-    mock_fruit_query.all.return_value = [mock_fruit]
-    mock_info_query.all.return_value = [mock_info]
+@patch("app.services.fruit_service.db.session.execute")
+def test_get_all_fruits_returns_list(mock_execute, app_context):
+    mock_execute.return_value.mappings.return_value = [_catalog_row()]
 
     results = fruit_service.get_all_fruits()
     assert isinstance(results, list)
     assert results[0]["name"] == "Apple"
     assert results[0]["info_id"] == 10
+    assert results[0]["sell_by_date"] == "2030-01-01T00:00:00"
+    mock_execute.assert_called_once()
+
+
+@patch("app.services.fruit_service.db.session.execute")
+def test_get_all_fruits_served_from_cache_with_live_stock(mock_execute, app_context):
+    page, stock = MagicMock(), MagicMock()
+    page.mappings.return_value = [_catalog_row()]
+    stock.all.return_value = [(10, 24)]
+    mock_execute.side_effect = [page, stock]
+
+    first = fruit_service.get_all_fruits(limit=10)
+    second = fruit_service.get_all_fruits(limit=10)
+
+    assert first[0]["available_quantity"] == 25
+    assert second == [{**first[0], "available_quantity": 24}]
+    # The hit only reads the stock of the cached page's lots.
+    assert mock_execute.call_count == 2
+    assert "fruit_info.info_id IN" in str(mock_execute.call_args.args[0])
+    assert get_catalog_cache().stats()["hits"] >= 1
+
+
+@patch("app.services.fruit_service.db.session.execute")
+def test_get_all_fruits_reloads_after_invalidate(mock_execute, app_context):
+    mock_execute.return_value.mappings.return_value = [_catalog_row()]
+
+    fruit_service.get_all_fruits()
+    get_catalog_cache().invalidate()
+    fruit_service.get_all_fruits()
+
+    assert mock_execute.call_count == 2
+
+
+def test_get_all_fruits_reloads_after_version_bump_elsewhere(app_context):
+    from app import db
+    from app.services import version_service
+
+    with patch("app.services.fruit_service.db.session.execute") as mock_execute:
+        mock_execute.return_value.mappings.return_value = [_catalog_row()]
+        fruit_service.get_all_fruits()
+    before = get_catalog_cache().version
+
+    # Another process commits a catalog write.
+    version_service.bump(version_service.CATALOG)
+    db.session.commit()
+
+    with patch("app.services.fruit_service.db.session.execute") as mock_execute:
+        mock_execute.return_value.mappings.return_value = [_catalog_row()]
+        fruit_service.get_all_fruits()
+
+    mock_execute.assert_called_once()
+    assert get_catalog_cache().version == before + 1
+
+
+def test_catalog_cache_evicts_least_recently_used():
+    cache = CatalogCache(maxsize=2)
+    cache.get_or_load("a", lambda: 1)
+    cache.get_or_load("b", lambda: 2)
+    cache.get_or_load("a", lambda: 0)  # touch "a"
+    cache.get_or_load("c", lambda: 3)  # evicts "b"
+
+    assert cache.get_or_load("a", lambda: -1) == 1
+    assert cache.get_or_load("b", lambda: -2) == -2
+    assert cache.stats()["size"] == 2
+
+
+def test_catalog_cache_skips_store_when_write_races_load():
+    cache = CatalogCache(maxsize=2)
+
+    def load():
+        cache.invalidate()
+        return "stale"
+
+    assert cache.get_or_load("a", load) == "stale"
+    assert cache.get_or_load("a", lambda: "fresh") == "fresh"
 
 
 # -------------------------------
@@ -140,42 +234,138 @@ def test_get_all_fruits_returns_list(mock_fruit_query, mock_info_query, app_cont
 # -------------------------------
 
 
-@patch("app.services.fruit_service.FruitInfo.query")
-@patch("app.services.fruit_service.Fruit.query")
-def test_get_fruit_by_id_success(mock_fruit_query, mock_info_query, app_context):
-    fruit = MagicMock()
-    fruit.to_dict.return_value = {"name": "Banana"}
-    info = MagicMock()
-    info.info_id = 5
-    info.sell_by_date.isoformat.return_value = "2030-01-01"
-    mock_fruit_query.get.return_value = fruit
-    mock_info_query.filter_by.return_value.first.return_value = info
+@patch("app.services.fruit_service.db.session.execute")
+def test_get_fruit_by_id_success(mock_execute, app_context):
+    mock_execute.return_value.mappings.return_value.first.return_value = _catalog_row(
+        name="Banana", info_id=5
+    )
 
     result = fruit_service.get_fruit_by_id(1)
     assert result["name"] == "Banana"
     assert result["info_id"] == 5
 
 
-@patch("app.services.fruit_service.FruitInfo.query")
-def test_search_fruits_success(mock_query, app_context):
-    mock_q = MagicMock()
-    mock_info = MagicMock()
-    mock_info.fruit.to_dict.return_value = {"name": "Lemon"}
-    mock_info.sell_by_date.isoformat.return_value = "2030-01-01"
-    mock_q.all.return_value = [mock_info]
-    mock_query.join.return_value = mock_q
+@patch("app.services.fruit_service.db.session.execute")
+def test_get_fruit_by_id_not_found(mock_execute, app_context):
+    mock_execute.return_value.mappings.return_value.first.return_value = None
+    assert fruit_service.get_fruit_by_id(1) is None
+
 
-    result = fruit_service.search_fruits({"search": "lem"})
+@patch("app.services.fruit_service.db.session.execute")
+def test_search_fruits_success(mock_execute, app_context):
+    mock_execute.return_value.mappings.return_value = [
+        _catalog_row(name="Lemon", score=1.5)
+    ]
+
+    result = fruit_service.search_fruits({"search": "lem"}, limit=5, after=(2.0, 3))
     assert isinstance(result, list)
+    assert result[0]["name"] == "Lemon"
 
+    sql = str(mock_execute.call_args.args[0])
+    assert "MATCH" in sql
+    assert "ORDER BY ranked.score DESC" in sql
+    assert "LIMIT" in sql
 
-@patch("app.services.fruit_service.FruitInfo.query")
-def test_search_fruits_exception(mock_query, app_context):
-    mock_query.join.side_effect = Exception("fail")
+
+@patch("app.services.fruit_service.db.session.execute")
+def test_search_fruits_without_keyword_orders_by_info_id(mock_execute, app_context):
+    mock_execute.return_value.mappings.return_value = []
+
+    fruit_service.search_fruits({"price_min": "1"}, after=(3,))
+
+    sql = str(mock_execute.call_args.args[0])
+    assert "fruit_info.info_id >" in sql
+    assert "ranked" not in sql
+
+
+@patch("app.services.fruit_service.db.session.execute")
+def test_search_fruits_exception(mock_execute, app_context):
+    mock_execute.side_effect = Exception("fail")
     with pytest.raises(Exception, match="fail"):
         fruit_service.search_fruits({"search": "lem"})
 
 
+@patch("app.services.fruit_service.db.session.execute")
+def test_search_fruits_invalid_value(mock_execute, app_context):
+    with pytest.raises(ValueError):
+        fruit_service.search_fruits({"value": "abc"})
+    mock_execute.assert_not_called()
+
+
+# -------------------------------
+# ✅ get_facets
+# -------------------------------
+
+
+def _facet_row(color, size, has_seeds, price_bucket, weight_bucket, count):
+    return {
+        "color": color,
+        "size": size,
+        "has_seeds": has_seeds,
+        "price_bucket": price_bucket,
+        "weight_bucket": weight_bucket,
+        "count": count,
+    }
+
+
+@patch("app.services.fruit_service.db.session.execute")
+def test_get_facets_folds_one_grouped_query(mock_execute, app_context):
+    mock_execute.return_value.mappings.return_value = [
+        _facet_row("Red", "M", True, 0, 3, 2),
+        _facet_row("Green", "M", False, 4, 3, 1),
+        _facet_row("Red", "S", True, 2, 0, 3),
+    ]
+
+    facets = fruit_service.get_facets({"search": "berry", "price_min": "0.5"})
+
+    mock_execute.assert_called_once()
+    sql = str(mock_execute.call_args.args[0])
+    assert "GROUP BY" in sql and "CASE" in sql and "MATCH" in sql
+
+    assert facets["total"] == 6
+    assert facets["color"] == [
+        {"value": "Red", "count": 5},
+        {"value": "Green", "count": 1},
+    ]
+    assert facets["has_seeds"] == [
+        {"value": True, "count": 5},
+        {"value": False, "count": 1},
+    ]
+    assert [b["count"] for b in facets["price"]] == [2, 0, 3, 0, 1]
+    assert facets["price"][0] == {"bucket": "0-1", "min": 0, "max": 1, "count": 2}
+    assert facets["price"][-1]["bucket"] == "10+"
+    assert [b["count"] for b in facets["weight"]] == [3, 0, 0, 3, 0]
+
+
+@patch("app.services.fruit_service.db.session.execute")
+def test_get_facets_cached_per_filter_set(mock_execute, app_context):
+    mock_execute.return_value.mappings.return_value = []
+
+    fruit_service.get_facets({"price_min": "1", "limit": "5"})
+    fruit_service.get_facets({"price_min": "1", "cursor": "abc"})
+    fruit_service.get_facets({"price_min": "2"})
+
+    assert mock_execute.call_count == 2
+
+
+@patch("app.services.fruit_service.db.session.execute")
+def test_get_facets_stock_filters_bypass_cache(mock_execute, app_context):
+    mock_execute.return_value.mappings.return_value = []
+
+    fruit_service.get_facets({"available_quantity_min": "1"})
+    fruit_service.get_facets({"available_quantity_min": "1"})
+
+    assert mock_execute.call_count == 2
+    assert get_catalog_cache().stats()["size"] == 0
+
+
+@patch("app.services.fruit_service.db.session.execute")
+def test_get_facets_invalid_value(mock_execute, app_context):
+    with pytest.raises(ValueError):
+        fruit_service.get_facets({"value": "abc"})
+    mock_execute.assert_not_called()
+
+
 # -------------------------------
 # ✅ update_fruit_info
 # -------------------------------
@@ -233,31 +423,94 @@ def test_add_fruit_with_info_db_failure(
 # -------------------------------
 
 
+def _add_fruit_with_refs(name):
+    from app.extensions import db
+    from app.models.cart import Cart
+    from app.models.orders import Order
+    from app.models.users import User
+
+    fruit = Fruit(name=name, color="Red", size="M", has_seeds=False)
+    db.session.add(fruit)
+    db.session.flush()
+    info = FruitInfo(
+        fruit_id=fruit.fruit_id,
+        weight=1.0,
+        price=2.0,
+        total_quantity=10,
+        available_quantity=10,
+        sell_by_date=datetime(2099, 1, 1),
+    )
+    db.session.add(info)
+    db.session.flush()
+    user_id = User.query.get(-1).user_id
+    db.session.add_all(
+        [
+            Cart(
+                user_id=user_id,
+                fruit_id=fruit.fruit_id,
+                info_id=info.info_id,
+                quantity=1,
+                item_price=2.0,
+            ),
+            Order(
+                user_id=user_id,
+                fruit_id=fruit.fruit_id,
+                info_id=info.info_id,
+                quantity=1,
+                price_by_fruit=2.0,
+            ),
+        ]
+    )
+    db.session.commit()
+    return fruit.fruit_id
+
+
 def test_delete_fruits_success(app_context):
-    Cart = MagicMock()
-    Order = MagicMock()
-    FruitInfo = MagicMock()
-    Fruit = MagicMock()
-    session = MagicMock()
-
-    Cart.query.filter_by.return_value.delete.return_value = 1
-    Order.query.filter_by.return_value.delete.return_value = 1
-    FruitInfo.query.filter_by.return_value.delete.return_value = 1
-    Fruit.query.get.return_value = MagicMock()
-
-    with patch.dict(
-        "sys.modules",
-        {
-            "app.models.cart": MagicMock(Cart=Cart),
-            "app.models.orders": MagicMock(Order=Order),
-        },
-    ), patch("app.services.fruit_service.FruitInfo", FruitInfo), patch(
-        "app.services.fruit_service.Fruit", Fruit
-    ), patch(
-        "app.services.fruit_service.db.session", session
-    ):
-
-        result = fruit_service.delete_fruits([1])
-        assert result == 1
-        session.delete.assert_called_once_with(Fruit.query.get.return_value)
-        session.commit.assert_called_once()
+    ids = [_add_fruit_with_refs(f"DeleteMe{i}") for i in range(3)]
+
+    counts = fruit_service.delete_fruits(ids + [999999], chunk_size=2)
+
+    assert counts == {"cart": 3, "orders": 3, "fruit_info": 3, "fruit": 3}
+    assert Fruit.query.filter(Fruit.fruit_id.in_(ids)).count() == 0
+
+
+def test_delete_fruits_statement_count_is_per_chunk(app_context):
+    from app.extensions import db
+
+    ids = [_add_fruit_with_refs(f"Chunked{i}") for i in range(5)]
+    real_execute = db.session.execute
+
+    with patch(
+        "app.services.fruit_service.db.session.execute", side_effect=real_execute
+    ) as spy:
+        counts = fruit_service.delete_fruits(ids, chunk_size=5)
+
+    assert counts["fruit"] == 5
+    # One DELETE per table (the order archive, sales rollup and cart holds
+    # included), one for the search index and the catalog version bump, for
+    # the whole chunk
+    assert spy.call_count == 9
+
+
+def test_delete_fruits_rolls_back_on_error(app_context):
+    with patch(
+        "app.services.fruit_service.db.session.execute", side_effect=Exception("boom")
+    ), patch("app.services.fruit_service.db.session.rollback") as mock_rollback:
+        with pytest.raises(Exception, match="boom"):
+            fruit_service.delete_fruits([1])
+    mock_rollback.assert_called_once()
+
+
+def test_fruit_delete_cli(app_context, tmp_path):
+    from flask import current_app
+
+    fruit_id = _add_fruit_with_refs("CliDelete")
+    ids_file = tmp_path / "ids.txt"
+    ids_file.write_text(f"{fruit_id}\n")
+
+    result = current_app.test_cli_runner().invoke(
+        args=["fruit", "delete", "--ids-file", str(ids_file)]
+    )
+
+    assert result.exit_code == 0
+    assert "fruit: 1" in result.output
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.extensions import db
+from app.models.idempotency import IdempotencyKey
+from app.services import idempotency_service
+
+
+@pytest.fixture
+def app_context(app):
+    with app.app_context():
+        yield
+
+
+def test_claim_new_key(app_context):
+    claimed_at, stored = idempotency_service.claim("POST /x", "new-key", "f1")
+    assert stored is None
+    row = IdempotencyKey.query.filter_by(scope="POST /x", key="new-key").one()
+    assert row.created_at == claimed_at
+    assert row.fingerprint == "f1"
+    assert row.status_code is None
+
+
+def test_claim_returns_stored_response(app_context):
+    claimed_at, _ = idempotency_service.claim("POST /x", "done-key", "f1")
+    idempotency_service.complete(
+        "POST /x", "done-key", claimed_at, 201, '{"ok":1}', "{}"
+    )
+
+    claimed_at, stored = idempotency_service.claim("POST /x", "done-key", "f1")
+
+    assert claimed_at is None
+
+    assert stored == {
+        "fingerprint": "f1",
+        "status_code": 201,
+        "response_body": '{"ok":1}',
+        "response_headers": "{}",
+    }
+
+
+def test_claim_is_scoped(app_context):
+    idempotency_service.claim("POST /x", "shared-key", "f1")
+    assert idempotency_service.claim("POST /y", "shared-key", "f2")[1] is None
+
+
+def test_claim_replaces_expired_key(app_context, app):
+    claimed_at, _ = idempotency_service.claim("POST /x", "old-key", "f1")
+    idempotency_service.complete("POST /x", "old-key", claimed_at, 201, "{}", "{}")
+    row = IdempotencyKey.query.filter_by(key="old-key").one()
+    row.created_at = datetime.utcnow() - timedelta(
+        hours=app.config["IDEMPOTENCY_TTL_HOURS"] + 1
+    )
+    db.session.commit()
+
+    assert idempotency_service.claim("POST /x", "old-key", "f2")[1] is None
+    assert IdempotencyKey.query.filter_by(key="old-key").one().fingerprint == "f2"
+
+
+def _age_claim(key: str, seconds: int):
+    row = IdempotencyKey.query.filter_by(key=key).one()
+    row.created_at = datetime.utcnow() - timedelta(seconds=seconds)
+    db.session.commit()
+
+
+def test_claim_in_progress_is_kept(app_context, app):
+    idempotency_service.claim("POST /x", "busy-key", "f1")
+    _age_claim("busy-key", app.config["IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS"] - 5)
+
+    claimed_at, stored = idempotency_service.claim("POST /x", "busy-key", "f1")
+
+    assert claimed_at is None
+    assert stored["status_code"] is None
+
+
+def test_claim_takes_over_stale_claim(app_context, app):
+    stale_at, _ = idempotency_service.claim("POST /x", "stale-key", "f1")
+    _age_claim("stale-key", app.config["IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS"] + 5)
+
+    claimed_at, stored = idempotency_service.claim("POST /x", "stale-key", "f1")
+    assert stored is None
+
+    # The stale request finishing late leaves the new claim alone.
+    idempotency_service.complete("POST /x", "stale-key", stale_at, 201, "{}", "{}")
+    idempotency_service.release("POST /x", "stale-key", stale_at)
+    row = IdempotencyKey.query.filter_by(key="stale-key").one()
+    assert (row.created_at, row.status_code) == (claimed_at, None)
+
+
+def test_claim_keeps_completed_key_past_claim_timeout(app_context, app):
+    claimed_at, _ = idempotency_service.claim("POST /x", "kept-key", "f1")
+    idempotency_service.complete("POST /x", "kept-key", claimed_at, 201, "{}", "{}")
+    _age_claim("kept-key", app.config["IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS"] + 5)
+
+    assert (
+        idempotency_service.claim("POST /x", "kept-key", "f1")[1]["status_code"] == 201
+    )
+
+
+def test_release_drops_claim(app_context):
+    claimed_at, _ = idempotency_service.claim("POST /x", "failed-key", "f1")
+    idempotency_service.release("POST /x", "failed-key", claimed_at)
+    assert IdempotencyKey.query.filter_by(key="failed-key").count() == 0
+
+
+def test_purge_expired_keys(app_context, app):
+    idempotency_service.claim("POST /x", "purge-old", "f1")
+    idempotency_service.claim("POST /x", "purge-new", "f1")
+    row = IdempotencyKey.query.filter_by(key="purge-old").one()
+    row.created_at = datetime.utcnow() - timedelta(
+        hours=app.config["IDEMPOTENCY_TTL_HOURS"] + 1
+    )
+    db.session.commit()
+
+    assert idempotency_service.purge_expired_keys() >= 1
+    assert IdempotencyKey.query.filter_by(key="purge-old").count() == 0
+    assert IdempotencyKey.query.filter_by(key="purge-new").count() == 1
@@ -0,0 +1,179 @@
+import io
+import json
+from unittest.mock import patch
+
+import pytest
+
+from app.models.fruit import Fruit, FruitInfo
+from app.services import import_service
+
+CSV_HEADER = (
+    "name,color,size,has_seeds,description,weight,price,total_quantity,sell_by_date\n"
+)
+
+
+def _csv(*lines):
+    return io.StringIO(CSV_HEADER + "".join(line + "\n" for line in lines))
+
+
+def test_import_csv_creates_fruits_and_lots(app):
+    with app.app_context():
+        report = import_service.import_fruits(
+            _csv(
+                "Importberry,Blue,S,true,,0.2,3.5,100,2099-01-01",
+                "Importberry,Blue,S,true,,0.4,6.0,50,2099-01-01",
+                "Importlime,Green,M,false,zesty,0.1,0.5,10,2099-02-01",
+            ),
+            "csv",
+        )
+
+        assert report["processed"] == 3
+        assert report["fruits_created"] == 2
+        assert report["lots_created"] == 3
+        assert report["errors"] == []
+
+        berry = Fruit.query.filter_by(name="Importberry").one()
+        assert len(berry.fruit_info) == 2
+        assert berry.fruit_info[0].available_quantity == 100
+
+
+def test_import_reports_invalid_and_duplicate_rows(app):
+    with app.app_context():
+        report = import_service.import_fruits(
+            _csv(
+                "Dupfruit,Red,L,false,,1.0,2.0,5,2099-01-01",
+                "Dupfruit,Red,L,false,,1.0,2.0,5,2099-01-01",
+                "Badfruit,Red,L,false,,-1,2.0,5,2099-01-01",
+                "Oldfruit,Red,L,false,,1.0,2.0,5,2000-01-01",
+            ),
+            "csv",
+        )
+
+        assert report["lots_created"] == 1
+        errors = {e["row"]: e["error"] for e in report["errors"]}
+        assert errors[2] == "Duplicate row in import"
+        assert errors[3].startswith("weight")
+        assert "future" in errors[4]
+
+
+def test_import_ndjson_skips_existing_lots(app):
+    with app.app_context():
+        line = json.dumps(
+            {
+                "name": "Ndjsonfig",
+                "color": "Purple",
+                "size": "S",
+                "weight": 0.05,
+                "price": 0.8,
+                "total_quantity": 40,
+                "available_quantity": 30,
+                "sell_by_date": "2099-03-01",
+            }
+        )
+        first = import_service.import_fruits(io.StringIO(line + "\n"), "ndjson")
+        second = import_service.import_fruits(
+            io.StringIO(line + "\n{not json}\n"), "ndjson", chunk_size=1
+        )
+
+        assert first["lots_created"] == 1
+        assert second["lots_created"] == 0
+        assert second["skipped"] == 1
+        assert second["errors"][1]["error"].startswith("Invalid JSON")
+
+        fig = Fruit.query.filter_by(name="Ndjsonfig").one()
+        assert FruitInfo.query.filter_by(fruit_id=fig.fruit_id).count() == 1
+        assert fig.fruit_info[0].available_quantity == 30
+
+
+def test_import_unsupported_format(app):
+    with app.app_context():
+        with pytest.raises(ValueError, match="Unsupported"):
+            import_service.import_fruits(io.StringIO(""), "xml")
+
+
+def test_detect_format():
+    assert import_service.detect_format("lots.csv", None) == "csv"
+    assert import_service.detect_format(None, "application/x-ndjson") == "ndjson"
+    assert import_service.detect_format("lots.txt", "text/plain") is None
+
+
+def test_fruit_import_cli(app, tmp_path):
+    path = tmp_path / "lots.csv"
+    path.write_text(CSV_HEADER + "Clicherry,Red,S,true,,0.01,0.2,500,2099-01-01\n")
+
+    result = app.test_cli_runner().invoke(args=["fruit", "import", str(path)])
+
+    assert result.exit_code == 0
+    assert "1 fruits, 1 lots created, 0 errors" in result.output
+
+
+def test_import_matches_existing_fruit_by_content_hash(app):
+    with app.app_context():
+        import_service.import_fruits(
+            _csv("Hashplum,Purple,M,true,,0.3,1.0,20,2099-01-01"), "csv"
+        )
+        report = import_service.import_fruits(
+            _csv(
+                " hashplum ,PURPLE,m,true,,0.30,1,20,2099-01-01",
+                "HASHPLUM,purple,M,true,,0.5,1.5,20,2099-01-01",
+            ),
+            "csv",
+        )
+
+        assert report["fruits_created"] == 0
+        assert report["lots_created"] == 1
+        assert report["skipped"] == 1
+        assert Fruit.query.filter_by(name="Hashplum").one()
+
+
+def test_import_counts_only_rows_inserted(app):
+    with app.app_context():
+        import_service.import_fruits(
+            _csv("Raceplum,Purple,M,true,,0.3,1.0,20,2099-01-01"), "csv"
+        )
+
+        # Rows committed concurrently are missed by the up-front probes and
+        # only skipped by ON CONFLICT.
+        existing_hashes = import_service._existing_hashes
+        probed = set()
+
+        def missed_probe(column, hashes):
+            if column.table.name in probed:
+                return existing_hashes(column, hashes)
+            probed.add(column.table.name)
+            return {}
+
+        with patch.object(
+            import_service, "_existing_hashes", side_effect=missed_probe
+        ), patch.object(import_service.search_index, "index_fruits") as index_fruits:
+            report = import_service.import_fruits(
+                _csv(
+                    "Raceplum,Purple,M,true,,0.3,1.0,20,2099-01-01",
+                    "Raceplum,Purple,M,true,,0.6,2.0,20,2099-01-01",
+                ),
+                "csv",
+            )
+
+        assert report["fruits_created"] == 0
+        assert report["lots_created"] == 1
+        assert report["skipped"] == 1
+        assert report["errors"] == [
+            {"row": 1, "error": "Fruit info with these details already exists"}
+        ]
+        index_fruits.assert_called_once_with([])
+        plum = Fruit.query.filter_by(name="Raceplum").one()
+        assert FruitInfo.query.filter_by(fruit_id=plum.fruit_id).count() == 2
+
+
+def test_import_failed_chunk_reports_rows_once(app):
+    with app.app_context():
+        line = "Failplum,Purple,M,true,,0.3,1.0,20,2099-01-01"
+        import_service.import_fruits(_csv(line), "csv")
+
+        with patch.object(
+            import_service.db.session, "commit", side_effect=Exception("DB down")
+        ):
+            report = import_service.import_fruits(_csv(line), "csv")
+
+        assert report["skipped"] == 0
+        assert report["errors"] == [{"row": 1, "error": "Chunk failed: DB down"}]
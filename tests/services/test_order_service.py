@@ -1,4 +1,5 @@
 from datetime import datetime
+from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -21,31 +22,129 @@ def app_context():
 # -------------------------
 
 
-@patch("app.services.order_service.db.session.commit")
-@patch("app.services.order_service.db.session.delete")
-@patch("app.services.order_service.db.session.add")
-@patch("app.services.order_service.Cart.query")
-@patch("app.services.order_service.User.query")
-def test_place_order_success(
-    mock_user_q, mock_cart_q, mock_add, mock_delete, mock_commit, app_context
-):
-    user = MagicMock()
-    mock_user_q.get.return_value = user
-
-    cart_item = MagicMock()
-    cart_item.quantity = 2
-    cart_item.fruit_info.available_quantity = 10
-    cart_item.fruit_info.price = 3.0
-    cart_item.fruit_id = 1
-    cart_item.info_id = 1
-
-    mock_cart_q.filter_by.return_value.all.return_value = [cart_item]
-    mock_cart_q.filter.return_value.all.return_value = [cart_item]
-
-    result = order_service.place_order(user_id=1, cart_ids=[1])
+def _checkout_data(available=10, lots=2):
+    """
+    Create a user with one cart line per lot of a fresh fruit.
+    """
+    import uuid
+
+    from app.extensions import db
+    from app.models.cart import Cart
+    from app.models.fruit import Fruit, FruitInfo
+    from app.models.users import User
+
+    uid = uuid.uuid4().hex[:8]
+    user = User(name=f"Buyer {uid}", email=f"buyer-{uid}@example.com", phone_number=uid)
+    fruit = Fruit(name=f"Checkout {uid}", color="Red", size="M")
+    db.session.add_all([user, fruit])
+    db.session.flush()
+
+    infos = [
+        FruitInfo(
+            fruit_id=fruit.fruit_id,
+            weight=1.0 + n,
+            price=2.0,
+            total_quantity=available,
+            available_quantity=available,
+            sell_by_date=datetime(2099, 1, 1),
+        )
+        for n in range(lots)
+    ]
+    db.session.add_all(infos)
+    db.session.flush()
+    carts = [
+        Cart(
+            user_id=user.user_id,
+            fruit_id=fruit.fruit_id,
+            info_id=info.info_id,
+            quantity=3,
+            item_price=6.0,
+        )
+        for info in infos
+    ]
+    db.session.add_all(carts)
+    db.session.commit()
+    return user.user_id, [c.cart_id for c in carts], [i.info_id for i in infos]
+
+
+def test_place_order_only_selected_lines(app_context):
+    from app.extensions import db
+    from app.models.cart import Cart
+    from app.models.fruit import FruitInfo
+    from app.models.orders import Order, ParentOrder
+
+    user_id, cart_ids, info_ids = _checkout_data()
+
+    result = order_service.place_order(user_id=user_id, cart_ids=[cart_ids[0]])
+
     assert result["order_total"] == 6.0
-    assert isinstance(result["order_items"], list)
-    mock_commit.assert_called_once()
+    assert [o["info_id"] for o in result["order_items"]] == [info_ids[0]]
+    assert result["order_items"][0]["fruit_name"].startswith("Checkout")
+    assert result["order_items"][0]["total_price"] == 6.0
+
+    parent = db.session.get(ParentOrder, result["order_id"])
+    assert parent.total_amount == 6.0
+    assert Order.query.filter_by(parent_order_id=parent.id).count() == 1
+    assert [c.cart_id for c in Cart.query.filter_by(user_id=user_id)] == cart_ids[1:]
+    assert db.session.get(FruitInfo, info_ids[0]).available_quantity == 7
+    assert db.session.get(FruitInfo, info_ids[1]).available_quantity == 10
+
+
+def test_place_order_statement_count_is_constant(app_context):
+    from sqlalchemy import event
+
+    from app.extensions import db
+
+    def statements_for(lots):
+        user_id, cart_ids, _ = _checkout_data(lots=lots)
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            order_service.place_order(user_id=user_id, cart_ids=cart_ids)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+        return len(statements)
+
+    assert statements_for(1) == statements_for(5)
+
+
+def test_place_order_bumps_orders_version_after_commit(app_context):
+    from app.extensions import db
+    from app.services import version_service
+
+    user_id, cart_ids, _ = _checkout_data()
+    before, _ = version_service.get_version(version_service.ORDERS)
+    calls = []
+    commit, bump = db.session.commit, version_service.bump
+
+    def record(name, real):
+        return lambda *a, **k: (calls.append(name), real(*a, **k))[1]
+
+    with patch(
+        "app.services.order_service.db.session.commit",
+        side_effect=record("commit", commit),
+    ), patch.object(version_service, "bump", side_effect=record("bump", bump)):
+        order_service.place_order(user_id=user_id, cart_ids=cart_ids)
+
+    # The version row is only locked in its own transaction.
+    assert calls == ["commit", "bump", "commit"]
+    assert version_service.get_version(version_service.ORDERS)[0] == before + 1
+
+
+def test_place_order_survives_failed_version_bump(app_context):
+    from app.models.orders import ParentOrder
+    from app.services import version_service
+
+    user_id, cart_ids, _ = _checkout_data()
+
+    with patch.object(version_service, "bump", side_effect=Exception("locked")):
+        result = order_service.place_order(user_id=user_id, cart_ids=cart_ids)
+
+    assert ParentOrder.query.filter_by(id=result["order_id"]).count() == 1
 
 
 @patch("app.services.order_service.User.query")
@@ -62,88 +161,206 @@ def test_place_order_empty_cart_ids(mock_user_q, app_context):
         order_service.place_order(user_id=1, cart_ids=[])
 
 
-@patch("app.services.order_service.Cart.query")
-@patch("app.services.order_service.User.query")
-def test_place_order_cart_not_found(mock_user_q, mock_cart_q, app_context):
-    mock_user_q.get.return_value = MagicMock()
-    mock_cart_q.filter.return_value.all.return_value = []
+def test_place_order_cart_not_found(app_context):
+    user_id, _, _ = _checkout_data()
     with pytest.raises(ValueError, match="Cart is empty"):
-        order_service.place_order(user_id=1, cart_ids=[999])
+        order_service.place_order(user_id=user_id, cart_ids=[999999])
 
 
-@patch("app.services.order_service.Cart.query")
-@patch("app.services.order_service.User.query")
-def test_place_order_cart_items_missing(mock_user_q, mock_cart_q, app_context):
-    mock_user_q.get.return_value = MagicMock()
-    mock_cart_q.filter.return_value.all.return_value = [MagicMock()]
-    mock_cart_q.filter_by.return_value.all.return_value = []
-    with pytest.raises(ValueError, match="Cart is empty"):
-        order_service.place_order(user_id=1, cart_ids=[1])
+def test_place_order_other_users_cart_line(app_context):
+    user_id, cart_ids, _ = _checkout_data()
+    other_user_id, other_cart_ids, _ = _checkout_data()
+    with pytest.raises(ValueError, match=f"Cart items not found: {other_cart_ids[0]}"):
+        order_service.place_order(
+            user_id=user_id, cart_ids=[cart_ids[0], other_cart_ids[0]]
+        )
 
 
-@patch("app.services.order_service.Cart.query")
-@patch("app.services.order_service.User.query")
-def test_place_order_insufficient_stock(mock_user_q, mock_cart_q, app_context):
-    mock_user_q.get.return_value = MagicMock()
+def test_place_order_insufficient_stock(app_context):
+    from app.extensions import db
+    from app.models.cart import Cart
+    from app.models.fruit import FruitInfo
 
-    cart = MagicMock()
-    cart.quantity = 5
-    cart.fruit_info.available_quantity = 3
-    mock_cart_q.filter.return_value.all.return_value = [cart]
-    mock_cart_q.filter_by.return_value.all.return_value = [cart]
+    user_id, cart_ids, info_ids = _checkout_data(available=3)
+    db.session.get(FruitInfo, info_ids[1]).available_quantity = 2
+    db.session.commit()
 
     with pytest.raises(ValueError, match="Not enough stock"):
-        order_service.place_order(user_id=1, cart_ids=[1])
+        order_service.place_order(user_id=user_id, cart_ids=cart_ids)
 
+    db.session.expire_all()
+    assert db.session.get(FruitInfo, info_ids[0]).available_quantity == 3
+    assert Cart.query.filter_by(user_id=user_id).count() == 2
 
-@patch("app.services.order_service.db.session.rollback")
-@patch(
-    "app.services.order_service.db.session.commit", side_effect=Exception("DB failure")
-)
-@patch("app.services.order_service.Cart.query")
-@patch("app.services.order_service.User.query")
-def test_place_order_commit_fail(
-    mock_user_q, mock_cart_q, mock_commit, mock_rollback, app_context
-):
-    user = MagicMock()
-    mock_user_q.get.return_value = user
-
-    cart = MagicMock()
-    cart.quantity = 1
-    cart.fruit_info.available_quantity = 2
-    cart.fruit_info.price = 3.0
-    cart.fruit_id = 1
-    cart.info_id = 1
-
-    mock_cart_q.filter.return_value.all.return_value = [cart]
-    mock_cart_q.filter_by.return_value.all.return_value = [cart]
-
-    with pytest.raises(Exception, match="DB failure"):
-        order_service.place_order(user_id=1, cart_ids=[1])
+
+def test_place_order_commit_fail(app_context):
+    user_id, cart_ids, _ = _checkout_data()
+
+    with patch(
+        "app.services.order_service.db.session.commit",
+        side_effect=Exception("DB failure"),
+    ), patch("app.services.order_service.db.session.rollback") as mock_rollback:
+        with pytest.raises(Exception, match="DB failure"):
+            order_service.place_order(user_id=user_id, cart_ids=cart_ids)
     mock_rollback.assert_called_once()
 
 
+# -------------------------
+# ✅ order queue tests
+# -------------------------
+
+
+def test_enqueue_order_runs_on_process(app_context):
+    from app.models.cart import Cart
+    from app.models.orders import OrderJob
+
+    user_id, cart_ids, _ = _checkout_data()
+    job = order_service.enqueue_order(user_id, cart_ids)
+    assert Cart.query.filter_by(user_id=user_id).count() == 2
+
+    assert order_service.process_next_order_job() == job["job_id"]
+
+    status = order_service.get_order_job(job["job_id"])
+    assert status["status"] == OrderJob.DONE
+    assert status["result"]["order_total"] == 12.0
+    assert Cart.query.filter_by(user_id=user_id).count() == 0
+    assert order_service.process_next_order_job() is None
+
+
+def test_enqueue_order_unknown_user(app_context):
+    with pytest.raises(ValueError, match="User not found"):
+        order_service.enqueue_order(999999, [1])
+
+
+def test_process_order_job_insufficient_stock_fails_job(app_context):
+    from app.models.cart import Cart
+
+    user_id, cart_ids, _ = _checkout_data(available=1)
+    job = order_service.enqueue_order(user_id, cart_ids)
+
+    order_service.process_order_jobs()
+
+    status = order_service.get_order_job(job["job_id"])
+    assert status["status"] == "failed"
+    assert "Not enough stock" in status["error"]
+    assert status["order_id"] is None
+    assert Cart.query.filter_by(user_id=user_id).count() == 2
+
+
+def test_stale_processing_job_is_reclaimed(app_context):
+    from datetime import timedelta
+
+    from app.extensions import db
+    from app.models.orders import OrderJob
+
+    user_id, cart_ids, _ = _checkout_data()
+    job = order_service.enqueue_order(user_id, cart_ids)
+    row = db.session.get(OrderJob, job["job_id"])
+    row.status = OrderJob.PROCESSING
+    row.claimed_at = datetime.utcnow() - timedelta(hours=1)
+    db.session.commit()
+
+    order_service.process_order_jobs()
+
+    assert order_service.get_order_job(job["job_id"])["status"] == "done"
+
+
+def test_order_job_with_lost_claim_keeps_new_outcome(app_context):
+    from datetime import timedelta
+
+    from app.extensions import db
+    from app.models.cart import Cart
+    from app.models.orders import OrderJob, ParentOrder
+
+    user_id, cart_ids, _ = _checkout_data()
+    job = order_service.enqueue_order(user_id, cart_ids)
+    # A slow worker's claim, since requeued as stale and claimed again.
+    claimed = order_service._claim_order_job()._asdict()
+    stale = SimpleNamespace(
+        **{**claimed, "claimed_at": datetime.utcnow() - timedelta(hours=1)}
+    )
+
+    with patch.object(order_service, "_claim_order_job", return_value=stale):
+        assert order_service.process_next_order_job() == job["job_id"]
+
+    db.session.expire_all()
+    assert db.session.get(OrderJob, job["job_id"]).status == OrderJob.PROCESSING
+    assert Cart.query.filter_by(user_id=user_id).count() == 2
+    assert ParentOrder.query.filter_by(user_id=user_id).count() == 0
+
+    # The claim times out and another worker runs the job.
+    row = db.session.get(OrderJob, job["job_id"])
+    row.claimed_at = datetime.utcnow() - timedelta(minutes=30)
+    db.session.commit()
+    order_service.process_order_jobs()
+    done = order_service.get_order_job(job["job_id"])
+    assert done["status"] == OrderJob.DONE
+    assert not order_service._finish_order_job(
+        stale, status=OrderJob.FAILED, error="Cart is empty"
+    )
+    db.session.commit()
+    assert order_service.get_order_job(job["job_id"])["status"] == OrderJob.DONE
+
+
 # -------------------------
 # ✅ get_order_history tests
 # -------------------------
 
 
-@patch("app.services.order_service.Order.query")
-def test_get_order_history_success(mock_query, app_context):
-    mock_order = MagicMock()
-    mock_order.as_dict.return_value = {"id": 1}
-    mock_query.filter_by.return_value.order_by.return_value.all.return_value = [
-        mock_order
+def test_get_order_history_keyset_pages(app_context):
+    user_id, cart_ids, _ = _checkout_data(lots=3)
+    order_service.place_order(user_id=user_id, cart_ids=cart_ids)
+
+    first = order_service.get_order_history(user_id, limit=2)
+    last = first[-1]
+    cursor = (datetime.fromisoformat(last["order_date"]), last["order_id"])
+    rest = order_service.get_order_history(user_id, limit=2, before=cursor)
+
+    ids = [o["order_id"] for o in first + rest]
+    assert len(ids) == 3
+    assert ids == sorted(ids, reverse=True)
+
+
+def test_get_order_history_matches_as_dict(app_context):
+    from app.models.orders import Order
+
+    user_id, cart_ids, _ = _checkout_data(lots=2)
+    order_service.place_order(user_id=user_id, cart_ids=cart_ids)
+
+    expected = [
+        o.as_dict()
+        for o in Order.query.filter_by(user_id=user_id).order_by(Order.order_id.desc())
     ]
+    assert order_service.get_order_history(user_id) == expected
 
-    result = order_service.get_order_history(1)
-    assert isinstance(result, list)
-    assert result[0]["id"] == 1
 
+def test_get_order_history_single_query(app_context):
+    from sqlalchemy import event
 
-@patch("app.services.order_service.Order.query")
-def test_get_order_history_exception(mock_query, app_context):
-    mock_query.filter_by.side_effect = Exception("fail")
+    from app.extensions import db
+
+    user_id, cart_ids, _ = _checkout_data(lots=3)
+    order_service.place_order(user_id=user_id, cart_ids=cart_ids)
+    db.session.expire_all()
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        history = order_service.get_order_history(user_id, limit=2)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+
+    assert all(o["fruit_name"].startswith("Checkout") for o in history)
+    # Recent orders fill the page, so the archive is not queried
+    assert len(statements) == 1
+
+
+@patch("app.services.order_service.db.session.execute", side_effect=Exception("fail"))
+def test_get_order_history_exception(mock_execute, app_context):
     with pytest.raises(Exception, match="fail"):
         order_service.get_order_history(1)
 
@@ -153,22 +370,11 @@ def test_get_order_history_exception(mock_query, app_context):
 # -------------------------
 
 
-class FakeOrder:
-    def as_dict(self):
-        return {"id": 1}
-
+def test_get_all_orders_success(app_context):
+    user_id, cart_ids, _ = _checkout_data(lots=2)
+    order_service.place_order(user_id=user_id, cart_ids=cart_ids)
 
-@patch("app.services.order_service.Order.query")
-def test_get_all_orders_success(mock_query, app_context):
-    mock_query.order_by.return_value.all.return_value = [FakeOrder()]
-    result = order_service.get_all_orders()
-    assert result == [{"id": 1}]
+    result = order_service.get_all_orders(limit=2)
 
-
-@patch("app.services.order_service.Order.query")
-def test_get_order_history_success(mock_query, app_context):
-    mock_query.filter_by.return_value.order_by.return_value.all.return_value = [
-        FakeOrder()
-    ]
-    result = order_service.get_order_history(1)
-    assert result == [{"id": 1}]
+    assert [o["user_id"] for o in result] == [user_id, user_id]
+    assert all(o["total_price"] == 6.0 for o in result)
@@ -0,0 +1,186 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.extensions import db
+from app.models.cart import Cart, CartReservation
+from app.models.fruit import Fruit, FruitInfo
+from app.models.users import User
+from app.services import cart_service, order_service, reservation_service
+from app.services.reservation_service import OutOfStockError
+
+
+@pytest.fixture(scope="module")
+def app_context():
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        yield
+
+
+def _stock(available=10):
+    """
+    Create a user and a fresh fruit with one lot of ``available`` units.
+    """
+    uid = uuid.uuid4().hex[:8]
+    user = User(
+        name=f"Holder {uid}", email=f"holder-{uid}@example.com", phone_number=uid
+    )
+    fruit = Fruit(name=f"Held {uid}", color="Red", size="M")
+    db.session.add_all([user, fruit])
+    db.session.flush()
+    info = FruitInfo(
+        fruit_id=fruit.fruit_id,
+        weight=1.0,
+        price=2.0,
+        total_quantity=available,
+        available_quantity=available,
+        sell_by_date=datetime(2099, 1, 1),
+    )
+    db.session.add(info)
+    db.session.commit()
+    return user.user_id, fruit.fruit_id, info.info_id
+
+
+def _available(info_id):
+    db.session.expire_all()
+    return db.session.get(FruitInfo, info_id).available_quantity
+
+
+def _hold(cart_id):
+    db.session.expire_all()
+    return db.session.get(CartReservation, cart_id)
+
+
+def test_add_to_cart_holds_stock(app_context):
+    user_id, fruit_id, info_id = _stock(10)
+
+    cart_id = cart_service.add_to_cart(user_id, fruit_id, 3).cart_id
+    cart_service.add_to_cart(user_id, fruit_id, 2)
+
+    assert _available(info_id) == 5
+    hold = _hold(cart_id)
+    assert (hold.info_id, hold.quantity) == (info_id, 5)
+    assert hold.expires_at > datetime.utcnow() + timedelta(minutes=10)
+
+
+def test_add_to_cart_out_of_stock_adds_nothing(app_context):
+    user_id, fruit_id, info_id = _stock(2)
+
+    with pytest.raises(OutOfStockError, match="Not enough stock"):
+        cart_service.add_to_cart(user_id, fruit_id, 3)
+
+    assert _available(info_id) == 2
+    assert Cart.query.filter_by(user_id=user_id).count() == 0
+
+
+def test_add_to_cart_batch_holds_stock(app_context):
+    user_id, fruit_id, info_id = _stock(10)
+
+    lines = cart_service.add_to_cart_batch(
+        user_id, [{"fruit_id": fruit_id, "quantity": 4}]
+    )
+
+    assert _available(info_id) == 6
+    assert _hold(lines[0]["cart_id"]).quantity == 4
+
+
+def test_checkout_converts_hold_without_taking_stock_again(app_context):
+    user_id, fruit_id, info_id = _stock(5)
+    cart_id = cart_service.add_to_cart(user_id, fruit_id, 5).cart_id
+    assert _available(info_id) == 0
+
+    result = order_service.place_order(user_id, [cart_id])
+
+    assert result["order_total"] == 10.0
+    assert _available(info_id) == 0
+    assert _hold(cart_id) is None
+
+
+def test_checkout_takes_only_the_unheld_quantity(app_context):
+    user_id, fruit_id, info_id = _stock(10)
+    cart_id = cart_service.add_to_cart(user_id, fruit_id, 2).cart_id
+    db.session.get(Cart, cart_id).quantity = 5
+    db.session.commit()
+
+    order_service.place_order(user_id, [cart_id])
+
+    assert _available(info_id) == 5
+
+
+def test_checkout_returns_excess_hold(app_context):
+    user_id, fruit_id, info_id = _stock(10)
+    cart_id = cart_service.add_to_cart(user_id, fruit_id, 6).cart_id
+    db.session.get(Cart, cart_id).quantity = 4
+    db.session.commit()
+
+    order_service.place_order(user_id, [cart_id])
+
+    assert _available(info_id) == 6
+
+
+def test_update_cart_item_resizes_hold(app_context):
+    user_id, fruit_id, info_id = _stock(10)
+    cart_id = cart_service.add_to_cart(user_id, fruit_id, 3).cart_id
+
+    cart_service.update_cart_item(cart_id, 8)
+    assert _available(info_id) == 2
+    assert _hold(cart_id).quantity == 8
+
+    cart_service.update_cart_item(cart_id, 1)
+    assert _available(info_id) == 9
+    assert _hold(cart_id).quantity == 1
+
+    with pytest.raises(OutOfStockError):
+        cart_service.update_cart_item(cart_id, 11)
+    assert _available(info_id) == 9
+    assert db.session.get(Cart, cart_id).quantity == 1
+
+
+def test_deleting_cart_lines_releases_holds(app_context):
+    user_id, fruit_id, info_id = _stock(10)
+    first_id = cart_service.add_to_cart(user_id, fruit_id, 3).cart_id
+    cart_service.delete_cart_item(first_id)
+    assert _available(info_id) == 10
+    assert _hold(first_id) is None
+
+    cart_service.add_to_cart(user_id, fruit_id, 4)
+    assert cart_service.clear_cart_for_user(user_id) == 1
+    assert _available(info_id) == 10
+
+
+def test_associate_cart_releases_merged_guest_holds(app_context):
+    user_id, fruit_id, info_id = _stock(10)
+    guest_token = f"holds-{uuid.uuid4().hex}"
+    guest_id = cart_service.add_to_cart(
+        cart_service.GUEST_USER_ID, fruit_id, 3, guest_token=guest_token
+    ).cart_id
+    own_id = cart_service.add_to_cart(user_id, fruit_id, 2).cart_id
+
+    cart_service.associate_cart(cart_service.GUEST_USER_ID, user_id, guest_token)
+
+    assert _available(info_id) == 8
+    assert _hold(guest_id) is None
+    assert _hold(own_id).quantity == 2
+
+
+def test_sweep_expired_holds(app_context):
+    user_id, fruit_id, info_id = _stock(10)
+    live_id = cart_service.add_to_cart(user_id, fruit_id, 1).cart_id
+    other_user, other_fruit, other_info = _stock(10)
+    expired_id = cart_service.add_to_cart(other_user, other_fruit, 2).cart_id
+    now = datetime.utcnow()
+    db.session.get(CartReservation, expired_id).expires_at = now - timedelta(minutes=1)
+    db.session.commit()
+
+    released = reservation_service.sweep_expired_holds(now=now, chunk_size=1)
+
+    assert released >= 1
+    assert _hold(expired_id) is None
+    assert _available(other_info) == 10
+    assert _hold(live_id).quantity == 1
+    assert _available(info_id) == 9
+    # The cart line stays; checking it out takes the stock again.
+    assert db.session.get(Cart, expired_id) is not None
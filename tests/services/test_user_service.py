@@ -25,7 +25,7 @@ def test_get_all_users(mock_query, app):
     with app.app_context():
         mock_user1 = MagicMock(user_id=1)
         mock_user2 = MagicMock(user_id=2)
-        mock_query.all.return_value = [mock_user1, mock_user2]
+        mock_query.order_by.return_value.all.return_value = [mock_user1, mock_user2]
 
         result = user_service.get_all_users()
         assert isinstance(result, list)